@@ -7,5 +7,9 @@ class API:
         r = requests.post(self.base + "/v1/index/upload", json={"chunks": chunks}); r.raise_for_status(); return r.json()
     def commit_tus(self, tenant_id: str, repo_id: str, chunk: dict, tus_key: str):
         r = requests.post(self.base + "/v1/index/commit_tus", json={"tenant_id": tenant_id, "repo_id": repo_id, "chunk": chunk, "tus_key": tus_key}); r.raise_for_status(); return r.json()
+    def upload_symbols(self, tenant_id: str, repo_id: str, paths: list[str], symbols: list[dict]):
+        r = requests.post(self.base + "/v1/symbols/upload", json={"tenant_id": tenant_id, "repo_id": repo_id, "paths": paths, "symbols": symbols}); r.raise_for_status(); return r.json()
     def get_salt(self, tenant_id: str = "default"):
         r = requests.get(self.base + "/v1/tenant/salt", params={"tenant_id": tenant_id}); r.raise_for_status(); return r.json()
+    def get_salts(self, tenant_ids: list[str]):
+        r = requests.post(self.base + "/v1/tenant/salts", json={"tenant_ids": tenant_ids}); r.raise_for_status(); return r.json()["salts"]
@@ -2,7 +2,7 @@
 from pathlib import Path
 import argparse, json, re
 from .ignore_rules import load_ignore_patterns, should_ignore
-from .ts_chunker import chunk_by_ast
+from .ts_chunker import chunk_and_symbols, chunk_by_ast
 from .path_tokenizer import tokenize_path
 from .api import API
 from .embedder import LocalEmbedder
@@ -20,6 +20,7 @@ def main():
     p.add_argument("--tus", action="store_true"); p.add_argument("--tus-url", default="http://localhost:1080/files/")
     p.add_argument("--context", type=int, default=2)
     p.add_argument("--incremental", action="store_true")
+    p.add_argument("--no-symbols", action="store_true", help="skip uploading the tree-sitter symbol table")
     args = p.parse_args()
 
     root = Path(args.root).resolve(); spec = load_ignore_patterns(root); api = API(args.server)
@@ -51,9 +52,15 @@ def main():
             changed.append((path, rel, h))
 
     upload_batch = []
+    # symbol names are source text, so they stay local in privacy mode like the chunks do
+    send_symbols = not (args.privacy or args.no_symbols); symbols = []
     for path, rel, h in changed:
         tokens = tokenize_path(Path(rel), salt_value)
-        chunks = chunk_by_ast(path, context_lines=args.context)
+        if send_symbols:
+            chunks, file_symbols = chunk_and_symbols(path, context_lines=args.context)
+            symbols += [dict(s, rel_path=rel) for s in file_symbols]
+        else:
+            chunks = chunk_by_ast(path, context_lines=args.context)
         for i, ch in enumerate(chunks):
             cid = chunk_id_from(rel, i)
             item = {"tenant_id": args.tenant, "chunk_id": cid, "repo_id": args.repo_id, "lang": path.suffix.lstrip("."),
@@ -73,6 +80,11 @@ def main():
 
     if upload_batch:
         print("Bulk upload:", len(upload_batch)); print(api.upload(upload_batch))
+    if send_symbols and changed:
+        paths = [rel for _, rel, _ in changed]
+        for i in range(0, max(len(paths), 1), 500):
+            batch_paths = set(paths[i:i+500])
+            print("Symbols:", api.upload_symbols(args.tenant, args.repo_id, sorted(batch_paths), [s for s in symbols if s["rel_path"] in batch_paths]))
 
     if args.incremental:
         new_map = old
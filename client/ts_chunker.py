@@ -24,6 +24,15 @@ NODE_TYPES = {
     "ruby": ["method", "class"],
 }
 
+# node types that define a symbol but are not chunked on their own (Go type names live on the spec)
+SYMBOL_NODE_TYPES = {"go": ["type_spec"], "rust": ["enum_item", "trait_item"]}
+KIND_MAP = {
+    "class_definition": "class", "class_declaration": "class", "class_specifier": "class", "class": "class",
+    "struct_item": "struct", "enum_item": "enum", "trait_item": "trait", "type_spec": "type", "impl_item": "impl",
+    "method_definition": "method", "method_signature": "method", "method_declaration": "method", "method": "method",
+}
+CONTAINER_KINDS = {"class", "struct", "impl", "trait", "type"}
+
 def _merge_header_comments(full_lines: list[str], start_line: int, lang_name: str) -> int:
     i = start_line - 2  # line above node (0-based)
     def is_py_header(line:str): return line.strip().startswith(('@','#')) or line.strip()==''
@@ -56,19 +65,82 @@ def _node_span_to_lines(source: bytes, node, context_lines:int=2, lang_name:str|
     text = "\n".join(full[sctx-1:ectx])
     return start, end, text
 
-def chunk_by_ast(path: Path, context_lines:int=2) -> list[dict]:
+def _parse(path: Path, source: bytes):
     lang_name = LANG_MAP.get(path.suffix.lower())
-    source = path.read_bytes()
-    if not lang_name:
-        txt = source.decode("utf-8", errors="ignore"); lines = txt.splitlines()
-        return [{"line_start": 1, "line_end": len(lines) or 1, "text": txt}]
+    if not lang_name: return None, None
     try:
         lang = get_language(lang_name)
     except Exception:
+        return None, None
+    parser = Parser(); parser.set_language(lang)
+    return lang_name, parser.parse(source)
+
+def _text(node, source: bytes) -> str:
+    return source[node.start_byte:node.end_byte].decode("utf-8", errors="ignore").strip()
+
+def _receiver_type(node, source: bytes) -> str | None:
+    """Go method receiver type name: ``func (s *Server) Start()`` -> ``Server``."""
+    stack = [node.child_by_field_name("receiver")]
+    while stack:
+        n = stack.pop()
+        if n is None: continue
+        if n.type == "type_identifier": return _text(n, source)
+        stack.extend(reversed(n.children or []))
+    return None
+
+def _symbol_name(node, source: bytes) -> str | None:
+    name = node.child_by_field_name("type" if node.type == "impl_item" else "name")
+    if name is None and node.type == "function_definition":  # C/C++: name sits inside the declarator chain
+        decl = node.child_by_field_name("declarator")
+        while decl is not None and decl.child_by_field_name("declarator") is not None:
+            decl = decl.child_by_field_name("declarator")
+        name = decl
+    if name is None: return None
+    return _text(name, source) or None
+
+def extract_symbols(path: Path, source: bytes | None = None) -> list[dict]:
+    """Function/class/method symbols with qualified name, kind and line span (parses the file on its own)."""
+    source = path.read_bytes() if source is None else source
+    return _symbols(source, *_parse(path, source))
+
+def _symbols(source: bytes, lang_name: str | None, tree) -> list[dict]:
+    if tree is None: return []
+    types = set(NODE_TYPES.get(lang_name, [])) | set(SYMBOL_NODE_TYPES.get(lang_name, [])); symbols = []
+    def walk(node, scope: list[str], in_container: bool):
+        if node.type in types and node.type != "type_declaration":
+            name = _symbol_name(node, source)
+            if name:
+                kind = KIND_MAP.get(node.type) or ("method" if in_container else "function")
+                owner = scope + ([_receiver_type(node, source)] if lang_name == "go" and node.type == "method_declaration" else [])
+                # C++ out-of-line definitions carry their owner: Box::area
+                parts = [p for p in name.replace("::", ".").split(".") if p]
+                name = parts[-1]; qualified = ".".join([o for o in owner if o] + parts)
+                if kind != "impl":  # an impl block only scopes its methods under the type
+                    symbols.append({"name": name, "qualified_name": qualified, "kind": kind,
+                                    "line_start": node.start_point[0] + 1, "line_end": node.end_point[0] + 1})
+                if kind in CONTAINER_KINDS:
+                    for c in node.children or []: walk(c, qualified.split("."), True)
+                    return
+                scope, in_container = qualified.split("."), False
+        for c in node.children or []: walk(c, scope, in_container)
+    walk(tree.root_node, [], False)
+    return symbols
+
+def chunk_by_ast(path: Path, context_lines:int=2) -> list[dict]:
+    source = path.read_bytes()
+    return _chunks(source, *_parse(path, source), context_lines=context_lines)
+
+def chunk_and_symbols(path: Path, context_lines:int=2, source: bytes | None = None) -> tuple[list[dict], list[dict]]:
+    """``chunk_by_ast`` and ``extract_symbols`` from a single read and parse of the file."""
+    source = path.read_bytes() if source is None else source
+    lang_name, tree = _parse(path, source)
+    return _chunks(source, lang_name, tree, context_lines=context_lines), _symbols(source, lang_name, tree)
+
+def _chunks(source: bytes, lang_name: str | None, tree, context_lines:int=2) -> list[dict]:
+    if tree is None:
         txt = source.decode("utf-8", errors="ignore"); lines = txt.splitlines()
         return [{"line_start": 1, "line_end": len(lines) or 1, "text": txt}]
-    parser = Parser(); parser.set_language(lang)
-    tree = parser.parse(source); types = NODE_TYPES.get(lang_name, []); chunks = []
+    types = NODE_TYPES.get(lang_name, []); chunks = []
     def walk(node):
         if node.type in types:
             s,e,txt = _node_span_to_lines(source, node, context_lines=context_lines, lang_name=lang_name)
@@ -8,10 +8,16 @@ from app.index.opensearch_store import OSStore
 from app.index.qdrant_store import QdrantStore
 from app.search.hybrid_search import HybridSearch
 from app.search.reranker import CrossEncoderReranker
+from app.search.semantic_cache import SemanticCache
+from app.search.suggest import Suggester
+from app.search.symbol_index import SymbolIndex
+from app.services.admission import AdmissionController
 from app.services.api_key import APIKeyValidator
 from app.services.cache import EmbeddingCache, SearchCache
+from app.services.index_generation import IndexGenerations
 from app.services.metrics import StatsTracker
 from app.services.rate_limit import RateLimiter
+from app.services.salt_cache import SaltCache
 
 
 @dataclass
@@ -22,6 +28,12 @@ class AppContext:
     reranker: CrossEncoderReranker
     embedding_cache: EmbeddingCache
     search_cache: SearchCache
+    semantic_cache: SemanticCache
     rate_limiter: RateLimiter
     api_keys: APIKeyValidator
     stats: StatsTracker
+    symbols: SymbolIndex
+    suggester: Suggester
+    generations: IndexGenerations
+    salts: SaltCache
+    admission: AdmissionController
@@ -5,30 +5,26 @@ from __future__ import annotations
 from typing import Any
 
 from fastapi import APIRouter, Depends, Header
+from fastapi.concurrency import run_in_threadpool
 from qdrant_client.http.models import PointStruct
 
 from app.api.deps import provide_context
 from app.api.context import AppContext
 from app.config import settings
+from app.index.paths import is_test_path, path_prefixes
 from app.models.schemas import UploadRequest
 from app.utils.s3_utils import get_object_text
 
 router = APIRouter(prefix="/v1")
 
 
-@router.post("/index/upload")
-async def upload(
-    req: UploadRequest,
-    *,
-    x_api_key: str | None = Header(default=None),
-    context: AppContext = Depends(provide_context),
-) -> dict[str, Any]:
-    tenant = req.chunks[0].tenant_id if req.chunks else "default"
-    context.api_keys.enforce(tenant, x_api_key)
-
+def _upload(req: UploadRequest, tenant: str, context: AppContext) -> dict[str, Any]:
     points: list[PointStruct] = []
     os_docs: list[dict[str, Any]] = []
 
+    texts = [chunk.text for chunk in req.chunks if not chunk.privacy_mode and chunk.text is not None]
+    encoded = dict(zip(texts, context.embedding_cache.encode_many(texts)))
+
     for chunk in req.chunks:
         payload = {
             "chunk_id": chunk.chunk_id,
@@ -37,16 +33,18 @@ async def upload(
             "line_start": chunk.line_start,
             "line_end": chunk.line_end,
             "lang": chunk.lang,
+            "is_test": bool(chunk.is_test) or is_test_path(chunk.rel_path),
         }
         if chunk.rel_path is not None:
             payload["rel_path"] = chunk.rel_path
+            payload["path_prefixes"] = path_prefixes(chunk.rel_path)
 
         if chunk.privacy_mode:
             assert chunk.vector is not None, "privacy_mode=True면 vector 필요"
             vector = chunk.vector
         else:
             assert chunk.text is not None, "privacy_mode=False면 text 필요"
-            vector = context.embedding_cache.encode(chunk.text)
+            vector = encoded[chunk.text]
             if chunk.repo_id not in settings.privacy_repo_ids:
                 os_docs.append(
                     {
@@ -55,6 +53,7 @@ async def upload(
                         "path_tokens": chunk.path_tokens,
                         "rel_path": chunk.rel_path or "",
                         "lang": chunk.lang,
+                        "is_test": payload["is_test"],
                         "line_start": chunk.line_start,
                         "line_end": chunk.line_end,
                         "text": chunk.text,
@@ -73,27 +72,18 @@ async def upload(
         context.qdrant.upsert_tenant(tenant, points)
     if os_docs:
         context.opensearch.bulk_upsert_tenant(tenant, os_docs)
+        for repo_id in {doc["repo_id"] for doc in os_docs}:
+            context.suggester.invalidate(tenant, repo_id)
+    context.generations.bump(tenant, {chunk.repo_id for chunk in req.chunks})
 
     context.stats.increment_index(len(req.chunks))
 
     return {"status": "ok", "qdrant": len(points), "opensearch": len(os_docs)}
 
 
-@router.post("/index/commit_tus")
-async def commit_tus(
-    body: dict[str, Any],
-    *,
-    x_api_key: str | None = Header(default=None),
-    context: AppContext = Depends(provide_context),
+def _commit_tus(
+    tenant_id: str, repo_id: str, chunk: dict[str, Any], tus_key: str, context: AppContext
 ) -> dict[str, Any]:
-    tenant_id = body.get("tenant_id", "default")
-    context.api_keys.enforce(tenant_id, x_api_key)
-
-    repo_id = body.get("repo_id")
-    chunk = body.get("chunk", {})
-    tus_key = body.get("tus_key")
-    assert repo_id and chunk and tus_key, "invalid payload"
-
     object_key = f"uploads/{tus_key}"
     text = get_object_text(object_key)
     vector = context.embedding_cache.encode(text)
@@ -105,9 +95,11 @@ async def commit_tus(
         "line_start": chunk.get("line_start", 1),
         "line_end": chunk.get("line_end", 1),
         "lang": chunk.get("lang"),
+        "is_test": bool(chunk.get("is_test")) or is_test_path(chunk.get("rel_path")),
     }
     if chunk.get("rel_path"):
         payload["rel_path"] = chunk["rel_path"]
+        payload["path_prefixes"] = path_prefixes(chunk["rel_path"])
 
     context.qdrant.upsert_tenant(
         tenant_id,
@@ -130,11 +122,48 @@ async def commit_tus(
                     "path_tokens": chunk["path_tokens"],
                     "rel_path": payload.get("rel_path", ""),
                     "lang": payload.get("lang"),
+                    "is_test": payload["is_test"],
                     "line_start": payload["line_start"],
                     "line_end": payload["line_end"],
                     "text": text,
                 }
             ],
         )
+        context.suggester.invalidate(tenant_id, repo_id)
+    context.generations.bump(tenant_id, [repo_id])
 
     return {"status": "ok", "chunk_id": chunk["chunk_id"]}
+
+
+@router.post("/index/upload")
+async def upload(
+    req: UploadRequest,
+    *,
+    x_api_key: str | None = Header(default=None),
+    context: AppContext = Depends(provide_context),
+) -> dict[str, Any]:
+    tenant = req.chunks[0].tenant_id if req.chunks else "default"
+    context.api_keys.enforce(tenant, x_api_key)
+
+    # embedding and both bulk writes block; keep them off the event loop and behind the ingest pool
+    async with context.admission.admit("ingest", tenant):
+        return await run_in_threadpool(_upload, req, tenant, context)
+
+
+@router.post("/index/commit_tus")
+async def commit_tus(
+    body: dict[str, Any],
+    *,
+    x_api_key: str | None = Header(default=None),
+    context: AppContext = Depends(provide_context),
+) -> dict[str, Any]:
+    tenant_id = body.get("tenant_id", "default")
+    context.api_keys.enforce(tenant_id, x_api_key)
+
+    repo_id = body.get("repo_id")
+    chunk = body.get("chunk", {})
+    tus_key = body.get("tus_key")
+    assert repo_id and chunk and tus_key, "invalid payload"
+
+    async with context.admission.admit("ingest", tenant_id):
+        return await run_in_threadpool(_commit_tus, tenant_id, repo_id, chunk, tus_key, context)
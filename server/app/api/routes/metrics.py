@@ -12,4 +12,11 @@ router = APIRouter(prefix="/v1")
 
 @router.get("/metrics")
 async def metrics(context: AppContext = Depends(provide_context)) -> dict[str, object]:
-    return context.stats.snapshot()
+    snapshot = context.stats.snapshot()
+    snapshot.update(context.search_cache.stats())
+    snapshot.update(context.salts.stats())
+    snapshot.update(context.admission.stats())
+    snapshot["open_circuits"] = [
+        f"{backend}:{tenant}" for backend, tenant in context.searcher.breakers.open_circuits()
+    ]
+    return snapshot
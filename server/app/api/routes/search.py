@@ -2,23 +2,39 @@
 
 from __future__ import annotations
 
+import asyncio
+import base64
+import fnmatch
+import functools
+import hashlib
+import json
 import os
 import time
 import uuid
 import logging
+from collections import Counter
 
-from fastapi import APIRouter, Depends, Header, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 from app.api.context import AppContext
 from app.api.deps import provide_context
 from app.config import settings
 from app.models.schemas import (
+    BatchSearchRequest,
+    BatchSearchResponse,
     FetchLinesRequest,
     FetchLinesResponse,
     SearchHit,
     SearchRequest,
     SearchResponse,
+    SearchStreamEvent,
+    SemanticCacheMatch,
+    StreamSearchRequest,
 )
+from app.search.hybrid_search import SearchUnavailable
 from app.utils.jsonl import append_jsonl
 
 logger = logging.getLogger(__name__)
@@ -26,10 +42,202 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1")
 
 
+def _cache_key(req: SearchRequest) -> tuple:
+    return (
+        req.tenant_id,
+        req.repo_id,
+        tuple(req.repo_ids) if req.repo_ids else None,
+        req.repo_glob,
+        req.per_repo_limit,
+        req.query,
+        req.lang,
+        req.dir_hint,
+        req.exclude_tests,
+        req.top_k,
+    ) + (("rerank",) if getattr(req, "rerank", False) else ())
+
+
+def _versioned_key(req: SearchRequest, context: AppContext, repos: list[str]) -> tuple:
+    """``_cache_key`` plus the index generation of every repo in scope.
+
+    Any write to one of the repos bumps its generation, so cached results are
+    invalidated exactly when their repos change and the TTL can be long.
+    """
+
+    return _cache_key(req) + (context.generations.current(req.tenant_id, repos),)
+
+
+def _semantic_scope(req: SearchRequest, context: AppContext, repos: list[str]) -> tuple:
+    """``_versioned_key`` without the query text: near-duplicate queries share it."""
+
+    return _versioned_key(req.model_copy(update={"query": ""}), context, repos)
+
+
+def _filters(req: SearchRequest) -> dict[str, object]:
+    return {
+        "lang": req.lang,
+        "dir_hint": req.dir_hint,
+        "exclude_tests": req.exclude_tests,
+    }
+
+
+async def _resolve_repos(req: SearchRequest, context: AppContext) -> list[str]:
+    """Return the de-duplicated repos addressed by ``repo_id``, ``repo_ids`` and ``repo_glob``."""
+
+    repos: list[str] = []
+    if req.repo_id:
+        repos.append(req.repo_id)
+    repos.extend(req.repo_ids or [])
+    if req.repo_glob:
+        repos.extend(
+            await run_in_threadpool(context.searcher.expand_repo_glob, req.tenant_id, req.repo_glob)
+        )
+    return list(dict.fromkeys(repos))
+
+
+def _repo_arg(repos: list[str]) -> str | list[str]:
+    return repos[0] if len(repos) == 1 else repos
+
+
+def _needs_fetch(req: SearchRequest) -> bool:
+    explicit = ([req.repo_id] if req.repo_id else []) + list(req.repo_ids or [])
+    if any(repo in settings.privacy_repo_ids for repo in explicit):
+        return True
+    return bool(req.repo_glob) and any(
+        fnmatch.fnmatchcase(repo, req.repo_glob) for repo in settings.privacy_repo_ids
+    )
+
+
+def _weights(context: AppContext, bucket: str) -> tuple[float, float]:
+    alpha, beta = context.searcher.alpha, context.searcher.beta
+    if bucket == "variant":
+        alpha = float(os.getenv("AB_VARIANT_ALPHA", alpha))
+        beta = float(os.getenv("AB_VARIANT_BETA", beta))
+    return alpha, beta
+
+
+def _new_search(context: AppContext) -> tuple[str, str, float, float]:
+    """Allocate a search id and A/B bucket, returning ``(search_id, bucket, alpha, beta)``."""
+
+    search_id = uuid.uuid4().hex[:16]
+    bucket = "control" if int(search_id[-1], 16) % 2 == 0 else "variant"
+    return (search_id, bucket) + _weights(context, bucket)
+
+
+def _candidates_key(search_id: str) -> tuple:
+    return ("candidates", search_id)
+
+
+def _scope_digest(req: SearchRequest) -> str:
+    """Identify the query a cursor belongs to, independent of page size."""
+
+    key = _cache_key(req.model_copy(update={"top_k": 0, "cursor": None}))
+    return hashlib.sha256(json.dumps(key, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _encode_cursor(search_id: str, offset: int, scope: str) -> str:
+    raw = json.dumps({"sid": search_id, "off": offset, "scope": scope}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int, str]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(data["sid"]), int(data["off"]), str(data["scope"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid cursor") from None
+
+
+def _exhausted(candidate_count: int, depth: int) -> bool:
+    """True when deeper retrieval cannot add candidates.
+
+    If neither backend filled its ``TOP_K_* * depth`` quota the filtered corpus
+    is exhausted; fewer fused candidates than the smaller quota proves that.
+    """
+
+    if depth >= settings.search_page_max_depth:
+        return True
+    return candidate_count < min(settings.top_k_vector, settings.top_k_bm25) * depth
+
+
+def _page(
+    candidates: list[dict], offset: int, top_k: int, depth: int, search_id: str, scope: str
+) -> tuple[list[dict], str | None]:
+    page = candidates[offset : offset + top_k]
+    next_offset = offset + len(page)
+    more = next_offset < len(candidates) or (bool(page) and not _exhausted(len(candidates), depth))
+    return page, _encode_cursor(search_id, next_offset, scope) if more else None
+
+
+async def _search_within_deadline(
+    req: SearchRequest,
+    context: AppContext,
+    repos: list[str],
+    alpha: float,
+    beta: float,
+    start: float,
+    depth: int = 1,
+    qvec=None,
+) -> tuple[list[dict], list[dict], list[str]]:
+    """Run retrieval in what is left of the request deadline.
+
+    Waiting for a search admission slot counts against the deadline.
+    Returns ``(candidates, debug, degraded_backends)``; a 503 is raised when
+    no slot frees up in time or neither backend answered in time.
+    """
+
+    deadline_ms = req.deadline_ms or settings.search_deadline_ms
+    remaining_s = max(0.001, deadline_ms / 1000 - (time.time() - start))
+    async with context.admission.admit("search", req.tenant_id, timeout_s=remaining_s):
+        remaining_ms = max(1.0, deadline_ms - (time.time() - start) * 1000)
+        try:
+            return await run_in_threadpool(
+                context.searcher.search_with_deadline,
+                tenant_id=req.tenant_id,
+                repo_id=_repo_arg(repos),
+                query=req.query,
+                top_k=context.searcher.candidate_limit(depth),
+                filters=_filters(req),
+                alpha=alpha,
+                beta=beta,
+                per_repo_limit=req.per_repo_limit,
+                depth=depth,
+                deadline_ms=remaining_ms,
+                route=context.searcher.route_for(req.query, repos),
+                qvec=qvec,
+            )
+        except SearchUnavailable as exc:
+            context.stats.record_degraded(exc.backends)
+            raise HTTPException(status_code=503, detail=str(exc)) from None
+
+
+def _route(debug: list[dict]) -> str | None:
+    return debug[0].get("route") if debug else None
+
+
+def _log_search(req: SearchRequest, search_id: str, bucket: str, debug: list[dict]) -> None:
+    append_jsonl(
+        "/app/server/data/search_log.jsonl",
+        {
+            "search_id": search_id,
+            "tenant_id": req.tenant_id,
+            "repo_id": req.repo_id,
+            "repo_ids": req.repo_ids,
+            "repo_glob": req.repo_glob,
+            "query": req.query,
+            "timestamp": time.time(),
+            "candidates": debug,
+            "bucket": bucket,
+            "route": _route(debug),
+        },
+    )
+
+
 @router.post("/search", response_model=SearchResponse)
 async def search(
     req: SearchRequest,
     request: Request,
+    response: Response,
     *,
     x_api_key: str | None = Header(default=None),
     context: AppContext = Depends(provide_context),
@@ -37,7 +245,8 @@ async def search(
     context.api_keys.enforce(req.tenant_id, x_api_key)
 
     client_key = x_api_key or (request.client.host if request.client else "anonymous")
-    context.rate_limiter.check(client_key)
+    limits = context.rate_limiter.check(client_key, endpoint="search", tenant=req.tenant_id)
+    response.headers.update(limits.headers())
 
     start = time.time()
 
@@ -52,68 +261,92 @@ async def search(
         },
     )
 
-    cache_key = (
-        req.tenant_id,
-        req.repo_id,
-        req.query,
-        req.lang,
-        req.dir_hint,
-        req.exclude_tests,
-        req.top_k,
-    )
+    if req.cursor:
+        return await _search_page(req, context, start)
+
+    repos = await _resolve_repos(req, context)
+    cache_key = _versioned_key(req, context, repos)
     cached_entry = context.search_cache.get(cache_key)
+    scope = _scope_digest(req)
+    degraded: list[str] = []
+    semantic_match: SemanticCacheMatch | None = None
+    qvec = semantic_scope = None
+
+    if cached_entry is None and req.semantic_cache and repos:
+        # the query embedding is reused by vector retrieval on a miss
+        qvec = await run_in_threadpool(context.searcher.embed_query, req.query)
+        semantic_scope = _semantic_scope(req, context, repos)
+        match = context.semantic_cache.lookup(semantic_scope, qvec)
+        cached_entry = context.search_cache.get(match.cache_key) if match else None
+        if match and cached_entry:
+            semantic_match = SemanticCacheMatch(
+                query=match.query, similarity=match.similarity, search_id=cached_entry.search_id
+            )
+            # later repeats of this phrasing hit the exact key; depth 0 because the
+            # matched query's candidate list must not be paged as this query's
+            context.search_cache.set(
+                cache_key,
+                hits=cached_entry.hits,
+                debug=cached_entry.debug,
+                bucket=cached_entry.bucket,
+                search_id=cached_entry.search_id,
+            )
+        context.stats.record_semantic_cache(semantic_match is not None)
 
     if cached_entry:
         hits = cached_entry.hits
         debug = cached_entry.debug
+        if semantic_match:
+            debug = [dict(d, semantic_match=semantic_match.model_dump()) for d in debug]
         bucket = cached_entry.bucket
         search_id = cached_entry.search_id
         cache_hit = True
-    else:
-        search_id = uuid.uuid4().hex[:16]
-        bucket = "control" if int(search_id[-1], 16) % 2 == 0 else "variant"
-
-        original_alpha, original_beta = context.searcher.alpha, context.searcher.beta
-        if bucket == "variant":
-            context.searcher.alpha = float(os.getenv("AB_VARIANT_ALPHA", context.searcher.alpha))
-            context.searcher.beta = float(os.getenv("AB_VARIANT_BETA", context.searcher.beta))
-
-        hits, debug = context.searcher.search_with_debug(
-            tenant_id=req.tenant_id,
-            repo_id=req.repo_id,
-            query=req.query,
-            top_k=req.top_k,
-            filters={
-                "lang": req.lang,
-                "dir_hint": req.dir_hint,
-                "exclude_tests": req.exclude_tests,
-            },
+        # depth > 0 marks entries whose fused candidate list was cached for paging.
+        # Semantic matches page another query's candidates, so they get no cursor.
+        next_cursor = (
+            _encode_cursor(search_id, len(hits), scope) if cached_entry.depth and not semantic_match else None
         )
-        context.searcher.alpha, context.searcher.beta = original_alpha, original_beta
+    else:
+        search_id, bucket, alpha, beta = _new_search(context)
 
-        context.search_cache.set(
-            cache_key,
-            hits=hits,
-            debug=debug,
-            bucket=bucket,
-            search_id=search_id,
-        )
+        candidates, debug = [], []
+        if repos:
+            # Run off the event loop so concurrent searches can share inference batches.
+            candidates, debug, degraded = await _search_within_deadline(
+                req, context, repos, alpha, beta, start, qvec=qvec
+            )
+        if debug:
+            context.stats.record_route(_route(debug) or "hybrid")
+        if degraded:
+            # Partial results are neither cached nor paged, so the next request
+            # gets the full hybrid list once the backend recovers.
+            hits, next_cursor = candidates[: req.top_k], None
+            context.stats.record_degraded(degraded)
+        else:
+            hits, next_cursor = _page(candidates, 0, req.top_k, 1, search_id, scope)
+            context.search_cache.set(
+                cache_key,
+                hits=hits,
+                debug=debug,
+                bucket=bucket,
+                search_id=search_id,
+                depth=1 if next_cursor else 0,
+            )
+            if semantic_scope is not None:
+                context.semantic_cache.add(semantic_scope, qvec, req.query, cache_key)
+            if next_cursor:
+                context.search_cache.set(
+                    _candidates_key(search_id),
+                    hits=candidates,
+                    bucket=bucket,
+                    search_id=search_id,
+                    depth=1,
+                )
         cache_hit = False
 
-    need_fetch = req.repo_id in settings.privacy_repo_ids
+    need_fetch = _needs_fetch(req)
 
-    append_jsonl(
-        "/app/server/data/search_log.jsonl",
-        {
-            "search_id": search_id,
-            "tenant_id": req.tenant_id,
-            "repo_id": req.repo_id,
-            "query": req.query,
-            "timestamp": time.time(),
-            "candidates": debug,
-            "bucket": bucket,
-        },
-    )
+    _log_search(req, search_id, bucket, debug)
 
     duration_ms = int((time.time() - start) * 1000)
 
@@ -129,6 +362,9 @@ async def search(
             "duration_ms": duration_ms,
             "result_count": len(hits),
             "search_id": search_id,
+            "degraded_backends": degraded,
+            "route": _route(debug),
+            "semantic_match": semantic_match.model_dump() if semantic_match else None,
         },
     )
 
@@ -153,9 +389,390 @@ async def search(
         bucket=bucket,
         need_fetch_lines=need_fetch,
         hits=[SearchHit(**hit) for hit in hits],
+        next_cursor=next_cursor,
+        degraded=bool(degraded),
+        degraded_backends=degraded,
+        semantic_match=semantic_match,
+    )
+
+
+async def _search_page(req: SearchRequest, context: AppContext, start: float) -> SearchResponse:
+    """Serve a follow-up page from the cached fused candidate list.
+
+    Retrieval only runs again, at twice the previous depth, when the cached
+    list cannot fill the requested page. Already served candidates keep their
+    positions so pages never repeat a chunk.
+    """
+
+    search_id, offset, scope = _decode_cursor(req.cursor or "")
+    if scope != _scope_digest(req):
+        raise HTTPException(status_code=400, detail="cursor does not match this query")
+    entry = context.search_cache.get(_candidates_key(search_id))
+    if entry is None:
+        raise HTTPException(status_code=410, detail="cursor expired")
+
+    candidates, depth, deepened = entry.hits, entry.depth, False
+    degraded: list[str] = []
+    if offset + req.top_k > len(candidates) and not _exhausted(len(candidates), depth):
+        deeper_depth = min(depth * 2, settings.search_page_max_depth)
+        alpha, beta = _weights(context, entry.bucket)
+        repos = await _resolve_repos(req, context)
+        deeper, _, degraded = await _search_within_deadline(
+            req, context, repos, alpha, beta, start, depth=deeper_depth
+        )
+        if degraded:
+            # Keep the cached list and depth; the next page retries the deeper search.
+            context.stats.record_degraded(degraded)
+        else:
+            served = {hit["chunk_id"] for hit in candidates[:offset]}
+            candidates = candidates[:offset] + [hit for hit in deeper if hit["chunk_id"] not in served]
+            depth, deepened = deeper_depth, True
+
+    hits, next_cursor = _page(candidates, offset, req.top_k, depth, search_id, scope)
+    if deepened:
+        context.search_cache.set(
+            _candidates_key(search_id),
+            hits=candidates,
+            bucket=entry.bucket,
+            search_id=search_id,
+            depth=depth,
+        )
+
+    duration_ms = int((time.time() - start) * 1000)
+    logger.info(
+        "search_page_completed",
+        extra={
+            "tenant_id": req.tenant_id,
+            "repo_id": req.repo_id,
+            "query": req.query,
+            "top_k": req.top_k,
+            "offset": offset,
+            "depth": depth,
+            "deepened": deepened,
+            "degraded_backends": degraded,
+            "duration_ms": duration_ms,
+            "result_count": len(hits),
+            "search_id": search_id,
+        },
+    )
+    context.stats.record_search(duration_ms)
+
+    return SearchResponse(
+        search_id=search_id,
+        bucket=entry.bucket,
+        need_fetch_lines=_needs_fetch(req),
+        hits=[SearchHit(**hit) for hit in hits],
+        next_cursor=next_cursor,
+        degraded=bool(degraded),
+        degraded_backends=degraded,
     )
 
 
+def _rerank_hits(context: AppContext, tenant_id: str, query: str, hits: list[dict]) -> list[dict]:
+    """Reorder hits by cross-encoder score on their full text; hits without text keep fused order after them.
+
+    Full text is only fetched here, for the final hits, rather than carried
+    through retrieval and the cache.
+    """
+
+    texts = context.searcher.full_texts(tenant_id, hits)
+    with_text = [hit for hit in hits if texts.get(hit["chunk_id"])]
+    if not with_text:
+        return hits
+    scores = context.reranker.rerank(query, [texts[hit["chunk_id"]] for hit in with_text])
+    reranked = [
+        dict(hit, score=float(score))
+        for hit, score in sorted(zip(with_text, scores), key=lambda pair: pair[1], reverse=True)
+    ]
+    return reranked + [hit for hit in hits if not texts.get(hit["chunk_id"])]
+
+
+@router.post("/search/stream")
+async def search_stream(
+    req: StreamSearchRequest,
+    request: Request,
+    *,
+    x_api_key: str | None = Header(default=None),
+    context: AppContext = Depends(provide_context),
+) -> StreamingResponse:
+    """Stream a provisional BM25 (or cached) list first, then the fused list.
+
+    Retrieval keeps the deadline, backend budgets, circuit breakers and query
+    routing of ``/v1/search``. A backend that fails is left out of the final
+    event and named in its ``degraded_backends``; when both fail the final
+    event has no hits. Emits NDJSON by default and Server-Sent Events when
+    the client sends ``Accept: text/event-stream``.
+    """
+
+    context.api_keys.enforce(req.tenant_id, x_api_key)
+
+    client_key = x_api_key or (request.client.host if request.client else "anonymous")
+    limits = context.rate_limiter.check(client_key, endpoint="search_stream", tenant=req.tenant_id)
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    need_fetch = _needs_fetch(req)
+
+    def _event(
+        event: str,
+        stage: str,
+        search_id: str,
+        bucket: str | None,
+        hits: list[dict],
+        stage_start: float,
+        start: float,
+        degraded: list[str] | None = None,
+    ) -> str:
+        now = time.perf_counter()
+        payload = SearchStreamEvent(
+            event=event,
+            stage=stage,
+            search_id=search_id,
+            bucket=bucket,
+            stage_ms=int((now - stage_start) * 1000),
+            elapsed_ms=int((now - start) * 1000),
+            need_fetch_lines=need_fetch,
+            hits=[SearchHit(**hit) for hit in hits],
+            degraded=bool(degraded),
+            degraded_backends=degraded or [],
+        ).model_dump_json()
+        return f"event: {event}\ndata: {payload}\n\n" if sse else payload + "\n"
+
+    async def events():
+        start = time.perf_counter()
+        repos = await _resolve_repos(req, context)
+        cache_key = _versioned_key(req, context, repos)
+        cached_entry = context.search_cache.get(cache_key)
+        if cached_entry:
+            _log_search(req, cached_entry.search_id, cached_entry.bucket, cached_entry.debug)
+            yield _event("final", "cache", cached_entry.search_id, cached_entry.bucket, cached_entry.hits, start, start)
+            context.stats.record_search(int((time.perf_counter() - start) * 1000))
+            return
+
+        search_id, bucket, alpha, beta = _new_search(context)
+        hits: list[dict] = []
+        debug: list[dict] = []
+        degraded: list[str] = []
+        stage = "fused"
+        stage_start = time.perf_counter()
+        if repos:
+            repo_arg, filters = _repo_arg(repos), _filters(req)
+            deadline_ms = req.deadline_ms or settings.search_deadline_ms
+            remaining_ms = max(1.0, deadline_ms - (time.perf_counter() - start) * 1000)
+            route = context.searcher.route_for(req.query, repos)
+            if route == "lexical":
+                # BM25 alone is the final list (vector retrieval only runs if it finds nothing)
+                try:
+                    hits, debug, degraded = await run_in_threadpool(
+                        context.searcher.search_with_deadline,
+                        tenant_id=req.tenant_id,
+                        repo_id=repo_arg,
+                        query=req.query,
+                        top_k=req.top_k,
+                        filters=filters,
+                        alpha=alpha,
+                        beta=beta,
+                        per_repo_limit=req.per_repo_limit,
+                        deadline_ms=remaining_ms,
+                        route=route,
+                    )
+                except SearchUnavailable as exc:
+                    degraded = exc.backends
+            else:
+                retrieve = functools.partial(
+                    run_in_threadpool,
+                    context.searcher.retrieve,
+                    tenant_id=req.tenant_id,
+                    repo_id=repo_arg,
+                    query=req.query,
+                    filters=filters,
+                    deadline_ms=remaining_ms,
+                )
+                # Embedding + vector search runs while BM25 answers the provisional list.
+                vector_task = asyncio.ensure_future(retrieve("vector"))
+                try:
+                    b_hits = await retrieve("bm25")
+                    if b_hits:
+                        provisional = context.searcher.lexical_preview(b_hits, req.top_k, req.per_repo_limit)
+                        yield _event("provisional", "bm25", search_id, bucket, provisional, stage_start, start)
+                    stage_start = time.perf_counter()
+                    v_hits = await vector_task
+                finally:
+                    vector_task.cancel()  # no-op once done; stops waiting for it if the client left
+                degraded = [name for name, found in (("vector", v_hits), ("bm25", b_hits)) if found is None]
+                if len(degraded) < 2:
+                    hits, debug = context.searcher.fuse(
+                        v_hits or [], b_hits or [], req.top_k, alpha, beta, req.per_repo_limit
+                    )
+                    debug = [dict(d, route=route) for d in debug]
+            if debug:
+                context.stats.record_route(_route(debug) or "hybrid")
+            if degraded:
+                context.stats.record_degraded(degraded)
+            if req.rerank and hits:
+                hits = await run_in_threadpool(_rerank_hits, context, req.tenant_id, req.query, hits)
+                stage = "reranked"
+
+        if not degraded:
+            # like /v1/search, partial results are not cached
+            context.search_cache.set(cache_key, hits=hits, debug=debug, bucket=bucket, search_id=search_id)
+        _log_search(req, search_id, bucket, debug)
+        yield _event("final", stage, search_id, bucket, hits, stage_start, start, degraded)
+
+        duration_ms = int((time.perf_counter() - start) * 1000)
+        logger.info(
+            "search_stream_completed",
+            extra={
+                "tenant_id": req.tenant_id,
+                "repo_id": req.repo_id,
+                "query": req.query,
+                "top_k": req.top_k,
+                "variant": bucket,
+                "stage": stage,
+                "degraded_backends": degraded,
+                "duration_ms": duration_ms,
+                "result_count": len(hits),
+                "search_id": search_id,
+            },
+        )
+        context.stats.record_search(duration_ms)
+
+    async def admitted_events():
+        try:
+            async for chunk in events():
+                yield chunk
+        finally:
+            admission.release()
+
+    # taken before the response starts so an overloaded pool can still answer 503;
+    # the background task frees the slot if the client leaves before streaming starts
+    admission = await context.admission.acquire("search", req.tenant_id)
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(
+        admitted_events(),
+        media_type=media_type,
+        headers=limits.headers(),
+        background=BackgroundTask(admission.release),
+    )
+
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    req: BatchSearchRequest,
+    request: Request,
+    response: Response,
+    *,
+    x_api_key: str | None = Header(default=None),
+    context: AppContext = Depends(provide_context),
+) -> BatchSearchResponse:
+    for tenant_id in {item.tenant_id for item in req.searches}:
+        context.api_keys.enforce(tenant_id, x_api_key)
+
+    client_key = x_api_key or (request.client.host if request.client else "anonymous")
+    limits = context.rate_limiter.check(
+        client_key,
+        cost=len(req.searches),
+        endpoint="search_batch",
+        tenant=Counter(item.tenant_id for item in req.searches),
+    )
+    response.headers.update(limits.headers())
+
+    start = time.time()
+
+    scopes = [await _resolve_repos(item, context) for item in req.searches]
+    keys = [_versioned_key(item, context, repos) for item, repos in zip(req.searches, scopes)]
+    results: list[tuple[list[dict], list[dict], str, str, list[str]] | None] = []
+    pending: list[int] = []
+    for index, cached_entry in enumerate(context.search_cache.get_many(keys)):
+        if cached_entry:
+            results.append(
+                (cached_entry.hits, cached_entry.debug, cached_entry.bucket, cached_entry.search_id, [])
+            )
+        else:
+            results.append(None)
+            pending.append(index)
+
+    if pending:
+        plans = {index: _new_search(context) for index in pending}
+        searchable = [index for index in pending if scopes[index]]
+        # one shared deadline: the tightest one asked for by an item
+        deadline_ms = min(
+            (req.searches[index].deadline_ms or settings.search_deadline_ms for index in pending),
+            default=settings.search_deadline_ms,
+        )
+        remaining_s = max(0.001, deadline_ms / 1000 - (time.time() - start))
+        # one slot for the whole batch, charged to the tenant with the most searches in it
+        tenant_id = Counter(req.searches[index].tenant_id for index in pending).most_common(1)[0][0]
+        async with context.admission.admit("search", tenant_id, timeout_s=remaining_s):
+            found = await run_in_threadpool(
+                context.searcher.search_batch_with_deadline,
+                [
+                    {
+                        "tenant_id": req.searches[index].tenant_id,
+                        "repo_id": _repo_arg(scopes[index]),
+                        "query": req.searches[index].query,
+                        "top_k": req.searches[index].top_k,
+                        "filters": _filters(req.searches[index]),
+                        "alpha": plans[index][2],
+                        "beta": plans[index][3],
+                        "per_repo_limit": req.searches[index].per_repo_limit,
+                    }
+                    for index in searchable
+                ],
+                deadline_ms=max(1.0, deadline_ms - (time.time() - start) * 1000),
+            )
+        outcomes = dict(zip(searchable, found))
+        for index in pending:
+            hits, debug, degraded = outcomes.get(index, ([], [], []))
+            search_id, bucket, _, _ = plans[index]
+            if debug:
+                context.stats.record_route(_route(debug) or "hybrid")
+            if degraded:
+                # like /v1/search, partial results are not cached
+                context.stats.record_degraded(degraded)
+            else:
+                context.search_cache.set(
+                    keys[index],
+                    hits=hits,
+                    debug=debug,
+                    bucket=bucket,
+                    search_id=search_id,
+                )
+            results[index] = (hits, debug, bucket, search_id, degraded)
+
+    responses: list[SearchResponse] = []
+    for item, result in zip(req.searches, results):
+        assert result is not None
+        hits, debug, bucket, search_id, degraded = result
+        _log_search(item, search_id, bucket, debug)
+        responses.append(
+            SearchResponse(
+                search_id=search_id,
+                bucket=bucket,
+                need_fetch_lines=_needs_fetch(item),
+                hits=[SearchHit(**hit) for hit in hits],
+                degraded=bool(degraded),
+                degraded_backends=degraded,
+            )
+        )
+
+    duration_ms = int((time.time() - start) * 1000)
+
+    logger.info(
+        "search_batch_completed",
+        extra={
+            "batch_size": len(req.searches),
+            "cache_hits": len(req.searches) - len(pending),
+            "duration_ms": duration_ms,
+        },
+    )
+
+    per_query_ms = duration_ms / len(req.searches)
+    for _ in req.searches:
+        context.stats.record_search(per_query_ms)
+
+    return BatchSearchResponse(results=responses)
+
+
 @router.post("/search/fetch-lines", response_model=FetchLinesResponse)
 async def fetch_lines(
     req: FetchLinesRequest,
@@ -166,7 +783,8 @@ async def fetch_lines(
     context.api_keys.enforce(req.tenant_id, x_api_key)
 
     passages = [item.raw_lines for item in req.items]
-    scores = context.reranker.rerank(req.query, passages)
+    async with context.admission.admit("search", req.tenant_id):
+        scores = await run_in_threadpool(context.reranker.rerank, req.query, passages)
     ranked = sorted(zip(req.items, scores), key=lambda pair: pair[1], reverse=True)[: req.top_k]
 
     hits = [
@@ -0,0 +1,64 @@
+"""Search-as-you-type suggestions."""
+
+from __future__ import annotations
+
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.context import AppContext
+from app.api.deps import provide_context
+from app.models.schemas import SuggestItem, SuggestResponse
+from app.search.suggest import SUGGEST_TYPES
+
+router = APIRouter(prefix="/v1")
+
+
+@router.get("/search/suggest", response_model=SuggestResponse)
+async def suggest(
+    request: Request,
+    response: Response,
+    repo_id: str,
+    q: str = Query(min_length=1, max_length=256),
+    tenant_id: str = "default",
+    types: str = "path,symbol",
+    limit: int = Query(default=20, ge=1, le=100),
+    session_id: str | None = Query(default=None, max_length=128),
+    *,
+    x_api_key: str | None = Header(default=None),
+    context: AppContext = Depends(provide_context),
+) -> SuggestResponse:
+    """Path and symbol completions for the prefix ``q``.
+
+    Clients should send the same ``session_id`` for every keystroke of one
+    input so successive prefixes are narrowed from the previous candidates.
+    """
+
+    context.api_keys.enforce(tenant_id, x_api_key)
+
+    client_key = x_api_key or (request.client.host if request.client else "anonymous")
+    limits = context.rate_limiter.check(client_key, endpoint="suggest", tenant=tenant_id)
+    response.headers.update(limits.headers())
+
+    wanted = tuple(t for t in SUGGEST_TYPES if t in {part.strip() for part in types.split(",")})
+    if not wanted:
+        raise HTTPException(status_code=400, detail=f"types must include one of {', '.join(SUGGEST_TYPES)}")
+
+    if not context.suggester.is_fresh(tenant_id, repo_id, wanted):
+        # first keystroke (or TTL refresh) loads the repo's tables from OpenSearch
+        await run_in_threadpool(context.suggester.suggest, tenant_id, repo_id, q, types=wanted, limit=1)
+
+    start = time.perf_counter()
+    items, reused = context.suggester.suggest(
+        tenant_id, repo_id, q, types=wanted, limit=limit, session_id=session_id
+    )
+    took_ms = (time.perf_counter() - start) * 1000
+    context.stats.record_suggest(took_ms, reused)
+
+    return SuggestResponse(
+        repo_id=repo_id,
+        suggestions=[SuggestItem(**item) for item in items],
+        reused=reused,
+        took_ms=round(took_ms, 3),
+    )
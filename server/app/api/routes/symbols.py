@@ -0,0 +1,80 @@
+"""Symbol table endpoints."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.context import AppContext
+from app.api.deps import provide_context
+from app.config import settings
+from app.models.schemas import SymbolLookupResponse, SymbolMeta, SymbolUploadRequest
+
+router = APIRouter(prefix="/v1")
+
+
+@router.post("/symbols/upload")
+async def upload_symbols(
+    req: SymbolUploadRequest,
+    *,
+    x_api_key: str | None = Header(default=None),
+    context: AppContext = Depends(provide_context),
+) -> dict[str, Any]:
+    """Replace the symbols of ``paths`` in a repo with ``symbols``."""
+
+    context.api_keys.enforce(req.tenant_id, x_api_key)
+    if req.repo_id in settings.privacy_repo_ids:
+        raise HTTPException(status_code=400, detail="symbols are not stored for privacy repos")
+
+    paths = sorted(set(req.paths) | {symbol.rel_path for symbol in req.symbols})
+    async with context.admission.admit("ingest", req.tenant_id):
+        count = await run_in_threadpool(
+            context.symbols.replace,
+            req.tenant_id,
+            req.repo_id,
+            paths,
+            [symbol.model_dump() for symbol in req.symbols],
+        )
+    return {"status": "ok", "symbols": count, "paths": len(paths)}
+
+
+@router.get("/symbols", response_model=SymbolLookupResponse)
+async def lookup_symbols(
+    request: Request,
+    response: Response,
+    repo_id: str,
+    q: str = Query(min_length=1),
+    tenant_id: str = "default",
+    mode: Literal["exact", "prefix"] = "exact",
+    kind: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    *,
+    x_api_key: str | None = Header(default=None),
+    context: AppContext = Depends(provide_context),
+) -> SymbolLookupResponse:
+    """Exact or prefix lookup by symbol name or qualified name (case-insensitive)."""
+
+    context.api_keys.enforce(tenant_id, x_api_key)
+
+    client_key = x_api_key or (request.client.host if request.client else "anonymous")
+    limits = context.rate_limiter.check(client_key, endpoint="symbols", tenant=tenant_id)
+    response.headers.update(limits.headers())
+
+    if not context.symbols.is_fresh(tenant_id, repo_id):
+        # first lookup (or TTL refresh) loads the repo's table from OpenSearch
+        await run_in_threadpool(context.symbols.lookup, tenant_id, repo_id, q, prefix=True, limit=1)
+
+    start = time.perf_counter()
+    hits = context.symbols.lookup(
+        tenant_id, repo_id, q, prefix=mode == "prefix", kind=kind, limit=limit
+    )
+    took_ms = (time.perf_counter() - start) * 1000
+
+    return SymbolLookupResponse(
+        repo_id=repo_id,
+        hits=[SymbolMeta(**{field: hit[field] for field in SymbolMeta.model_fields}) for hit in hits],
+        took_ms=round(took_ms, 3),
+    )
@@ -2,20 +2,52 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header
+from fastapi.concurrency import run_in_threadpool
 
-from app.utils.vault import get_current_salt
+from app.api.context import AppContext
+from app.api.deps import provide_context
+from app.models.schemas import TenantSalt, TenantSaltsRequest, TenantSaltsResponse
 
 router = APIRouter(prefix="/v1")
 
 
-@router.get("/tenant/salt")
-async def get_tenant_salt(tenant_id: str = "default") -> dict[str, object]:
-    salt = get_current_salt(tenant_id)
+async def _salts(context: AppContext, tenant_ids: list[str]) -> dict[str, dict | None]:
+    salts = context.salts.cached(tenant_ids)
+    if salts is None:
+        # first request for a tenant waits for Vault, but on a worker thread
+        salts = await run_in_threadpool(context.salts.get_many, tenant_ids)
+    return salts
+
+
+def _tenant_salt(tenant_id: str, salt: dict | None) -> TenantSalt:
     if not salt:
-        return {"tenant_id": tenant_id, "salt_ver": 0, "salt": ""}
-    return {
-        "tenant_id": tenant_id,
-        "salt_ver": salt.get("ver", 0),
-        "salt": salt.get("value", ""),
-    }
+        return TenantSalt(tenant_id=tenant_id)
+    return TenantSalt(tenant_id=tenant_id, salt_ver=salt.get("ver", 0), salt=salt.get("value", ""))
+
+
+@router.get("/tenant/salt")
+async def get_tenant_salt(
+    tenant_id: str = "default",
+    *,
+    context: AppContext = Depends(provide_context),
+) -> dict[str, object]:
+    salts = await _salts(context, [tenant_id])
+    return _tenant_salt(tenant_id, salts[tenant_id]).model_dump()
+
+
+@router.post("/tenant/salts", response_model=TenantSaltsResponse)
+async def get_tenant_salts(
+    req: TenantSaltsRequest,
+    *,
+    x_api_key: str | None = Header(default=None),
+    context: AppContext = Depends(provide_context),
+) -> TenantSaltsResponse:
+    """Current salts for many tenants in request order; uncached tenants are fetched in parallel."""
+
+    tenant_ids = list(dict.fromkeys(req.tenant_ids))
+    for tenant_id in tenant_ids:
+        context.api_keys.enforce(tenant_id, x_api_key)
+
+    salts = await _salts(context, tenant_ids)
+    return TenantSaltsResponse(salts=[_tenant_salt(tenant_id, salts[tenant_id]) for tenant_id in req.tenant_ids])
@@ -15,10 +15,49 @@ class Settings(BaseModel):
     alpha_vec: float = float(os.getenv("ALPHA_VEC", 0.6))
     beta_bm25: float = float(os.getenv("BETA_BM25", 0.4))
     rrf_k: int = int(os.getenv("RRF_K", 60))
+    embed_batch_max_size: int = int(os.getenv("EMBED_BATCH_MAX_SIZE", 32))
+    embed_batch_max_wait_ms: float = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", 2))
+    rerank_batch_max_size: int = int(os.getenv("RERANK_BATCH_MAX_SIZE", 64))
+    rerank_batch_max_wait_ms: float = float(os.getenv("RERANK_BATCH_MAX_WAIT_MS", 2))
+    onnx_model_dir: str = os.getenv("ONNX_MODEL_DIR", "/app/server/models/onnx")
+    inference_socket: str = os.getenv("INFERENCE_SOCKET", "/tmp/code-indexing-inference.sock")
+    inference_timeout_s: float = float(os.getenv("INFERENCE_TIMEOUT_S", 30))
+    repo_catalog_ttl_s: int = int(os.getenv("REPO_CATALOG_TTL_S", 60))
+    search_page_max_depth: int = int(os.getenv("SEARCH_PAGE_MAX_DEPTH", 4))
+    search_deadline_ms: float = float(os.getenv("SEARCH_DEADLINE_MS", 1500))
+    search_vector_budget_ms: float = float(os.getenv("SEARCH_VECTOR_BUDGET_MS", 1200))
+    search_bm25_budget_ms: float = float(os.getenv("SEARCH_BM25_BUDGET_MS", 800))
+    search_backend_workers: int = int(os.getenv("SEARCH_BACKEND_WORKERS", 32))
+    breaker_failure_threshold: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+    breaker_reset_s: float = float(os.getenv("BREAKER_RESET_S", 30))
+    exact_search_max_points: int = int(os.getenv("EXACT_SEARCH_MAX_POINTS", 2000))
+    hnsw_ef_max: int = int(os.getenv("HNSW_EF_MAX", 512))
+    vector_latency_target_ms: float = float(os.getenv("VECTOR_LATENCY_TARGET_MS", 50))
+    selectivity_ttl_s: int = int(os.getenv("SELECTIVITY_TTL_S", 300))
+    selectivity_cache_size: int = int(os.getenv("SELECTIVITY_CACHE_SIZE", 10000))
+    opensearch_analyzer_profile: str = os.getenv("OPENSEARCH_ANALYZER_PROFILE", "edge_ngram")
+    opensearch_analyzer_tenants: dict[str, str] = dict(
+        item.split("=", 1) for item in os.getenv("OPENSEARCH_ANALYZER_TENANTS", "").split(",") if "=" in item)
+    preview_lines: int = int(os.getenv("PREVIEW_LINES", 3))
+    preview_max_chars: int = int(os.getenv("PREVIEW_MAX_CHARS", 300))
+    query_routing: bool = os.getenv("QUERY_ROUTING", "true").lower() == "true"
+    symbol_index: str = os.getenv("SYMBOL_INDEX", "code_symbols")
+    symbol_index_ttl_s: int = int(os.getenv("SYMBOL_INDEX_TTL_S", 300))
+    symbol_index_max_repos: int = int(os.getenv("SYMBOL_INDEX_MAX_REPOS", 256))
+    suggest_candidates: int = int(os.getenv("SUGGEST_CANDIDATES", 500))
+    suggest_session_ttl_s: int = int(os.getenv("SUGGEST_SESSION_TTL_S", 120))
+    suggest_max_sessions: int = int(os.getenv("SUGGEST_MAX_SESSIONS", 10000))
+    semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))
+    semantic_cache_queries: int = int(os.getenv("SEMANTIC_CACHE_QUERIES", 256))
+    semantic_cache_scopes: int = int(os.getenv("SEMANTIC_CACHE_SCOPES", 1024))
+    semantic_cache_ttl_s: int = int(os.getenv("SEMANTIC_CACHE_TTL_S", 3600))
+    semantic_cache_max_mb: int = int(os.getenv("SEMANTIC_CACHE_MAX_MB", 64))
     learned_ranker_path: str = os.getenv("LEARNED_RANKER_PATH", "")
     privacy_repo_ids: set[str] = set(os.getenv("PRIVACY_REPOS", "").split(",")) if os.getenv("PRIVACY_REPOS") else set()
 
     def collection_for(self, tenant: str) -> str: return f"{self.qdrant_collection}_{tenant}"
     def index_for(self, tenant: str) -> str: return f"{self.opensearch_index}_{tenant}"
+    def symbol_index_for(self, tenant: str) -> str: return f"{self.symbol_index}_{tenant}"
+    def analyzer_profile_for(self, tenant: str) -> str: return self.opensearch_analyzer_tenants.get(tenant, self.opensearch_analyzer_profile)
 
 settings = Settings()
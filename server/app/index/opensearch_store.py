@@ -1,7 +1,55 @@
 
+from typing import Sequence
 from opensearchpy import OpenSearch, helpers
 from app.config import settings
 
+ANALYZER_PROFILES = ("edge_ngram", "code", "code_shingles")
+
+# identifiers stay whole in the tokenizer; word_delimiter_graph then splits camelCase, snake_case and digit runs
+_CODE_TOKENIZER = {"type":"pattern","pattern":"[^\\p{L}\\p{N}_]+"}
+_CODE_PARTS = {"type":"word_delimiter_graph","split_on_case_change":True,"split_on_numerics":True,
+               "generate_word_parts":True,"generate_number_parts":True,"stem_english_possessive":False}
+
+def index_mapping(profile: str = "edge_ngram") -> dict:
+    """Index body for an analyzer ``profile``.
+
+    ``edge_ngram`` is the original layout (2-20 char edge n-grams of every token). ``code`` indexes each
+    identifier lowercased plus its camelCase/snake_case/numeric sub-tokens, without n-grams; ``code_shingles``
+    adds a ``text.shingles`` subfield of adjacent sub-token pairs.
+    """
+    if profile not in ANALYZER_PROFILES: raise ValueError(f"unknown analyzer profile '{profile}'")
+    analyzer = {"path_analyzer": {"type":"custom","tokenizer":"path_hierarchy","filter":["lowercase"]}}
+    if profile == "edge_ngram":
+        analyzer["code_text"] = {"type":"custom","tokenizer":"standard","filter":["lowercase","word_delimiter_graph","asciifolding","edge_2_20"]}
+        analysis = {"analyzer": analyzer, "filter": {"edge_2_20":{"type":"edge_ngram","min_gram":2,"max_gram":20}}}
+        text = {"type":"text","analyzer":"code_text","search_analyzer":"standard"}
+    else:
+        analyzer["code_text"] = {"type":"custom","tokenizer":"code_tokens","filter":["code_parts","flatten_graph","lowercase","asciifolding"]}
+        analyzer["code_search"] = {"type":"custom","tokenizer":"code_tokens","filter":["code_parts","lowercase","asciifolding"]}
+        filters = {"code_parts": dict(_CODE_PARTS, preserve_original=True), "code_split": _CODE_PARTS}
+        text = {"type":"text","analyzer":"code_text","search_analyzer":"code_search"}
+        if profile == "code_shingles":
+            analyzer["code_shingle"] = {"type":"custom","tokenizer":"code_tokens","filter":["code_split","lowercase","asciifolding","code_pairs"]}
+            filters["code_pairs"] = {"type":"shingle","min_shingle_size":2,"max_shingle_size":2,"output_unigrams":False}
+            text["fields"] = {"shingles": {"type":"text","analyzer":"code_shingle"}}
+        analysis = {"analyzer": analyzer, "tokenizer": {"code_tokens": _CODE_TOKENIZER}, "filter": filters}
+    return {
+      "settings": {"index":{"number_of_shards":1,"number_of_replicas":0}, "analysis": analysis},
+      "mappings": {
+        "properties":{
+          "repo_id":{"type":"keyword"},
+          "chunk_id":{"type":"keyword"},
+          "path_tokens":{"type":"keyword"},
+          "rel_path":{"type":"text","analyzer":"path_analyzer","fields":{"keyword":{"type":"keyword"}}},
+          "lang":{"type":"keyword"},
+          "is_test":{"type":"boolean"},
+          "line_start":{"type":"integer"},
+          "line_end":{"type":"integer"},
+          "text": text
+        }
+      }
+    }
+
 class OSStore:
     def __init__(self, client: OpenSearch | None = None):
         self.client = client or OpenSearch(settings.opensearch_url)
@@ -10,30 +58,7 @@ class OSStore:
         idx = settings.index_for(tenant)
         if self.client.indices.exists(index=idx):
             return idx
-        mapping = {
-          "settings": {
-            "index":{"number_of_shards":1,"number_of_replicas":0},
-            "analysis": {
-              "analyzer": {
-                "code_text": {"type":"custom","tokenizer":"standard","filter":["lowercase","word_delimiter_graph","asciifolding","edge_2_20"]},
-                "path_analyzer": {"type":"custom","tokenizer":"path_hierarchy","filter":["lowercase"]}
-              },
-              "filter": {"edge_2_20":{"type":"edge_ngram","min_gram":2,"max_gram":20}}
-            }
-          },
-          "mappings": {
-            "properties":{
-              "repo_id":{"type":"keyword"},
-              "chunk_id":{"type":"keyword"},
-              "path_tokens":{"type":"keyword"},
-              "rel_path":{"type":"text","analyzer":"path_analyzer","fields":{"keyword":{"type":"keyword"}}},
-              "lang":{"type":"keyword"},
-              "line_start":{"type":"integer"},
-              "line_end":{"type":"integer"},
-              "text":{"type":"text","analyzer":"code_text","search_analyzer":"standard"}
-            }
-          }
-        }
+        mapping = index_mapping(settings.analyzer_profile_for(tenant))
         self.client.indices.create(index=idx, body=mapping)
         return idx
 
@@ -42,19 +67,86 @@ class OSStore:
         actions = [{"_op_type":"index","_index":idx,"_id":d["chunk_id"],"_source":d} for d in docs]
         helpers.bulk(self.client, actions)
 
-    def bm25_tenant(self, tenant: str, repo_id: str, query: str, top_k: int, lang: str | None = None, dir_hint: str | None = None, exclude_tests: bool = False):
-        idx = settings.index_for(tenant)
-        filters = [{"term":{"repo_id.keyword": repo_id}}]
+    @staticmethod
+    def _bm25_body(repo_id: str | Sequence[str], query: str, top_k: int, lang: str | None = None, dir_hint: str | None = None, exclude_tests: bool = False) -> dict:
+        repos = [repo_id] if isinstance(repo_id, str) else list(repo_id)
+        filters = [{"term":{"repo_id": repos[0]}} if len(repos) == 1 else {"terms":{"repo_id": repos}}]
         if lang: filters.append({"term":{"lang": lang}})
         if dir_hint: filters.append({"prefix":{"rel_path": dir_hint}})
-        must_not = [{"wildcard":{"rel_path":"*test*"}}] if exclude_tests else []
-        body = {
+        # a term on the indexed flag is as cheap as the other filters (the old wildcard *test* was not)
+        must_not = [{"term":{"is_test": True}}] if exclude_tests else []
+        return {
             "size": top_k,
-            "query": {"bool":{"must":[{"match":{"text":query}}],"filter":filters,"must_not":must_not}},
-            "_source": ["chunk_id","path_tokens","rel_path","line_start","line_end","repo_id","text"]
+            # text.shingles only exists in code_shingles indexes; elsewhere the clause matches nothing
+            "query": {"bool":{"must":[{"match":{"text":query}}],"should":[{"match":{"text.shingles":query}}],"filter":filters,"must_not":must_not}},
+            # a snippet around the best match instead of the whole chunk; full text is fetched later for the final top-k only
+            "_source": ["chunk_id","path_tokens","rel_path","line_start","line_end","repo_id"],
+            "highlight": {"pre_tags": [""], "post_tags": [""],
+                          "fields": {"text": {"type":"unified","number_of_fragments":1,"fragment_size":settings.preview_max_chars,
+                                              "no_match_size":settings.preview_max_chars}}}
         }
-        resp = self.client.search(index=idx, body=body)
+
+    @staticmethod
+    def _snippet(h: dict) -> str | None:
+        frags = (h.get("highlight") or {}).get("text") or []
+        if not frags: return None
+        return "\n".join(frags[0].strip("\n").splitlines()[:settings.preview_lines])
+
+    @classmethod
+    def _hits(cls, resp: dict) -> list[dict]:
         hits = []
         for h in resp["hits"]["hits"]:
-            s = h["_source"]; s["score"] = h["_score"]; hits.append(s)
+            s = h["_source"]; s["score"] = h["_score"]; s["preview"] = cls._snippet(h); hits.append(s)
         return hits
+
+    def fetch_texts(self, tenant: str, chunk_ids: Sequence[str]) -> dict[str, str]:
+        """Full chunk text for ``chunk_ids`` (missing ids are left out)."""
+        if not chunk_ids: return {}
+        body = {"docs": [{"_id": cid, "_source": ["text"]} for cid in chunk_ids]}
+        resp = self.client.mget(index=settings.index_for(tenant), body=body)
+        return {d["_id"]: d["_source"].get("text") or "" for d in resp["docs"] if d.get("found")}
+
+    def bm25_tenant(self, tenant: str, repo_id: str | Sequence[str], query: str, top_k: int, lang: str | None = None, dir_hint: str | None = None, exclude_tests: bool = False,
+                    timeout_s: float | None = None):
+        idx = settings.index_for(tenant)
+        body = self._bm25_body(repo_id, query, top_k, lang=lang, dir_hint=dir_hint, exclude_tests=exclude_tests)
+        resp = self.client.search(index=idx, body=body, **({"request_timeout": timeout_s} if timeout_s else {}))
+        return self._hits(resp)
+
+    def repo_ids(self, tenant: str, limit: int = 10000) -> list[str]:
+        """Return the distinct ``repo_id`` values indexed for ``tenant``."""
+        idx = settings.index_for(tenant)
+        if not self.client.indices.exists(index=idx): return []
+        body = {"size": 0, "aggs": {"repos": {"terms": {"field": "repo_id", "size": limit}}}}
+        resp = self.client.search(index=idx, body=body)
+        return [b["key"] for b in resp["aggregations"]["repos"]["buckets"]]
+
+    def rel_paths(self, tenant: str, repo_id: str, page_size: int = 1000) -> list[str]:
+        """Return the distinct ``rel_path`` values indexed for one repo (paged composite aggregation)."""
+        idx = settings.index_for(tenant)
+        if not self.client.indices.exists(index=idx): return []
+        paths: list[str] = []; after = None
+        while True:
+            comp = {"size": page_size, "sources": [{"path": {"terms": {"field": "rel_path.keyword"}}}]}
+            if after: comp["after"] = after
+            body = {"size": 0, "query": {"term": {"repo_id": repo_id}}, "aggs": {"paths": {"composite": comp}}}
+            agg = self.client.search(index=idx, body=body)["aggregations"]["paths"]
+            paths.extend(b["key"]["path"] for b in agg["buckets"])
+            after = agg.get("after_key")
+            if not after or len(agg["buckets"]) < page_size: return paths
+
+    def bm25_msearch(self, searches: list[dict], timeout_s: float | None = None) -> list[list[dict]]:
+        """Run several ``bm25_tenant`` queries in one ``_msearch`` round trip.
+
+        Each item holds ``bm25_tenant`` keyword arguments (``tenant``, ``repo_id``,
+        ``query``, ``top_k`` and optional filters). A failed sub-search yields an
+        empty hit list so one bad tenant index does not fail the whole batch.
+        """
+        if not searches: return []
+        body: list[dict] = []
+        for s in searches:
+            body.append({"index": settings.index_for(s["tenant"])})
+            body.append(self._bm25_body(s["repo_id"], s["query"], s["top_k"], lang=s.get("lang"),
+                                        dir_hint=s.get("dir_hint"), exclude_tests=bool(s.get("exclude_tests"))))
+        resp = self.client.msearch(body=body, **({"request_timeout": timeout_s} if timeout_s else {}))
+        return [self._hits(r) if "hits" in r else [] for r in resp["responses"]]
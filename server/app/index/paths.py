@@ -0,0 +1,13 @@
+"""Path-derived fields stored alongside indexed chunks."""
+import re
+
+# same rule as the indexing client (client/cli_index.py)
+_TEST_PATH = re.compile(r'(?:^|/)(test_|tests/|.*_test\.\w+$)')
+
+def path_prefixes(rel_path: str | None) -> list[str]:
+    """Every directory prefix of ``rel_path`` plus the path itself: ``a/b/c.py`` -> ``[a, a/b, a/b/c.py]``."""
+    parts = [p for p in (rel_path or "").strip("/").split("/") if p]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+def is_test_path(rel_path: str | None) -> bool:
+    return bool(rel_path and _TEST_PATH.search(rel_path))
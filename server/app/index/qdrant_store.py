@@ -1,10 +1,16 @@
 
-from typing import Optional
+from typing import Optional, Sequence
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct, Distance, VectorParams
+from qdrant_client.http.models import PointStruct, Distance, VectorParams, PayloadSchemaType, SearchRequest as QSearchRequest
 
 from app.config import settings
 
+# payload fields used by search filters; keyword/bool indexes let Qdrant plan filtered HNSW searches
+PAYLOAD_INDEXES = {"repo_id": PayloadSchemaType.KEYWORD, "lang": PayloadSchemaType.KEYWORD,
+                   "is_test": PayloadSchemaType.BOOL, "path_prefixes": PayloadSchemaType.KEYWORD}
+# payload returned with vector hits: what fusion and SearchHit need, not the filter-only fields
+HIT_PAYLOAD = ["chunk_id", "repo_id", "path_tokens", "line_start", "line_end"]
+
 class QdrantStore:
     def __init__(self, client: Optional[QdrantClient] = None):
         self.client = client or QdrantClient(url=settings.qdrant_url)
@@ -19,18 +25,69 @@ class QdrantStore:
                 vectors_config=VectorParams(size=size, distance=Distance.COSINE),
                 hnsw_config={"m": 32, "ef_construct": 128}
             )
+            self.ensure_payload_indexes(tenant)
+        return coll
+
+    def ensure_payload_indexes(self, tenant: str):
+        """Create the filter payload indexes (idempotent, also used to upgrade existing collections)."""
+        coll = settings.collection_for(tenant)
+        for field, schema in PAYLOAD_INDEXES.items():
+            self.client.create_payload_index(collection_name=coll, field_name=field, field_schema=schema)
         return coll
 
     def upsert_tenant(self, tenant: str, points):
         coll = self.ensure_collection(tenant)
         return self.client.upsert(collection_name=coll, points=list(points))
 
-    def search_tenant(self, tenant: str, vector, repo_id: str, top_k: int,
-                      lang: str | None = None, dir_hint: str | None = None, exclude_tests: bool = False, hnsw_ef: int | None = None):
-        coll = settings.collection_for(tenant)
-        flt = {"must":[{"key":"repo_id","match":{"value":repo_id}}]}
+    @staticmethod
+    def _filter(repo_id: str | Sequence[str], lang: str | None = None, dir_hint: str | None = None, exclude_tests: bool = False) -> dict:
+        repos = [repo_id] if isinstance(repo_id, str) else list(repo_id)
+        match = {"value": repos[0]} if len(repos) == 1 else {"any": repos}
+        flt = {"must":[{"key":"repo_id","match":match}]}
         if lang: flt["must"].append({"key":"lang","match":{"value":lang}})
-        if dir_hint: flt["must"].append({"key":"rel_path","match":{"text":dir_hint}})
-        if exclude_tests: flt.setdefault("must_not", []).append({"key":"rel_path","match":{"text":"test"}})
-        params = {"hnsw_ef": hnsw_ef} if hnsw_ef else None
-        return self.client.search(collection_name=coll, query_vector=vector, limit=top_k, query_filter=flt, search_params=params)
+        if dir_hint: flt["must"].append({"key":"path_prefixes","match":{"value":dir_hint.strip("/")}})
+        # must_not(is_test) rather than must(!is_test) keeps points indexed before the field existed
+        if exclude_tests: flt.setdefault("must_not", []).append({"key":"is_test","match":{"value":True}})
+        return flt
+
+    @staticmethod
+    def _params(hnsw_ef: int | None = None, exact: bool = False) -> dict | None:
+        if exact: return {"exact": True}
+        return {"hnsw_ef": hnsw_ef} if hnsw_ef else None
+
+    def count_tenant(self, tenant: str, repo_id: str | Sequence[str], lang: str | None = None, dir_hint: str | None = None,
+                     exclude_tests: bool = False, exact: bool = False) -> int:
+        """Number of points matching the search filter (approximate unless ``exact``)."""
+        flt = self._filter(repo_id, lang=lang, dir_hint=dir_hint, exclude_tests=exclude_tests)
+        return int(self.client.count(collection_name=settings.collection_for(tenant), count_filter=flt, exact=exact).count)
+
+    def search_tenant(self, tenant: str, vector, repo_id: str | Sequence[str], top_k: int,
+                      lang: str | None = None, dir_hint: str | None = None, exclude_tests: bool = False, hnsw_ef: int | None = None,
+                      exact: bool = False):
+        coll = settings.collection_for(tenant)
+        flt = self._filter(repo_id, lang=lang, dir_hint=dir_hint, exclude_tests=exclude_tests)
+        params = self._params(hnsw_ef, exact)
+        return self.client.search(collection_name=coll, query_vector=vector, limit=top_k, query_filter=flt, search_params=params,
+                                  with_payload=HIT_PAYLOAD)
+
+    def search_batch(self, searches: list[dict]):
+        """Run several ``search_tenant`` queries with one ``search_batch`` call per tenant.
+
+        Each item holds ``search_tenant`` keyword arguments (``tenant``, ``vector``,
+        ``repo_id``, ``top_k`` and optional filters/``hnsw_ef``/``exact``). Results are
+        returned in input order.
+        """
+        by_tenant: dict[str, list[int]] = {}
+        for i, s in enumerate(searches):
+            by_tenant.setdefault(s["tenant"], []).append(i)
+        results: list = [[] for _ in searches]
+        for tenant, indices in by_tenant.items():
+            requests = []
+            for i in indices:
+                s = searches[i]
+                flt = self._filter(s["repo_id"], lang=s.get("lang"), dir_hint=s.get("dir_hint"), exclude_tests=bool(s.get("exclude_tests")))
+                params = self._params(s.get("hnsw_ef"), bool(s.get("exact")))
+                requests.append(QSearchRequest(vector=list(s["vector"]), filter=flt, limit=s["top_k"], params=params, with_payload=HIT_PAYLOAD))
+            found = self.client.search_batch(collection_name=settings.collection_for(tenant), requests=requests)
+            for i, hits in zip(indices, found): results[i] = hits
+        return results
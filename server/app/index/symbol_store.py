@@ -0,0 +1,52 @@
+import hashlib
+from typing import Sequence
+from opensearchpy import OpenSearch, helpers
+from app.config import settings
+
+SYMBOL_MAPPING = {
+  "settings": {"index":{"number_of_shards":1,"number_of_replicas":0}},
+  "mappings": {
+    "properties":{
+      "repo_id":{"type":"keyword"},
+      "rel_path":{"type":"keyword"},
+      "name":{"type":"keyword"},
+      "qualified_name":{"type":"keyword"},
+      "kind":{"type":"keyword"},
+      "line_start":{"type":"integer"},
+      "line_end":{"type":"integer"}
+    }
+  }
+}
+
+class SymbolStore:
+    """Per-tenant OpenSearch keyword index of symbols; the source of truth behind ``SymbolIndex``."""
+    def __init__(self, client: OpenSearch | None = None):
+        self.client = client or OpenSearch(settings.opensearch_url)
+
+    def ensure_index(self, tenant: str):
+        idx = settings.symbol_index_for(tenant)
+        if not self.client.indices.exists(index=idx):
+            self.client.indices.create(index=idx, body=SYMBOL_MAPPING)
+        return idx
+
+    @staticmethod
+    def _doc_id(repo_id: str, s: dict) -> str:
+        key = f"{repo_id}\0{s['rel_path']}\0{s['qualified_name']}\0{s['line_start']}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def replace(self, tenant: str, repo_id: str, paths: Sequence[str], symbols: list[dict]) -> int:
+        """Drop the symbols of ``paths`` in ``repo_id`` and index ``symbols`` in their place."""
+        idx = self.ensure_index(tenant)
+        if paths:
+            query = {"query": {"bool": {"filter": [{"term": {"repo_id": repo_id}}, {"terms": {"rel_path": list(paths)}}]}}}
+            self.client.delete_by_query(index=idx, body=query, refresh=True, conflicts="proceed")
+        actions = [{"_op_type":"index","_index":idx,"_id":self._doc_id(repo_id, s),"_source":dict(s, repo_id=repo_id)} for s in symbols]
+        if actions: helpers.bulk(self.client, actions, refresh=True)
+        return len(actions)
+
+    def load(self, tenant: str, repo_id: str) -> list[dict]:
+        """Every symbol of ``repo_id``."""
+        idx = settings.symbol_index_for(tenant)
+        if not self.client.indices.exists(index=idx): return []
+        query = {"query": {"term": {"repo_id": repo_id}}}
+        return [h["_source"] for h in helpers.scan(self.client, index=idx, query=query, size=5000)]
@@ -0,0 +1,194 @@
+"""Shared local inference server for embedding and reranking.
+
+Run one server (optionally a small pre-forked pool) per host and point API
+workers at it with ``EMBED_PROVIDER=inference-server`` and
+``RERANKER_PROVIDER=inference-server``. The models are then loaded once per
+inference process instead of once per uvicorn worker, and concurrent requests
+from every worker share micro-batches.
+
+Usage::
+
+    PYTHONPATH=server python -m app.inference_server --workers 2
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socketserver
+import time
+from typing import Any, Tuple
+
+from app.config import settings
+from app.search.providers.batching import BatchingConfig
+from app.search.providers.embedding import EmbeddingProvider, build_embedding_provider
+from app.search.providers.remote import encode_matrix, recv_message, send_message
+from app.search.providers.reranker import CrossEncoderProvider, build_reranker_provider
+from app.utils.logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+_REMOTE_KEYS = {"inference-server", "remote", "ipc"}
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket server answering ``embed`` and ``rerank`` requests."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        embedder: EmbeddingProvider,
+        reranker: CrossEncoderProvider,
+    ) -> None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.embedder = embedder
+        self.reranker = reranker
+        super().__init__(socket_path, _InferenceHandler)
+
+    def handle_request_message(self, header: dict[str, Any]) -> Tuple[dict[str, Any], bytes]:
+        op = header.get("op")
+        if op == "embed":
+            values = self.embedder.encode(
+                list(header.get("texts", [])),
+                normalize_embeddings=bool(header.get("normalize", True)),
+            )
+        elif op == "rerank":
+            pairs = [(str(q), str(p)) for q, p in header.get("pairs", [])]
+            values = self.reranker.score_pairs(pairs)
+        elif op == "info":
+            return {"ok": True, "embed_model_id": self.embedder.model_id()}, b""
+        elif op == "ping":
+            values = []
+        else:
+            return {"ok": False, "error": f"unknown op '{op}'"}, b""
+        shape, body = encode_matrix(values)
+        return {"ok": True, "shape": shape}, body
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)  # type: ignore[arg-type]
+        except OSError:
+            pass
+
+
+class _InferenceHandler(socketserver.BaseRequestHandler):
+    server: InferenceServer
+
+    def handle(self) -> None:
+        while True:
+            try:
+                header, _body = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                response, body = self.server.handle_request_message(header)
+            except Exception as exc:  # report to the caller, keep serving
+                logger.exception("Inference request failed")
+                response, body = {"ok": False, "error": str(exc)}, b""
+            send_message(self.request, response, body)
+
+
+def build_server(
+    socket_path: str,
+    embed_provider: str | None = None,
+    reranker_provider: str | None = None,
+) -> InferenceServer:
+    if (embed_provider or "").strip().lower() in _REMOTE_KEYS or (
+        reranker_provider or ""
+    ).strip().lower() in _REMOTE_KEYS:
+        raise ValueError("the inference server cannot use the inference-server provider itself")
+    embedder, _, _ = build_embedding_provider(
+        embed_provider,
+        settings.embed_model,
+        batching=BatchingConfig(settings.embed_batch_max_size, settings.embed_batch_max_wait_ms),
+    )
+    reranker, _, _ = build_reranker_provider(
+        reranker_provider,
+        settings.reranker_model,
+        batching=BatchingConfig(settings.rerank_batch_max_size, settings.rerank_batch_max_wait_ms),
+    )
+    return InferenceServer(socket_path, embedder, reranker)
+
+
+def _exit_on_signal(signum: int, _frame: Any) -> None:
+    # unwinds serve_forever() so the ``finally`` in main() runs
+    raise SystemExit(128 + signum)
+
+
+def _stop_children(children: list[int], timeout_s: float = 10.0) -> None:
+    """SIGTERM the forked workers and reap them, SIGKILLing any still alive after ``timeout_s``."""
+
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    deadline = time.monotonic() + timeout_s
+    pending = set(children)
+    while pending:
+        for pid in list(pending):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                pending.discard(pid)
+        if not pending:
+            return
+        if time.monotonic() >= deadline:
+            for pid in pending:
+                logger.warning("Inference worker %s did not stop; killing it", pid)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                except OSError:
+                    pass
+            return
+        time.sleep(0.05)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Serve embedding and reranking over a Unix socket")
+    ap.add_argument("--socket", default=settings.inference_socket)
+    ap.add_argument("--workers", type=int, default=int(os.getenv("INFERENCE_WORKERS", "1")))
+    ap.add_argument("--embed-provider", default=os.getenv("INFERENCE_EMBED_PROVIDER"))
+    ap.add_argument("--reranker-provider", default=os.getenv("INFERENCE_RERANKER_PROVIDER"))
+    args = ap.parse_args()
+
+    configure_logging()
+    server = build_server(args.socket, args.embed_provider, args.reranker_provider)
+    os.chmod(args.socket, 0o660)
+    # Providers load their models lazily, so forking after bind gives each
+    # worker its own model copy while all of them accept on the same socket.
+    # Workers inherit the handlers; the parent stops and reaps them on exit.
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    signal.signal(signal.SIGINT, _exit_on_signal)
+    children: list[int] = []
+    is_parent = True
+    for _ in range(max(1, args.workers) - 1):
+        pid = os.fork()
+        if pid == 0:
+            is_parent = False
+            break
+        children.append(pid)
+    logger.info("Inference server listening on %s (pid %s)", args.socket, os.getpid())
+    try:
+        server.serve_forever()
+    finally:
+        if is_parent:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            _stop_children(children)
+            server.server_close()
+        else:
+            server.socket.close()  # the parent unlinks the socket path
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ import json
 import logging
 import os
 import pathlib
+import sqlite3
+import uuid
 
 from fastapi import FastAPI
 
@@ -13,15 +15,26 @@ from app.api.context import AppContext
 from app.config import settings
 from app.index.opensearch_store import OSStore
 from app.index.qdrant_store import QdrantStore
+from app.index.symbol_store import SymbolStore
 from app.search.hybrid_search import HybridSearch
+from app.search.providers.batching import BatchingConfig
 from app.search.providers.embedding import build_embedding_provider
 from app.search.providers.reranker import build_reranker_provider
 from app.search.reranker import CrossEncoderReranker
+from app.search.semantic_cache import SemanticCache
+from app.search.suggest import Suggester
+from app.search.symbol_index import SymbolIndex
+from app.services.admission import AdmissionController, AdmissionPool
 from app.services.api_key import APIKeyValidator
 from app.services.cache import EmbeddingCache, SearchCache
+from app.services.embedding_store import EmbeddingStore
+from app.services.index_generation import IndexGenerations
+from app.services.invalidation import InvalidationBus
 from app.services.metrics import StatsTracker
 from app.services.rate_limit import RateLimiter
+from app.services.salt_cache import SaltCache
 from app.utils.redis_client import create_redis_client
+from app.utils.vault import fetch_current_salt, get_current_fallback_salt
 from app.utils.logging import RequestIdMiddleware, configure_logging
 
 configure_logging()
@@ -30,9 +43,43 @@ logger = logging.getLogger(__name__)
 TENANT_FILE = pathlib.Path("/app/server/data/tenants.json")
 REQUIRE_API_KEY = os.getenv("REQUIRE_API_KEY", "false").lower() == "true"
 SEARCH_RATE_PER_MIN = int(os.getenv("LIMIT_SEARCH_PER_MINUTE", "120"))
+ENDPOINT_RATES_PER_MIN = {
+    name: int(limit)
+    for name, limit in (
+        item.split("=", 1)
+        for item in os.getenv("LIMIT_ENDPOINTS_PER_MINUTE", "suggest=600,symbols=600").split(",")
+        if "=" in item
+    )
+}
+TENANT_RATE_PER_MIN = int(os.getenv("LIMIT_TENANT_PER_MINUTE", "0"))
+TENANT_RATES_PER_MIN = {
+    name: int(limit)
+    for name, limit in (
+        item.split("=", 1) for item in os.getenv("LIMIT_TENANTS_PER_MINUTE", "").split(",") if "=" in item
+    )
+}
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "10000"))
 EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
 EMBED_CACHE_TTL_S = int(os.getenv("EMBED_CACHE_TTL_S", "3600"))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float32")
+EMBED_STORE_PATH = os.getenv("EMBED_STORE_PATH", "/app/server/data/embeddings.sqlite3")
+EMBED_STORE_MAX_MB = int(os.getenv("EMBED_STORE_MAX_MB", "2048"))
 SEARCH_CACHE_TTL_S = int(os.getenv("SEARCH_CACHE_TTL_S", "30"))
+SEARCH_CACHE_SHARED_TTL_S = int(os.getenv("SEARCH_CACHE_SHARED_TTL_S", "3600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "10000"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+SEARCH_CACHE_SWEEP_S = float(os.getenv("SEARCH_CACHE_SWEEP_S", "60"))
+SALT_CACHE_TTL_S = float(os.getenv("SALT_CACHE_TTL_S", "300"))
+SALT_REFRESH_AHEAD_S = float(os.getenv("SALT_REFRESH_AHEAD_S", "60"))
+SALT_RETRY_S = float(os.getenv("SALT_RETRY_S", "10"))
+SALT_FETCH_WORKERS = int(os.getenv("SALT_FETCH_WORKERS", "4"))
+ADMISSION_SEARCH_CONCURRENCY = int(os.getenv("ADMISSION_SEARCH_CONCURRENCY", "32"))
+ADMISSION_SEARCH_QUEUE = int(os.getenv("ADMISSION_SEARCH_QUEUE", "256"))
+ADMISSION_SEARCH_MAX_WAIT_S = float(os.getenv("ADMISSION_SEARCH_MAX_WAIT_S", "1"))
+ADMISSION_INGEST_CONCURRENCY = int(os.getenv("ADMISSION_INGEST_CONCURRENCY", "4"))
+ADMISSION_INGEST_QUEUE = int(os.getenv("ADMISSION_INGEST_QUEUE", "64"))
+ADMISSION_INGEST_MAX_WAIT_S = float(os.getenv("ADMISSION_INGEST_MAX_WAIT_S", "30"))
+ADMISSION_TENANT_SHARE = float(os.getenv("ADMISSION_TENANT_SHARE", "0.5"))
 REDIS_URL = os.getenv("REDIS_URL")
 
 
@@ -54,9 +101,35 @@ def _load_tenant_keys(path: pathlib.Path) -> dict[str, list[str]]:
     return normalized
 
 
+def _open_embedding_store(model_id: str) -> EmbeddingStore | None:
+    if not EMBED_STORE_PATH:
+        return None
+    try:
+        store = EmbeddingStore(
+            EMBED_STORE_PATH,
+            model_id,
+            max_bytes=EMBED_STORE_MAX_MB * 1024 * 1024,
+            dtype=EMBED_CACHE_DTYPE,
+        )
+    except (sqlite3.Error, OSError):
+        logger.exception("Failed to open embedding store at %s", EMBED_STORE_PATH)
+        return None
+    # Rows of other models are dropped by scripts/compact_embedding_store.py,
+    # not here: workers of a rolling deploy may still be using them.
+    return store
+
+
 def create_app() -> FastAPI:
+    stats = StatsTracker()
+
     embed_provider, embed_key, embed_fallback = build_embedding_provider(
-        os.getenv("EMBED_PROVIDER"), settings.embed_model
+        os.getenv("EMBED_PROVIDER"),
+        settings.embed_model,
+        batching=BatchingConfig(
+            max_batch_size=settings.embed_batch_max_size,
+            max_wait_ms=settings.embed_batch_max_wait_ms,
+        ),
+        observer=stats.record_batch,
     )
     if embed_fallback:
         logger.warning(
@@ -66,7 +139,13 @@ def create_app() -> FastAPI:
         )
 
     reranker_provider, reranker_key, reranker_fallback = build_reranker_provider(
-        os.getenv("RERANKER_PROVIDER"), settings.reranker_model
+        os.getenv("RERANKER_PROVIDER"),
+        settings.reranker_model,
+        batching=BatchingConfig(
+            max_batch_size=settings.rerank_batch_max_size,
+            max_wait_ms=settings.rerank_batch_max_wait_ms,
+        ),
+        observer=stats.record_batch,
     )
     if reranker_fallback:
         logger.warning(
@@ -75,13 +154,23 @@ def create_app() -> FastAPI:
             reranker_key,
         )
 
+    try:
+        embed_model_id: str | None = embed_provider.model_id()
+    except Exception:  # e.g. the inference server is not up yet
+        logger.exception("Could not identify the %s embedding model; not persisting embeddings", embed_key)
+        embed_model_id = None
+
     qdrant = QdrantStore()
     opensearch = OSStore()
 
     redis_client = create_redis_client(REDIS_URL)
+    bus = InvalidationBus(redis_client)
+    bus.start()
+    generations = IndexGenerations(redis_client=redis_client, bus=bus)
 
     searcher = HybridSearch(qdrant, opensearch, embed_provider)
     reranker = CrossEncoderReranker(provider=reranker_provider)
+    symbols = SymbolIndex(SymbolStore(opensearch.client))
 
     context = AppContext(
         qdrant=qdrant,
@@ -93,17 +182,65 @@ def create_app() -> FastAPI:
             EMBED_CACHE_SIZE,
             redis_client=redis_client,
             ttl_seconds=EMBED_CACHE_TTL_S,
+            dtype=EMBED_CACHE_DTYPE,
+            # an unidentified model gets a process-private Redis namespace and no disk store
+            model_id=embed_model_id or f"unidentified:{uuid.uuid4().hex}",
+            store=_open_embedding_store(embed_model_id) if embed_model_id else None,
         ),
         search_cache=SearchCache(
             SEARCH_CACHE_TTL_S,
             redis_client=redis_client,
+            max_entries=SEARCH_CACHE_MAX_ENTRIES,
+            max_bytes=SEARCH_CACHE_MAX_BYTES,
+            sweep_interval_s=SEARCH_CACHE_SWEEP_S,
+            bus=bus,
+            # index generation bumps only reach other workers through Redis and the bus;
+            # the long TTL applies only while both work, re-checked on every write
+            shared_ttl_seconds=SEARCH_CACHE_SHARED_TTL_S,
+            generations=generations,
         ),
+        semantic_cache=SemanticCache(),
         rate_limiter=RateLimiter(
             SEARCH_RATE_PER_MIN,
+            endpoint_limits=ENDPOINT_RATES_PER_MIN,
+            tenant_limit_per_minute=TENANT_RATE_PER_MIN,
+            tenant_limits=TENANT_RATES_PER_MIN,
+            max_buckets=RATE_LIMIT_MAX_BUCKETS,
             redis_client=redis_client,
         ),
         api_keys=APIKeyValidator(_load_tenant_keys(TENANT_FILE), REQUIRE_API_KEY),
-        stats=StatsTracker(),
+        stats=stats,
+        symbols=symbols,
+        suggester=Suggester(symbols, opensearch),
+        generations=generations,
+        salts=SaltCache(
+            fetch_current_salt,
+            fallback=get_current_fallback_salt,
+            ttl_s=SALT_CACHE_TTL_S,
+            refresh_ahead_s=SALT_REFRESH_AHEAD_S,
+            retry_s=SALT_RETRY_S,
+            workers=SALT_FETCH_WORKERS,
+            refresh_interval_s=max(1.0, SALT_REFRESH_AHEAD_S / 2),
+        ),
+        admission=AdmissionController(
+            [
+                AdmissionPool(
+                    "search",
+                    ADMISSION_SEARCH_CONCURRENCY,
+                    max_queue=ADMISSION_SEARCH_QUEUE,
+                    max_wait_s=ADMISSION_SEARCH_MAX_WAIT_S,
+                    tenant_share=ADMISSION_TENANT_SHARE,
+                    priority=1,
+                ),
+                AdmissionPool(
+                    "ingest",
+                    ADMISSION_INGEST_CONCURRENCY,
+                    max_queue=ADMISSION_INGEST_QUEUE,
+                    max_wait_s=ADMISSION_INGEST_MAX_WAIT_S,
+                    tenant_share=ADMISSION_TENANT_SHARE,
+                ),
+            ]
+        ),
     )
 
     app = FastAPI(title="Hybrid Code Indexing (Advanced)")
@@ -1,6 +1,8 @@
 
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
+
+BATCH_SEARCH_MAX = 256
 
 class ChunkMeta(BaseModel):
     tenant_id: str = "default"
@@ -22,12 +24,27 @@ class UploadRequest(BaseModel):
 
 class SearchRequest(BaseModel):
     tenant_id: str = "default"
-    repo_id: str
+    repo_id: Optional[str] = None
+    repo_ids: Optional[List[str]] = Field(default=None, max_length=1000)
+    repo_glob: Optional[str] = None
+    per_repo_limit: Optional[int] = Field(default=None, ge=1)
     query: str
     top_k: int = 12
     lang: Optional[str] = None
     dir_hint: Optional[str] = None
     exclude_tests: bool = False
+    cursor: Optional[str] = None
+    deadline_ms: Optional[int] = Field(default=None, ge=10, le=60000)
+    semantic_cache: bool = False
+
+    @model_validator(mode="after")
+    def _require_repo_scope(self) -> "SearchRequest":
+        if not (self.repo_id or self.repo_ids or self.repo_glob):
+            raise ValueError("one of repo_id, repo_ids or repo_glob is required")
+        return self
+
+class StreamSearchRequest(SearchRequest):
+    rerank: bool = False
 
 class SearchHit(BaseModel):
     chunk_id: str
@@ -37,11 +54,89 @@ class SearchHit(BaseModel):
     repo_id: str
     preview: Optional[str] = None
 
+class SemanticCacheMatch(BaseModel):
+    query: str
+    similarity: float
+    search_id: str
+
 class SearchResponse(BaseModel):
     search_id: str | None = None
     bucket: Optional[str] = None
     need_fetch_lines: bool = False
     hits: List[SearchHit]
+    next_cursor: Optional[str] = None
+    degraded: bool = False
+    degraded_backends: List[str] = Field(default_factory=list)
+    semantic_match: Optional[SemanticCacheMatch] = None
+
+class SearchStreamEvent(BaseModel):
+    event: str
+    stage: str
+    search_id: str
+    bucket: Optional[str] = None
+    stage_ms: int
+    elapsed_ms: int
+    need_fetch_lines: bool = False
+    hits: List[SearchHit]
+    degraded: bool = False
+    degraded_backends: List[str] = Field(default_factory=list)
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest] = Field(..., min_length=1, max_length=BATCH_SEARCH_MAX)
+
+    @model_validator(mode="after")
+    def _reject_single_search_options(self) -> "BatchSearchRequest":
+        # batches are neither paged nor looked up in the semantic cache
+        for index, item in enumerate(self.searches):
+            if item.cursor or item.semantic_cache:
+                raise ValueError(f"searches[{index}]: cursor and semantic_cache are not supported in batches")
+        return self
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
+
+class SymbolMeta(BaseModel):
+    name: str
+    qualified_name: str
+    kind: str
+    rel_path: str
+    line_start: int
+    line_end: int
+
+class SymbolUploadRequest(BaseModel):
+    tenant_id: str = "default"
+    repo_id: str
+    paths: List[str] = Field(default_factory=list)
+    symbols: List[SymbolMeta] = Field(default_factory=list, max_length=100000)
+
+class SymbolLookupResponse(BaseModel):
+    repo_id: str
+    hits: List[SymbolMeta]
+    took_ms: float
+
+class SuggestItem(BaseModel):
+    type: Literal["path", "symbol"]
+    text: str
+    rel_path: str
+    line_start: Optional[int] = None
+    kind: Optional[str] = None
+
+class SuggestResponse(BaseModel):
+    repo_id: str
+    suggestions: List[SuggestItem]
+    reused: bool = False
+    took_ms: float
+
+class TenantSalt(BaseModel):
+    tenant_id: str
+    salt_ver: int = 0
+    salt: str = ""
+
+class TenantSaltsRequest(BaseModel):
+    tenant_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+class TenantSaltsResponse(BaseModel):
+    salts: List[TenantSalt]
 
 class FetchLinesItem(BaseModel):
     chunk_id: str
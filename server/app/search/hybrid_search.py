@@ -3,10 +3,24 @@ from app.index.qdrant_store import QdrantStore
 from app.index.opensearch_store import OSStore
 from app.index.rrf import rrf
 from app.search.learned_ranker import LearnedRanker
+from app.search.query_router import NATURAL, classify_query
+from app.search.selectivity import SelectivityPlanner
 from app.search.providers.embedding import EmbeddingProvider
+from app.services.circuit_breaker import CircuitBreaker
 from app.config import settings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+import fnmatch, heapq, logging, time
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+class SearchUnavailable(RuntimeError):
+    """Raised when every retrieval backend failed, timed out or is circuit-open."""
+    def __init__(self, backends: list[str]):
+        super().__init__(f"search backends unavailable: {', '.join(backends)}")
+        self.backends = backends
+
 class HybridSearch:
     def __init__(self, qdrant: QdrantStore, os_store: OSStore, embedder: EmbeddingProvider):
         self.qdrant = qdrant
@@ -16,6 +30,10 @@ class HybridSearch:
         self.beta = settings.beta_bm25
         self.rrf_k = settings.rrf_k
         self.rankerm = LearnedRanker(settings.learned_ranker_path)
+        self._repo_catalog: dict[str, tuple[float, list[str]]] = {}
+        self.planner = SelectivityPlanner(qdrant)
+        self.breakers = CircuitBreaker(settings.breaker_failure_threshold, settings.breaker_reset_s)
+        self._pool = ThreadPoolExecutor(max_workers=settings.search_backend_workers, thread_name_prefix="search-backend")
 
     def _normalize(self, scores):
         if not scores: return []
@@ -24,16 +42,253 @@ class HybridSearch:
         if hi - lo < 1e-9: return [0.5 for _ in scores]
         return ((arr - lo) / (hi - lo)).tolist()
 
-    def search_with_debug(self, tenant_id: str, repo_id: str, query: str, top_k: int | None = None, filters: dict | None = None):
+    @staticmethod
+    def _filter_args(filters: dict | None) -> dict:
+        filters = filters or {}
+        return {"lang": filters.get('lang'), "dir_hint": filters.get('dir_hint'),
+                "exclude_tests": bool(filters.get('exclude_tests'))}
+
+    def _vector_plan(self, tenant_id: str, repo_id: str | Sequence[str], filters: dict | None, depth: int = 1):
+        return self.planner.plan(tenant_id, repo_id, self._filter_args(filters), settings.top_k_vector*depth)
+
+    @staticmethod
+    def candidate_limit(depth: int = 1) -> int:
+        """Upper bound on fused candidates retrieved at ``depth`` (a multiple of TOP_K_VECTOR/BM25)."""
+        return (settings.top_k_vector + settings.top_k_bm25) * depth
+
+    @staticmethod
+    def _lexical_repos(repo_id: str | Sequence[str]) -> list[str]:
+        repos = [repo_id] if isinstance(repo_id, str) else list(repo_id)
+        return [r for r in repos if r not in settings.privacy_repo_ids]
+
+    def expand_repo_glob(self, tenant_id: str, pattern: str) -> list[str]:
+        """Resolve a repo glob (``svc-*``) against the tenant's indexed repos.
+
+        Known repos come from an OpenSearch terms aggregation, cached per tenant
+        for ``REPO_CATALOG_TTL_S``, plus the configured privacy repos that never
+        reach OpenSearch.
+        """
+        now = time.time()
+        cached = self._repo_catalog.get(tenant_id)
+        if cached is None or now - cached[0] > settings.repo_catalog_ttl_s:
+            cached = (now, sorted(set(self.os.repo_ids(tenant_id)) | settings.privacy_repo_ids))
+            self._repo_catalog[tenant_id] = cached
+        return [r for r in cached[1] if fnmatch.fnmatchcase(r, pattern)]
+
+    def embed_query(self, query: str):
+        return self.embedder.encode([query], normalize_embeddings=True)[0]
+
+    def vector_candidates(self, tenant_id: str, repo_id: str | Sequence[str], query: str, filters: dict | None = None, depth: int = 1, qvec=None):
+        if qvec is None: qvec = self.embed_query(query)
+        plan = self._vector_plan(tenant_id, repo_id, filters, depth)
+        t0 = time.perf_counter()
+        hits = self.qdrant.search_tenant(tenant_id, qvec, repo_id=repo_id, top_k=settings.top_k_vector*depth,
+                                         **plan.search_args(), **self._filter_args(filters))
+        self.planner.observe(plan, (time.perf_counter() - t0) * 1000)
+        return hits
+
+    def bm25_candidates(self, tenant_id: str, repo_id: str | Sequence[str], query: str, filters: dict | None = None, depth: int = 1,
+                        timeout_s: float | None = None):
+        lexical = self._lexical_repos(repo_id)
+        if not lexical: return []
+        return self.os.bm25_tenant(tenant_id, lexical, query, settings.top_k_bm25*depth, timeout_s=timeout_s, **self._filter_args(filters))
+
+    def search_with_debug(self, tenant_id: str, repo_id: str | Sequence[str], query: str, top_k: int | None = None, filters: dict | None = None,
+                          alpha: float | None = None, beta: float | None = None, per_repo_limit: int | None = None, depth: int = 1):
+        v_hits = self.vector_candidates(tenant_id, repo_id, query, filters, depth)
+        b_hits = self.bm25_candidates(tenant_id, repo_id, query, filters, depth)
+        return self.fuse(v_hits, b_hits, top_k, alpha, beta, per_repo_limit)
+
+    def route_for(self, query: str, repo_id: str | Sequence[str]) -> str:
+        """``lexical`` for identifier/path queries whose repos are all in OpenSearch, else ``hybrid``."""
+        if not settings.query_routing or classify_query(query) == NATURAL: return "hybrid"
+        repos = [repo_id] if isinstance(repo_id, str) else list(repo_id)
+        return "lexical" if repos and len(self._lexical_repos(repos)) == len(repos) else "hybrid"
+
+    def _retrieve(self, backends: tuple[str, ...], tenant_id: str, repo_id, query: str, filters: dict | None, depth: int,
+                  start: float, deadline: float, qvec=None):
+        """Run ``backends`` concurrently within their budgets; returns ``(results, failed)``."""
+        budgets = {"vector": settings.search_vector_budget_ms / 1000, "bm25": settings.search_bm25_budget_ms / 1000}
+        futures = {}
+        if "vector" in backends and self.breakers.allow("vector", tenant_id):
+            futures["vector"] = self._pool.submit(self.vector_candidates, tenant_id, repo_id, query, filters, depth, qvec)
+        if "bm25" in backends and self.breakers.allow("bm25", tenant_id):
+            timeout_s = min(budgets["bm25"], deadline - start)
+            futures["bm25"] = self._pool.submit(self.bm25_candidates, tenant_id, repo_id, query, filters, depth, timeout_s)
+        results, failed = {}, []
+        for backend in backends:
+            if backend not in futures: failed.append(backend); continue
+            try:
+                results[backend] = futures[backend].result(timeout=max(0.0, min(start + budgets[backend], deadline) - time.monotonic()))
+            except Exception as exc:
+                # a timed-out call keeps running in the pool; the breaker stops new ones piling up behind it
+                futures[backend].cancel()
+                self.breakers.record_failure(backend, tenant_id)
+                logger.warning("%s retrieval failed for tenant %s: %s", backend, tenant_id, type(exc).__name__)
+                failed.append(backend)
+            else:
+                self.breakers.record_success(backend, tenant_id)
+        return results, failed
+
+    def retrieve(self, backend: str, tenant_id: str, repo_id: str | Sequence[str], query: str, filters: dict | None = None,
+                 depth: int = 1, *, deadline_ms: float | None = None):
+        """One backend's candidates within its budget and circuit breaker, or ``None`` when it failed.
+
+        For callers that use the backends' results separately (the streaming
+        route shows BM25 hits before vector retrieval is done).
+        """
+        start = time.monotonic()
+        deadline = start + (deadline_ms or settings.search_deadline_ms) / 1000
+        results, _ = self._retrieve((backend,), tenant_id, repo_id, query, filters, depth, start, deadline)
+        return results.get(backend)
+
+    def search_with_deadline(self, tenant_id: str, repo_id: str | Sequence[str], query: str, top_k: int | None = None, filters: dict | None = None,
+                             alpha: float | None = None, beta: float | None = None, per_repo_limit: int | None = None, depth: int = 1,
+                             deadline_ms: float | None = None, route: str = "hybrid", qvec=None):
+        """``search_with_debug`` bounded by a deadline, returning ``(hits, debug, degraded)``.
+
+        Vector (embedding included) and BM25 retrieval run concurrently, each
+        limited to its ``SEARCH_*_BUDGET_MS`` and to the overall deadline. A
+        backend that fails, misses its budget or has an open circuit for the
+        tenant is left out and named in ``degraded``; the other one's hits are
+        fused alone. Raises ``SearchUnavailable`` when no backend answered.
+
+        With ``route="lexical"`` (see ``route_for``) BM25 runs alone and the
+        embedding + HNSW search only happens if it finds nothing. Every debug
+        entry records the route that produced it. A precomputed query
+        embedding can be passed as ``qvec``.
+        """
+        start = time.monotonic()
+        deadline = start + (deadline_ms or settings.search_deadline_ms) / 1000
+        results, degraded = {}, []
+        if route == "lexical":
+            results, degraded = self._retrieve(("bm25",), tenant_id, repo_id, query, filters, depth, start, deadline)
+            if results.get("bm25"):
+                hits, debug = self.fuse([], results["bm25"], top_k, alpha, beta, per_repo_limit)
+                return hits, [dict(d, route="lexical") for d in debug], []
+            route = "lexical_fallback"
+        pending = tuple(b for b in ("vector", "bm25") if b not in results and b not in degraded)
+        found, failed = self._retrieve(pending, tenant_id, repo_id, query, filters, depth, start, deadline, qvec)
+        results.update(found); degraded += failed
+        if not results: raise SearchUnavailable(sorted(degraded))
+        hits, debug = self.fuse(results.get("vector", []), results.get("bm25", []), top_k, alpha, beta, per_repo_limit)
+        return hits, [dict(d, route=route) for d in debug], sorted(degraded, key=("vector", "bm25").index)
+
+    def lexical_preview(self, b_hits, top_k: int | None = None, per_repo_limit: int | None = None) -> list[dict]:
+        """Provisional BM25-only result list, shaped like the fused hits."""
+        top_k = top_k or settings.final_k
+        scores = {h["chunk_id"]: float(h["score"]) for h in b_hits}
+        data = {h["chunk_id"]: h for h in b_hits}
+        repo_of = {cid: d.get("repo_id", "") for cid, d in data.items()}
+        return [self._hit(cid, score, data[cid]) for cid, score in self._top(scores, repo_of, top_k, per_repo_limit)]
+
+    @staticmethod
+    def _hit(cid: str, score: float, data: dict) -> dict:
+        return {"chunk_id": cid, "score": float(score), "path_tokens": data.get("path_tokens", []),
+                "line_span": [data.get("line_start",0), data.get("line_end",0)], "repo_id": data.get("repo_id",""),
+                "preview": data.get("preview")}
+
+    def full_texts(self, tenant_id: str, hits: list[dict]) -> dict[str, str]:
+        """Full chunk text for final hits, fetched on demand (privacy repos have none)."""
+        ids = [h["chunk_id"] for h in hits if h.get("repo_id") not in settings.privacy_repo_ids]
+        return self.os.fetch_texts(tenant_id, ids)
+
+    def _vector_batch(self, requests: list[dict]):
+        qvecs = self.embedder.encode([r["query"] for r in requests], normalize_embeddings=True)
+        return self.qdrant.search_batch([
+            {"tenant": r["tenant_id"], "vector": qvecs[i], "repo_id": r["repo_id"], "top_k": settings.top_k_vector,
+             **self._vector_plan(r["tenant_id"], r["repo_id"], r.get("filters")).search_args(), **self._filter_args(r.get("filters"))}
+            for i, r in enumerate(requests)])
+
+    def _bm25_batch(self, requests: list[dict], timeout_s: float | None = None):
+        return self.os.bm25_msearch([
+            {"tenant": r["tenant_id"], "repo_id": self._lexical_repos(r["repo_id"]), "query": r["query"],
+             "top_k": settings.top_k_bm25, **self._filter_args(r.get("filters"))} for r in requests], timeout_s=timeout_s)
+
+    def _submit_batch(self, backend: str, requests: list[dict], indices: list[int], start: float, deadline: float):
+        """Start one grouped call of ``backend`` for the ``indices`` whose tenant's circuit is closed."""
+        tenants = {t for t in sorted({requests[i]["tenant_id"] for i in indices}) if self.breakers.allow(backend, t)}
+        allowed = [i for i in indices if requests[i]["tenant_id"] in tenants]
+        if not allowed: return None
+        batch = [requests[i] for i in allowed]
+        if backend == "vector": future = self._pool.submit(self._vector_batch, batch)
+        else: future = self._pool.submit(self._bm25_batch, batch, min(settings.search_bm25_budget_ms / 1000, deadline - start))
+        return backend, allowed, tenants, future
+
+    def _collect_batch(self, submitted, start: float, deadline: float) -> dict[int, list]:
+        """Results of a ``_submit_batch`` call by request index; empty when it failed or missed its budget."""
+        if submitted is None: return {}
+        backend, allowed, tenants, future = submitted
+        budget = {"vector": settings.search_vector_budget_ms, "bm25": settings.search_bm25_budget_ms}[backend] / 1000
+        try:
+            found = future.result(timeout=max(0.0, min(start + budget, deadline) - time.monotonic()))
+        except Exception as exc:
+            future.cancel()
+            for tenant in tenants: self.breakers.record_failure(backend, tenant)
+            logger.warning("%s batch retrieval failed for tenants %s: %s", backend, sorted(tenants), type(exc).__name__)
+            return {}
+        for tenant in tenants: self.breakers.record_success(backend, tenant)
+        return dict(zip(allowed, found))
+
+    def search_batch_with_deadline(self, requests: list[dict], deadline_ms: float | None = None):
+        """Run many searches with one embedding batch and one multi-search per backend.
+
+        Each request is a dict of ``search_with_deadline`` keyword arguments
+        (``route`` comes from ``route_for``); results are ``(hits, debug,
+        degraded)`` tuples in request order. Budgets, the deadline and the
+        per-tenant circuit breakers apply as for single searches, to each
+        grouped backend call: a backend call that fails degrades every search
+        in it, and a search no backend answered gets no hits and both
+        backends in ``degraded``. Lexical-routed searches whose BM25 finds
+        nothing fall back to a second, vector-only batch.
+        """
+        if not requests: return []
+        start = time.monotonic()
+        deadline = start + (deadline_ms or settings.search_deadline_ms) / 1000
+        routes = [self.route_for(r["query"], r["repo_id"]) for r in requests]
+        lexical = [i for i, r in enumerate(requests) if self._lexical_repos(r["repo_id"])]
+        b_job = self._submit_batch("bm25", requests, lexical, start, deadline)
+        v_job = self._submit_batch("vector", requests, [i for i, route in enumerate(routes) if route == "hybrid"], start, deadline)
+        b_results = {i: [] for i in range(len(requests)) if i not in lexical}
+        b_results.update(self._collect_batch(b_job, start, deadline))
+        v_results = self._collect_batch(v_job, start, deadline)
+        fallback = [i for i, route in enumerate(routes) if route == "lexical" and not b_results.get(i)]
+        v_results.update(self._collect_batch(self._submit_batch("vector", requests, fallback, start, deadline), start, deadline))
+
+        out = []
+        for i, r in enumerate(requests):
+            args = (r.get("top_k"), r.get("alpha"), r.get("beta"), r.get("per_repo_limit"))
+            if routes[i] == "lexical" and b_results.get(i):
+                hits, debug = self.fuse([], b_results[i], *args)
+                out.append((hits, [dict(d, route="lexical") for d in debug], [])); continue
+            route = "lexical_fallback" if routes[i] == "lexical" else "hybrid"
+            degraded = [b for b, found in (("vector", v_results), ("bm25", b_results)) if i not in found]
+            if len(degraded) == 2: out.append(([], [], degraded)); continue
+            hits, debug = self.fuse(v_results.get(i, []), b_results.get(i, []), *args)
+            out.append((hits, [dict(d, route=route) for d in debug], degraded))
+        return out
+
+    @staticmethod
+    def _top(fused: dict, repo_of: dict, limit: int, per_repo_limit: int | None):
+        """Top ``limit`` (cid, score) pairs via a heap, keeping at most ``per_repo_limit`` per repo."""
+        if not per_repo_limit:
+            return heapq.nlargest(limit, fused.items(), key=lambda x: x[1])
+        heap = [(-score, cid) for cid, score in fused.items()]
+        heapq.heapify(heap)
+        taken: dict[str, int] = {}
+        out = []
+        while heap and len(out) < limit:
+            neg, cid = heapq.heappop(heap)
+            repo = repo_of.get(cid, "")
+            if taken.get(repo, 0) >= per_repo_limit: continue
+            taken[repo] = taken.get(repo, 0) + 1
+            out.append((cid, -neg))
+        return out
+
+    def fuse(self, v_hits, b_hits, top_k: int | None, alpha: float | None, beta: float | None, per_repo_limit: int | None = None):
         top_k = top_k or settings.final_k
-        qvec = self.embedder.encode([query], normalize_embeddings=True)[0]
-        lang = (filters or {}).get('lang')
-        dir_hint = (filters or {}).get('dir_hint')
-        exclude_tests = bool((filters or {}).get('exclude_tests'))
-        hnsw_ef = max(64, int((settings.top_k_vector or 50)*2))
-
-        v_hits = self.qdrant.search_tenant(tenant_id, qvec, repo_id=repo_id, top_k=settings.top_k_vector,
-                                           lang=lang, dir_hint=dir_hint, exclude_tests=exclude_tests, hnsw_ef=hnsw_ef)
+        alpha = self.alpha if alpha is None else alpha
+        beta = self.beta if beta is None else beta
         v_pairs = []; v_map = {}
         for h in v_hits:
             cid = h.payload["chunk_id"]
@@ -41,11 +296,9 @@ class HybridSearch:
             v_map[cid] = h.payload
 
         b_pairs = []; b_map = {}
-        if repo_id not in settings.privacy_repo_ids:
-            b_hits = self.os.bm25_tenant(tenant_id, repo_id, query, settings.top_k_bm25, lang=lang, dir_hint=dir_hint, exclude_tests=exclude_tests)
-            for h in b_hits:
-                b_pairs.append((h["chunk_id"], float(h["score"])))
-                b_map[h["chunk_id"]] = h
+        for h in b_hits:
+            b_pairs.append((h["chunk_id"], float(h["score"])))
+            b_map[h["chunk_id"]] = h
 
         ids = set([cid for cid,_ in v_pairs] + [cid for cid,_ in b_pairs])
         vdict = {cid:score for cid,score in v_pairs}
@@ -53,18 +306,19 @@ class HybridSearch:
         id_list = list(ids)
         vnorm = self._normalize([vdict.get(cid, 0.0) for cid in id_list])
         bnorm = self._normalize([bdict.get(cid, 0.0) for cid in id_list])
-        fused = {cid: self.alpha*vnorm[i] + self.beta*bnorm[i] for i,cid in enumerate(id_list)}
+        fused = {cid: alpha*vnorm[i] + beta*bnorm[i] for i,cid in enumerate(id_list)}
         if not fused:
             fused = dict(rrf([v_pairs, b_pairs])) if b_pairs else dict(rrf([v_pairs]))
 
-        ranked = sorted(fused.items(), key=lambda x: x[1], reverse=True)[:max(top_k, 30)]
+        repo_of = {cid: (b_map.get(cid) or v_map.get(cid) or {}).get("repo_id", "") for cid in fused}
+        ranked = self._top(fused, repo_of, max(top_k, 30), per_repo_limit)
         hits = []; passages = []; debug = []
         for cid, _ in ranked:
             data = b_map.get(cid) or v_map.get(cid)
             span = max(0, int(data.get("line_end",0)) - int(data.get("line_start",0)))
             depth = len(data.get("path_tokens",[]) or [])
             hits.append((cid, fused[cid], data))
-            passages.append((b_map.get(cid) or {}).get("text",""))
+            passages.append((b_map.get(cid) or {}).get("preview") or "")
             i = id_list.index(cid) if cid in id_list else 0
             vn = vnorm[i] if i < len(vnorm) else 0.0
             bn = bnorm[i] if i < len(bnorm) else 0.0
@@ -74,18 +328,8 @@ class HybridSearch:
             feats = [[d["fused"], d["vnorm"], d["bnorm"], d["span"], d["depth"]] for d in debug]
             lr_scores = self.rankerm.score(feats)
             order = sorted(range(len(hits)), key=lambda i: lr_scores[i], reverse=True)[:top_k]
-            final = []
-            for i in order:
-                cid, s, data = hits[i]
-                final.append({"chunk_id": cid, "score": float(lr_scores[i]), "path_tokens": data.get("path_tokens", []),
-                              "line_span": [data.get("line_start",0), data.get("line_end",0)], "repo_id": data.get("repo_id",""),
-                              "preview": data.get("text")})
+            final = [self._hit(hits[i][0], lr_scores[i], hits[i][2]) for i in order]
             return final, debug
 
-        final = []
-        for cid, _ in ranked[:top_k]:
-            data = b_map.get(cid) or v_map.get(cid)
-            final.append({"chunk_id": cid, "score": fused[cid], "path_tokens": data.get("path_tokens", []),
-                          "line_span": [data.get("line_start",0), data.get("line_end",0)], "repo_id": data.get("repo_id",""),
-                          "preview": data.get("text")})
+        final = [self._hit(cid, fused[cid], b_map.get(cid) or v_map.get(cid)) for cid, _ in ranked[:top_k]]
         return final, debug
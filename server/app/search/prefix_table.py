@@ -0,0 +1,100 @@
+"""Sorted, case-folded key tables for exact and prefix lookups."""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+
+class PrefixTable:
+    """Entries reachable by one or more keys, searched with ``bisect``.
+
+    Keys are lower-cased once at build time; a lookup is a binary search plus
+    a scan over the matching run, so cost depends on the number of matches,
+    not on the table size.
+    """
+
+    def __init__(self, entries: list[dict], keys_of: Callable[[dict], Iterable[str]]) -> None:
+        pairs = sorted(
+            (key, i) for i, entry in enumerate(entries) for key in {k.lower() for k in keys_of(entry) if k}
+        )
+        self.entries = entries
+        self._keys = [key for key, _ in pairs]
+        self._refs = [ref for _, ref in pairs]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def scan(self, needle: str, *, prefix: bool = True) -> Iterator[dict]:
+        """Yield each entry with a key equal to (or starting with) ``needle`` once, in key order."""
+
+        needle = needle.lower()
+        seen: set[int] = set()
+        for i in range(bisect.bisect_left(self._keys, needle), len(self._keys)):
+            key = self._keys[i]
+            if not (key.startswith(needle) if prefix else key == needle):
+                return
+            ref = self._refs[i]
+            if ref not in seen:
+                seen.add(ref)
+                yield self.entries[ref]
+
+
+@dataclass
+class _Loaded:
+    loaded_at: float
+    table: PrefixTable
+
+
+class PrefixTableCache:
+    """``PrefixTable`` per ``(tenant, repo)`` loaded on first use.
+
+    Tables are rebuilt by ``loader`` once older than ``ttl_s`` and at most
+    ``max_repos`` are kept (least recently used first out).
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str, str], PrefixTable],
+        ttl_s: float,
+        max_repos: int,
+        *,
+        time_func: Callable[[], float] | None = None,
+    ) -> None:
+        self._loader = loader
+        self._ttl = ttl_s
+        self._max = max(1, max_repos)
+        self._time = time_func or time.monotonic
+        self._lock = threading.Lock()
+        self._tables: OrderedDict[tuple[str, str], _Loaded] = OrderedDict()
+
+    def get(self, tenant: str, repo_id: str) -> PrefixTable:
+        key = (tenant, repo_id)
+        now = self._time()
+        with self._lock:
+            loaded = self._tables.get(key)
+            if loaded is not None and now - loaded.loaded_at < self._ttl:
+                self._tables.move_to_end(key)
+                return loaded.table
+        table = self._loader(tenant, repo_id)
+        with self._lock:
+            self._tables[key] = _Loaded(now, table)
+            self._tables.move_to_end(key)
+            while len(self._tables) > self._max:
+                self._tables.popitem(last=False)
+        return table
+
+    def is_fresh(self, tenant: str, repo_id: str) -> bool:
+        """True when ``get`` for this repo will not have to call the loader."""
+
+        with self._lock:
+            loaded = self._tables.get((tenant, repo_id))
+        return loaded is not None and self._time() - loaded.loaded_at < self._ttl
+
+    def invalidate(self, tenant: str, repo_id: str) -> None:
+        with self._lock:
+            self._tables.pop((tenant, repo_id), None)
@@ -1,5 +1,11 @@
 """Provider interfaces and registry helpers for search components."""
 
+from .batching import (
+    BatchingConfig,
+    BatchingCrossEncoderProvider,
+    BatchingEmbeddingProvider,
+    MicroBatcher,
+)
 from .embedding import (
     EmbeddingProvider,
     HFEmbeddingProvider,
@@ -12,9 +18,15 @@ from .reranker import (
     build_reranker_provider,
     register_reranker_provider,
 )
+from .onnx import ONNXCrossEncoderProvider, ONNXEmbeddingProvider
 from .registry import ProviderRegistry
+from .remote import InferenceClient, RemoteCrossEncoderProvider, RemoteEmbeddingProvider
 
 __all__ = [
+    "BatchingConfig",
+    "BatchingCrossEncoderProvider",
+    "BatchingEmbeddingProvider",
+    "MicroBatcher",
     "EmbeddingProvider",
     "HFEmbeddingProvider",
     "build_embedding_provider",
@@ -23,5 +35,10 @@ __all__ = [
     "HFCrossEncoderProvider",
     "build_reranker_provider",
     "register_reranker_provider",
+    "ONNXEmbeddingProvider",
+    "ONNXCrossEncoderProvider",
     "ProviderRegistry",
+    "InferenceClient",
+    "RemoteEmbeddingProvider",
+    "RemoteCrossEncoderProvider",
 ]
@@ -0,0 +1,242 @@
+"""Dynamic micro-batching wrappers for inference providers."""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, List, Sequence, Tuple, TypeVar
+
+from .embedding import EmbeddingProvider
+from .reranker import CrossEncoderProvider
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+BatchObserver = Callable[[str, int, float], None]
+"""Callback invoked as ``observer(name, batch_size, queue_ms)`` per batch."""
+
+
+@dataclass(frozen=True)
+class BatchingConfig:
+    """Limits for collecting concurrent requests into a single forward pass."""
+
+    max_batch_size: int = 32
+    max_wait_ms: float = 2.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1 and self.max_wait_ms > 0
+
+
+@dataclass
+class _Pending(Generic[T, R]):
+    items: List[T]
+    future: "Future[List[R]]"
+    enqueued_at: float
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collect items from concurrent callers and run them through ``fn`` together.
+
+    Callers block in :meth:`submit` until the batch containing their items has
+    been processed. A batch is dispatched once ``max_batch_size`` items are
+    queued or ``max_wait_ms`` has elapsed since the oldest request arrived,
+    whichever comes first.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[T]], Sequence[R]],
+        *,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        name: str = "batch",
+        observer: BatchObserver | None = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._fn = fn
+        self._max_batch_size = max_batch_size
+        self._max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self._name = name
+        self._observer = observer
+        self._queue: "queue.Queue[_Pending[T, R] | None]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+    def submit(self, items: Sequence[T]) -> List[R]:
+        """Queue ``items`` for the next batch and wait for their results."""
+
+        if not items:
+            return []
+        future: "Future[List[R]]" = Future()
+        self._ensure_worker()
+        self._queue.put(_Pending(list(items), future, time.perf_counter()))
+        return future.result()
+
+    def close(self) -> None:
+        """Stop the worker thread after the queued requests are drained."""
+
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name=f"micro-batcher-{self._name}",
+                    daemon=True,
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first.items)
+            deadline = first.enqueued_at + self._max_wait_s
+            stop = False
+            while size < self._max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stop = True
+                    break
+                batch.append(pending)
+                size += len(pending.items)
+            self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: List[_Pending[T, R]]) -> None:
+        started = time.perf_counter()
+        items: List[T] = [item for pending in batch for item in pending.items]
+        try:
+            results = list(self._fn(items))
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self._name} batch returned {len(results)} results for {len(items)} inputs"
+                )
+        except Exception as exc:  # propagate to every waiting caller
+            for pending in batch:
+                pending.future.set_exception(exc)
+            return
+        finally:
+            if self._observer is not None:
+                queue_ms = (started - batch[0].enqueued_at) * 1000.0
+                try:
+                    self._observer(self._name, len(items), queue_ms)
+                except Exception:  # pragma: no cover - metrics must not break inference
+                    logger.debug("Batch observer failed", exc_info=True)
+
+        offset = 0
+        for pending in batch:
+            count = len(pending.items)
+            pending.future.set_result(results[offset : offset + count])
+            offset += count
+
+
+class BatchingEmbeddingProvider(EmbeddingProvider):
+    """Embedding provider that coalesces concurrent ``encode`` calls."""
+
+    def __init__(
+        self,
+        inner: EmbeddingProvider,
+        config: BatchingConfig,
+        *,
+        observer: BatchObserver | None = None,
+    ) -> None:
+        self._inner = inner
+        self._config = config
+        self._observer = observer
+        self._batchers: Dict[bool, MicroBatcher[str, Sequence[float]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def inner(self) -> EmbeddingProvider:
+        return self._inner
+
+    def _batcher(self, normalize_embeddings: bool) -> MicroBatcher[str, Sequence[float]]:
+        batcher = self._batchers.get(normalize_embeddings)
+        if batcher is None:
+            with self._lock:
+                batcher = self._batchers.get(normalize_embeddings)
+                if batcher is None:
+                    batcher = MicroBatcher(
+                        lambda texts: self._inner.encode(
+                            texts, normalize_embeddings=normalize_embeddings
+                        ),
+                        max_batch_size=self._config.max_batch_size,
+                        max_wait_ms=self._config.max_wait_ms,
+                        name="embed",
+                        observer=self._observer,
+                    )
+                    self._batchers[normalize_embeddings] = batcher
+        return batcher
+
+    def encode(
+        self,
+        texts: Sequence[str] | str,
+        *,
+        normalize_embeddings: bool = True,
+    ) -> Sequence[Sequence[float]]:
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        return self._batcher(normalize_embeddings).submit(batch)
+
+    def model_id(self) -> str:
+        return self._inner.model_id()
+
+    def close(self) -> None:
+        for batcher in list(self._batchers.values()):
+            batcher.close()
+
+
+class BatchingCrossEncoderProvider(CrossEncoderProvider):
+    """Cross-encoder provider that scores pairs from concurrent callers together."""
+
+    def __init__(
+        self,
+        inner: CrossEncoderProvider,
+        config: BatchingConfig,
+        *,
+        observer: BatchObserver | None = None,
+    ) -> None:
+        self._inner = inner
+        self._batcher: MicroBatcher[Tuple[str, str], float] = MicroBatcher(
+            inner.score_pairs,
+            max_batch_size=config.max_batch_size,
+            max_wait_ms=config.max_wait_ms,
+            name="rerank",
+            observer=observer,
+        )
+
+    @property
+    def inner(self) -> CrossEncoderProvider:
+        return self._inner
+
+    def rerank(self, query: str, passages: Sequence[str]) -> Sequence[float]:
+        return self.score_pairs([(query, passage) for passage in passages])
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> Sequence[float]:
+        return self._batcher.submit(pairs)
+
+    def close(self) -> None:
+        self._batcher.close()
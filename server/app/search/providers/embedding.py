@@ -1,14 +1,20 @@
 """Embedding provider interfaces and implementations."""
 from __future__ import annotations
 
+import hashlib
+import os
 from abc import ABC, abstractmethod
+from pathlib import Path
 from threading import Lock
-from typing import Callable, Iterable, Sequence, Tuple
+from typing import TYPE_CHECKING, Callable, Iterable, Sequence, Tuple
 
 from sentence_transformers import SentenceTransformer
 
 from .registry import ProviderRegistry
 
+if TYPE_CHECKING:  # pragma: no cover - import cycle guard
+    from .batching import BatchingConfig, BatchObserver
+
 
 class EmbeddingProvider(ABC):
     """Abstract base class for embedding providers."""
@@ -22,6 +28,48 @@ class EmbeddingProvider(ABC):
     ) -> Sequence[Sequence[float]]:
         """Return embeddings for the given text or texts."""
 
+    def model_id(self) -> str:
+        """Identity of the vectors this provider produces (model, weights, export).
+
+        Cached embeddings are keyed by it, so it must change whenever the
+        vectors would. Providers should override the class-name default.
+        """
+
+        return type(self).__name__
+
+
+def file_digest(paths: Iterable[Path]) -> str:
+    """Short SHA-256 over the contents of the existing ``paths``, in order."""
+
+    digest = hashlib.sha256()
+    for path in paths:
+        if not path.is_file():
+            continue
+        digest.update(path.name.encode("utf-8") + b"\0")
+        with path.open("rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+_HF_WEIGHT_FILES = ("config.json", "model.safetensors", "pytorch_model.bin", "modules.json", "1_Pooling/config.json")
+
+
+def _hf_revision(model_name: str) -> str | None:
+    """Weights digest of a local model directory, else the Hub commit cached for ``model_name``."""
+
+    local = Path(model_name)
+    if local.is_dir():
+        return file_digest(local / name for name in _HF_WEIGHT_FILES)
+    cache = os.getenv("HF_HUB_CACHE") or os.path.join(
+        os.getenv("HF_HOME", os.path.join(os.path.expanduser("~"), ".cache", "huggingface")), "hub"
+    )
+    ref = Path(cache) / f"models--{model_name.replace('/', '--')}" / "refs" / "main"
+    try:
+        return ref.read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
 
 class HFEmbeddingProvider(EmbeddingProvider):
     """Embedding provider backed by Hugging Face SentenceTransformers."""
@@ -59,6 +107,10 @@ class HFEmbeddingProvider(EmbeddingProvider):
             return vectors.tolist()
         return list(vectors)
 
+    def model_id(self) -> str:
+        revision = _hf_revision(self._model_name)
+        return f"huggingface:{self._model_name}@{revision}" if revision else f"huggingface:{self._model_name}"
+
 
 _embedding_registry: ProviderRegistry[EmbeddingProvider] = ProviderRegistry("huggingface")
 
@@ -84,11 +136,20 @@ def _build_hf_embedding_provider(model_name: str) -> EmbeddingProvider:
 def build_embedding_provider(
     provider: str | None,
     model_name: str,
+    *,
+    batching: "BatchingConfig | None" = None,
+    observer: "BatchObserver | None" = None,
 ) -> Tuple[EmbeddingProvider, str, str | None]:
     """Factory for embedding providers based on configuration.
 
     Returns a tuple of ``(provider, resolved_key, fallback_from)`` to allow
-    callers to log when a fallback occurs.
+    callers to log when a fallback occurs. When ``batching`` is enabled the
+    resolved provider is wrapped so concurrent callers share forward passes.
     """
 
-    return _embedding_registry.create(provider, model_name)
+    instance, resolved_key, fallback_from = _embedding_registry.create(provider, model_name)
+    if batching is not None and batching.enabled:
+        from .batching import BatchingEmbeddingProvider
+
+        instance = BatchingEmbeddingProvider(instance, batching, observer=observer)
+    return instance, resolved_key, fallback_from
@@ -0,0 +1,193 @@
+"""ONNX Runtime providers for quantized CPU inference."""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Sequence, Tuple
+
+import numpy as np
+
+try:  # pragma: no cover - optional dependency
+    import onnxruntime as ort
+except ModuleNotFoundError:  # pragma: no cover - exercised when onnxruntime is absent
+    ort = None  # type: ignore[assignment]
+
+from app.config import settings
+
+from .embedding import EmbeddingProvider, file_digest, register_embedding_provider
+from .reranker import CrossEncoderProvider, register_reranker_provider
+
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+FULL_MODEL_FILE = "model.onnx"
+CONFIG_FILE = "onnx_config.json"
+
+SessionFactory = Callable[[str], Any]
+TokenizerLoader = Callable[[str], Any]
+
+
+def resolve_model_dir(model_name: str, base_dir: str | None = None) -> Path:
+    """Map a model name to its exported directory.
+
+    An existing directory is used as-is; otherwise the name is looked up under
+    ``base_dir`` (``ONNX_MODEL_DIR``) using the layout written by
+    ``scripts/export_onnx.py``.
+    """
+
+    candidate = Path(model_name)
+    if candidate.is_dir():
+        return candidate
+    root = Path(base_dir or settings.onnx_model_dir)
+    return root / model_name.replace("/", "__")
+
+
+def _default_session_factory(path: str) -> Any:
+    if ort is None:
+        raise RuntimeError("onnxruntime is not installed; install it to use the onnx provider")
+    options = ort.SessionOptions()
+    threads = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+    if threads > 0:
+        options.intra_op_num_threads = threads
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def _default_tokenizer_loader(path: str) -> Any:
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(path)
+
+
+class _ONNXModel:
+    """Lazily loaded ONNX session plus tokenizer stored in one directory."""
+
+    def __init__(
+        self,
+        model_dir: Path,
+        session_factory: SessionFactory | None = None,
+        tokenizer_loader: TokenizerLoader | None = None,
+    ) -> None:
+        self._model_dir = model_dir
+        self._session_factory = session_factory or _default_session_factory
+        self._tokenizer_loader = tokenizer_loader or _default_tokenizer_loader
+        self._session: Any = None
+        self._tokenizer: Any = None
+        self._input_names: set[str] = set()
+        self._config: dict[str, Any] = {}
+        self._lock = Lock()
+
+    def _model_path(self) -> Path:
+        quantized = self._model_dir / QUANTIZED_MODEL_FILE
+        return quantized if quantized.exists() else self._model_dir / FULL_MODEL_FILE
+
+    def identity(self) -> str:
+        """The model file in use (quantized or not) and a digest of it and its pooling config."""
+
+        path = self._model_path()
+        return f"{self._model_dir.name}/{path.name}@{file_digest([path, self._model_dir / CONFIG_FILE])}"
+
+    def load(self) -> Tuple[Any, Any, dict[str, Any]]:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    config_path = self._model_dir / CONFIG_FILE
+                    if config_path.exists():
+                        self._config = json.loads(config_path.read_text(encoding="utf-8"))
+                    self._tokenizer = self._tokenizer_loader(str(self._model_dir))
+                    session = self._session_factory(str(self._model_path()))
+                    self._input_names = {i.name for i in session.get_inputs()}
+                    self._session = session
+        return self._session, self._tokenizer, self._config
+
+    def run(self, *args: Any) -> Tuple[np.ndarray, np.ndarray]:
+        session, tokenizer, config = self.load()
+        encoded = tokenizer(
+            *args,
+            padding=True,
+            truncation=True,
+            max_length=int(config.get("max_length", 512)),
+            return_tensors="np",
+        )
+        feeds = {
+            name: np.asarray(value, dtype=np.int64)
+            for name, value in encoded.items()
+            if name in self._input_names
+        }
+        outputs = session.run(None, feeds)
+        return np.asarray(outputs[0]), np.asarray(encoded["attention_mask"])
+
+
+class ONNXEmbeddingProvider(EmbeddingProvider):
+    """Embedding provider running an exported (optionally int8) model on ONNX Runtime."""
+
+    def __init__(
+        self,
+        model_dir: str | Path,
+        *,
+        session_factory: SessionFactory | None = None,
+        tokenizer_loader: TokenizerLoader | None = None,
+    ) -> None:
+        self._model = _ONNXModel(Path(model_dir), session_factory, tokenizer_loader)
+
+    def encode(
+        self,
+        texts: Sequence[str] | str,
+        *,
+        normalize_embeddings: bool = True,
+    ) -> Sequence[Sequence[float]]:
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        if not batch:
+            return []
+        hidden, mask = self._model.run(batch)
+        _, _, config = self._model.load()
+        if config.get("pooling", "cls") == "mean":
+            weights = mask[..., None].astype(hidden.dtype)
+            vectors = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        else:
+            vectors = hidden[:, 0]
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.clip(norms, 1e-12, None)
+        return vectors.astype(np.float32).tolist()
+
+    def model_id(self) -> str:
+        return f"onnx:{self._model.identity()}"
+
+
+class ONNXCrossEncoderProvider(CrossEncoderProvider):
+    """Cross-encoder provider running an exported (optionally int8) model on ONNX Runtime."""
+
+    def __init__(
+        self,
+        model_dir: str | Path,
+        *,
+        session_factory: SessionFactory | None = None,
+        tokenizer_loader: TokenizerLoader | None = None,
+    ) -> None:
+        self._model = _ONNXModel(Path(model_dir), session_factory, tokenizer_loader)
+
+    def rerank(self, query: str, passages: Sequence[str]) -> Sequence[float]:
+        return self.score_pairs([(query, passage) for passage in passages])
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> Sequence[float]:
+        if not pairs:
+            return []
+        logits, _ = self._model.run([q for q, _ in pairs], [p for _, p in pairs])
+        logits = logits.reshape(len(pairs), -1)
+        scores = logits[:, 0].astype(np.float64)
+        if logits.shape[1] == 1:
+            # Match sentence-transformers' CrossEncoder, which applies a sigmoid
+            # to single-label models.
+            scores = 1.0 / (1.0 + np.exp(-scores))
+        return scores.tolist()
+
+
+@register_embedding_provider("onnx", aliases=("onnxruntime", "onnx-int8"))
+def _build_onnx_embedding_provider(model_name: str) -> EmbeddingProvider:
+    return ONNXEmbeddingProvider(resolve_model_dir(model_name))
+
+
+@register_reranker_provider("onnx", aliases=("onnxruntime", "onnx-int8"))
+def _build_onnx_reranker_provider(model_name: str) -> CrossEncoderProvider:
+    return ONNXCrossEncoderProvider(resolve_model_dir(model_name))
@@ -0,0 +1,208 @@
+"""Thin client providers for the shared local inference server.
+
+The wire protocol is intentionally small: every message is two length-prefixed
+frames, a JSON header followed by a binary body. Requests carry an empty body;
+responses carry the result matrix as raw little-endian float32 bytes.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import socket
+import struct
+from typing import Any, Callable, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+from .embedding import EmbeddingProvider, register_embedding_provider
+from .reranker import CrossEncoderProvider, register_reranker_provider
+
+_LENGTH = struct.Struct(">I")
+
+
+def send_message(sock: socket.socket, header: dict[str, Any], body: bytes = b"") -> None:
+    """Write a ``(header, body)`` message to ``sock``."""
+
+    encoded = json.dumps(header).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(encoded)) + encoded + _LENGTH.pack(len(body)) + body)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("inference socket closed")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_message(sock: socket.socket) -> Tuple[dict[str, Any], bytes]:
+    """Read a ``(header, body)`` message from ``sock``."""
+
+    (header_len,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    header = json.loads(_recv_exact(sock, header_len).decode("utf-8"))
+    (body_len,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    body = _recv_exact(sock, body_len) if body_len else b""
+    return header, body
+
+
+def encode_matrix(values: Any) -> Tuple[list[int], bytes]:
+    """Return ``(shape, float32 bytes)`` for a vector or matrix result."""
+
+    array = np.asarray(values, dtype="<f4")
+    return list(array.shape), array.tobytes()
+
+
+def decode_matrix(shape: Sequence[int], body: bytes) -> np.ndarray:
+    return np.frombuffer(body, dtype="<f4").reshape(tuple(shape))
+
+
+class InferenceClient:
+    """Pooled Unix-socket client for the inference server."""
+
+    def __init__(
+        self,
+        socket_path: str,
+        *,
+        timeout_s: float = 30.0,
+        pool_size: int = 8,
+        connect: Callable[[str], socket.socket] | None = None,
+    ) -> None:
+        self._socket_path = socket_path
+        self._timeout = timeout_s
+        self._connect = connect or self._default_connect
+        self._idle: "queue.LifoQueue[socket.socket]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _default_connect(self, path: str) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        sock.connect(path)
+        return sock
+
+    def _acquire(self) -> Tuple[socket.socket, bool]:
+        """A connection and whether it came from the pool."""
+
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._connect(self._socket_path), False
+
+    def _release(self, sock: socket.socket) -> None:
+        try:
+            self._idle.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def call(self, header: dict[str, Any]) -> np.ndarray:
+        """Send a request and return the decoded result matrix."""
+
+        response, body = self.request(header)
+        return decode_matrix(response["shape"], body)
+
+    def request(self, header: dict[str, Any]) -> Tuple[dict[str, Any], bytes]:
+        """Send a request and return the successful response header and body.
+
+        A pooled connection whose peer is gone (for example after the server
+        restarted) fails while the request is being written; the idle pool is
+        then dropped and the request is sent once more on a fresh connection.
+        Once the request has been written nothing is retried: a timeout or a
+        connection lost while waiting for the answer is raised, since the
+        server may already be running the inference.
+        """
+
+        sock, pooled = self._acquire()
+        try:
+            send_message(sock, header)
+        except ConnectionError:  # BrokenPipeError, ConnectionResetError
+            sock.close()
+            if not pooled:
+                raise
+            self.close()
+            sock = self._connect(self._socket_path)
+            try:
+                send_message(sock, header)
+            except OSError:
+                sock.close()
+                raise
+        except OSError:
+            sock.close()
+            raise
+        try:
+            response, body = recv_message(sock)
+        except OSError:
+            sock.close()
+            raise
+        self._release(sock)
+        if not response.get("ok"):
+            raise RuntimeError(f"inference server error: {response.get('error', 'unknown')}")
+        return response, body
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RemoteEmbeddingProvider(EmbeddingProvider):
+    """Embedding provider that delegates to the shared inference server."""
+
+    def __init__(self, client: InferenceClient) -> None:
+        self._client = client
+
+    def encode(
+        self,
+        texts: Sequence[str] | str,
+        *,
+        normalize_embeddings: bool = True,
+    ) -> Sequence[Sequence[float]]:
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        if not batch:
+            return []
+        result = self._client.call(
+            {"op": "embed", "texts": batch, "normalize": bool(normalize_embeddings)}
+        )
+        return result.tolist()
+
+    def model_id(self) -> str:
+        """The id of the server's own embedding provider; raises while the server is unreachable."""
+
+        response, _ = self._client.request({"op": "info"})
+        return str(response["embed_model_id"])
+
+
+class RemoteCrossEncoderProvider(CrossEncoderProvider):
+    """Cross-encoder provider that delegates to the shared inference server."""
+
+    def __init__(self, client: InferenceClient) -> None:
+        self._client = client
+
+    def rerank(self, query: str, passages: Sequence[str]) -> Sequence[float]:
+        return self.score_pairs([(query, passage) for passage in passages])
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> Sequence[float]:
+        if not pairs:
+            return []
+        result = self._client.call({"op": "rerank", "pairs": [list(pair) for pair in pairs]})
+        return result.tolist()
+
+
+def _client() -> InferenceClient:
+    return InferenceClient(
+        settings.inference_socket,
+        timeout_s=settings.inference_timeout_s,
+    )
+
+
+@register_embedding_provider("inference-server", aliases=("remote", "ipc"))
+def _build_remote_embedding_provider(model_name: str) -> EmbeddingProvider:  # noqa: ARG001 - server owns the model
+    return RemoteEmbeddingProvider(_client())
+
+
+@register_reranker_provider("inference-server", aliases=("remote", "ipc"))
+def _build_remote_reranker_provider(model_name: str) -> CrossEncoderProvider:  # noqa: ARG001 - server owns the model
+    return RemoteCrossEncoderProvider(_client())
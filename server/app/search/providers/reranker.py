@@ -3,12 +3,15 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from threading import Lock
-from typing import Callable, Sequence, Tuple
+from typing import TYPE_CHECKING, Callable, Sequence, Tuple
 
 from sentence_transformers import CrossEncoder
 
 from .registry import ProviderRegistry
 
+if TYPE_CHECKING:  # pragma: no cover - import cycle guard
+    from .batching import BatchingConfig, BatchObserver
+
 
 class CrossEncoderProvider(ABC):
     """Abstract base class for cross-encoder rerankers."""
@@ -17,6 +20,19 @@ class CrossEncoderProvider(ABC):
     def rerank(self, query: str, passages: Sequence[str]) -> Sequence[float]:
         """Return scores for the given passages."""
 
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> Sequence[float]:
+        """Return scores for ``(query, passage)`` pairs that may span queries."""
+
+        scores: list[float] = [0.0] * len(pairs)
+        grouped: dict[str, list[int]] = {}
+        for index, (query, _passage) in enumerate(pairs):
+            grouped.setdefault(query, []).append(index)
+        for query, indices in grouped.items():
+            results = self.rerank(query, [pairs[i][1] for i in indices])
+            for index, score in zip(indices, results):
+                scores[index] = float(score)
+        return scores
+
 
 class HFCrossEncoderProvider(CrossEncoderProvider):
     """Cross-encoder provider backed by Hugging Face models."""
@@ -39,9 +55,11 @@ class HFCrossEncoderProvider(CrossEncoderProvider):
         return self._model
 
     def rerank(self, query: str, passages: Sequence[str]) -> Sequence[float]:
-        pairs = [(query, passage) for passage in passages]
+        return self.score_pairs([(query, passage) for passage in passages])
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> Sequence[float]:
         model = self._get_model()
-        scores = model.predict(pairs)
+        scores = model.predict(list(pairs))
         if hasattr(scores, "tolist"):
             return scores.tolist()
         return list(scores)
@@ -71,10 +89,20 @@ def _build_hf_reranker_provider(model_name: str) -> CrossEncoderProvider:
 def build_reranker_provider(
     provider: str | None,
     model_name: str,
+    *,
+    batching: "BatchingConfig | None" = None,
+    observer: "BatchObserver | None" = None,
 ) -> Tuple[CrossEncoderProvider, str, str | None]:
     """Factory for reranker providers.
 
-    Returns a tuple of ``(provider, resolved_key, fallback_from)``.
+    Returns a tuple of ``(provider, resolved_key, fallback_from)``. When
+    ``batching`` is enabled the resolved provider is wrapped so concurrent
+    callers share cross-encoder forward passes.
     """
 
-    return _reranker_registry.create(provider, model_name)
+    instance, resolved_key, fallback_from = _reranker_registry.create(provider, model_name)
+    if batching is not None and batching.enabled:
+        from .batching import BatchingCrossEncoderProvider
+
+        instance = BatchingCrossEncoderProvider(instance, batching, observer=observer)
+    return instance, resolved_key, fallback_from
@@ -0,0 +1,42 @@
+"""Cheap query classification used to pick a retrieval route."""
+
+from __future__ import annotations
+
+import re
+
+# one code token: dotted/`::`/`->` qualified names, optional trailing call parens
+_IDENTIFIER = re.compile(r"^[A-Za-z_$][\w$]*(?:(?:\.|::|->|#)[A-Za-z_$][\w$]*)*(?:\(\))?$")
+_CAMEL = re.compile(r"[a-z0-9][A-Z]|[A-Z]{2}[a-z]")
+_PATH = re.compile(r"^[\w.\-]+(?:/[\w.\-]+)+/?$")
+_FILE_EXTENSIONS = {
+    "c", "cc", "cfg", "cpp", "cs", "css", "go", "h", "hpp", "html", "ini", "java", "js", "json", "jsx", "kt",
+    "lock", "md", "php", "py", "rb", "rs", "scala", "sh", "sql", "swift", "toml", "ts", "tsx", "txt", "xml",
+    "yaml", "yml",
+}
+
+IDENTIFIER = "identifier"
+PATH = "path"
+NATURAL = "natural"
+
+
+def classify_query(query: str) -> str:
+    """Return ``identifier``, ``path`` or ``natural`` for ``query``.
+
+    Paths contain a ``/`` or end in a known file extension. Only single tokens
+    with a code signal count as identifiers: an underscore, a case change, a
+    qualifier (``Foo.bar``, ``a::b``) or call parens. A plain lowercase word
+    stays ``natural`` because embeddings still help with synonyms there.
+    """
+
+    text = query.strip()
+    if not text or any(ch.isspace() for ch in text):
+        return NATURAL
+    if _PATH.match(text):
+        return PATH
+    if "." in text and text.rsplit(".", 1)[1] in _FILE_EXTENSIONS and re.match(r"^[\w.\-]+$", text):
+        return PATH
+    if _IDENTIFIER.match(text) and (
+        "_" in text or _CAMEL.search(text) or re.search(r"\.|::|->|#|\(\)$", text)
+    ):
+        return IDENTIFIER
+    return NATURAL
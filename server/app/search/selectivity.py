@@ -0,0 +1,96 @@
+"""Filter selectivity estimates used to plan filtered vector searches."""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from app.config import settings
+from app.index.qdrant_store import QdrantStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class VectorPlan:
+    """How to run one filtered vector search."""
+
+    hnsw_ef: int | None
+    exact: bool = False
+    filtered_points: int | None = None
+    selectivity: float | None = None
+
+    def search_args(self) -> dict:
+        return {"exact": True} if self.exact else {"hnsw_ef": self.hnsw_ef}
+
+
+class SelectivityPlanner:
+    """Pick exact search or an ``hnsw_ef`` from filter cardinality.
+
+    Cardinalities come from approximate Qdrant ``count`` calls (answered from
+    the payload indexes) and are cached per tenant, repo scope and filter for
+    ``SELECTIVITY_TTL_S``. Filters matching at most ``EXACT_SEARCH_MAX_POINTS``
+    points are searched exactly: brute force over a small subset is both
+    faster and fully accurate. Otherwise ``ef`` grows as the filter gets more
+    selective (HNSW has to visit more nodes to find ``k`` that pass) and is
+    capped by ``HNSW_EF_MAX`` and by what the observed per-``ef`` cost allows
+    within ``VECTOR_LATENCY_TARGET_MS``.
+    """
+
+    def __init__(self, qdrant: QdrantStore, *, time_func: Callable[[], float] | None = None) -> None:
+        self._qdrant = qdrant
+        self._time = time_func or time.monotonic
+        self._lock = threading.Lock()
+        self._counts: dict[tuple, tuple[float, int | None]] = {}
+        self._ms_per_ef: float | None = None
+
+    def _count(self, tenant: str, repo_id: str | Sequence[str], filters: dict) -> int | None:
+        repos = (repo_id,) if isinstance(repo_id, str) else tuple(sorted(repo_id))
+        key = (tenant, repos, filters.get("lang"), filters.get("dir_hint"), bool(filters.get("exclude_tests")))
+        now = self._time()
+        with self._lock:
+            cached = self._counts.get(key)
+        if cached is not None and now - cached[0] < settings.selectivity_ttl_s:
+            return cached[1]
+        try:
+            count: int | None = self._qdrant.count_tenant(tenant, repo_id, **filters)
+        except Exception as exc:  # planning must never fail a search; remember the miss too
+            logger.debug("Qdrant count failed for tenant %s: %s", tenant, exc)
+            count = None
+        with self._lock:
+            if len(self._counts) >= settings.selectivity_cache_size:
+                self._counts.clear()
+            self._counts[key] = (now, count)
+        return count
+
+    def plan(self, tenant: str, repo_id: str | Sequence[str], filters: dict, top_k: int) -> VectorPlan:
+        default = max(64, top_k * 2)
+        filtered = self._count(tenant, repo_id, filters)
+        if filtered is None:
+            return VectorPlan(hnsw_ef=default)
+        if filtered <= settings.exact_search_max_points:
+            return VectorPlan(hnsw_ef=None, exact=True, filtered_points=filtered)
+        narrowed = any(filters.get(name) for name in ("lang", "dir_hint", "exclude_tests"))
+        total = self._count(tenant, repo_id, {}) if narrowed else filtered
+        selectivity = min(1.0, filtered / total) if total else 1.0
+        ef = top_k / math.sqrt(max(selectivity, 1e-4))
+        cap = settings.hnsw_ef_max
+        with self._lock:
+            ms_per_ef = self._ms_per_ef
+        if ms_per_ef:
+            cap = min(cap, settings.vector_latency_target_ms / ms_per_ef)
+        ef = int(max(top_k, min(ef, cap)))
+        return VectorPlan(hnsw_ef=ef, filtered_points=filtered, selectivity=selectivity)
+
+    def observe(self, plan: VectorPlan, elapsed_ms: float) -> None:
+        """Feed back the latency of an HNSW search run with ``plan``."""
+
+        if plan.exact or not plan.hnsw_ef:
+            return
+        sample = elapsed_ms / plan.hnsw_ef
+        with self._lock:
+            self._ms_per_ef = sample if self._ms_per_ef is None else self._ms_per_ef * 0.95 + sample * 0.05
@@ -0,0 +1,114 @@
+"""Reuse of cached search results for near-duplicate queries."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+import numpy as np
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class SemanticMatch:
+    query: str
+    cache_key: Hashable
+    similarity: float
+
+
+class _Scope:
+    """Ring buffer of unit query vectors that starts small and doubles up to ``capacity`` rows."""
+
+    def __init__(self, capacity: int, dim: int) -> None:
+        self.capacity = capacity
+        self.vectors = np.zeros((min(8, capacity), dim), dtype=np.float32)
+        self.entries: list[tuple[str, Hashable, float]] = []
+        self.next = 0
+
+    def append(self, qvec: np.ndarray, entry: tuple[str, Hashable, float]) -> None:
+        if len(self.entries) < self.capacity:
+            if len(self.entries) == len(self.vectors):
+                grown = np.zeros((min(self.capacity, 2 * len(self.vectors)), self.vectors.shape[1]), np.float32)
+                grown[: len(self.vectors)] = self.vectors
+                self.vectors = grown
+            self.vectors[len(self.entries)] = qvec
+            self.entries.append(entry)
+            return
+        self.vectors[self.next] = qvec
+        self.entries[self.next] = entry
+        self.next = (self.next + 1) % self.capacity
+
+
+class SemanticCache:
+    """Recent query embeddings per search scope, matched by cosine similarity.
+
+    A scope is everything in the search cache key except the query text
+    (tenant, repos with their index generations, filters, ``top_k``), so a
+    match can only return results computed for the same scope and index
+    state. Each scope holds the last ``SEMANTIC_CACHE_QUERIES`` query vectors
+    in a ring buffer searched by brute force (one matrix-vector product).
+    Buffers start at 8 rows and double as queries arrive, so rarely used
+    scopes stay small. At most ``SEMANTIC_CACHE_SCOPES`` scopes and ``SEMANTIC_CACHE_MAX_MB``
+    of vectors are kept, least recently used scope first out.
+    """
+
+    def __init__(self, *, time_func: Callable[[], float] | None = None) -> None:
+        self._time = time_func or time.time
+        self._lock = threading.Lock()
+        self._scopes: OrderedDict[Hashable, _Scope] = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def lookup(self, scope: Hashable, qvec) -> SemanticMatch | None:
+        """The most similar recent query in ``scope`` at or above ``SEMANTIC_CACHE_THRESHOLD``."""
+
+        qvec = self._unit(qvec)
+        cutoff = self._time() - settings.semantic_cache_ttl_s
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None or entry.vectors.shape[1] != qvec.shape[0]:
+                return None
+            self._scopes.move_to_end(scope)
+            sims = entry.vectors[: len(entry.entries)] @ qvec
+            live = np.array([e[2] >= cutoff for e in entry.entries], dtype=bool)
+            sims[~live] = -1.0
+            best = int(np.argmax(sims))
+            if sims[best] < settings.semantic_cache_threshold:
+                return None
+            query, cache_key, _ = entry.entries[best]
+        return SemanticMatch(query=query, cache_key=cache_key, similarity=round(float(sims[best]), 4))
+
+    def add(self, scope: Hashable, qvec, query: str, cache_key: Hashable) -> None:
+        qvec = self._unit(qvec)
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None or entry.vectors.shape[1] != qvec.shape[0]:
+                if entry is not None:
+                    self._bytes -= entry.vectors.nbytes
+                entry = _Scope(max(1, settings.semantic_cache_queries), qvec.shape[0])
+                self._scopes[scope] = entry
+                self._bytes += entry.vectors.nbytes
+            self._scopes.move_to_end(scope)
+            before = entry.vectors.nbytes
+            entry.append(qvec, (query, cache_key, self._time()))
+            self._bytes += entry.vectors.nbytes - before
+            max_bytes = settings.semantic_cache_max_mb * 1024 * 1024
+            while len(self._scopes) > 1 and (
+                len(self._scopes) > settings.semantic_cache_scopes or self._bytes > max_bytes
+            ):
+                _, dropped = self._scopes.popitem(last=False)
+                self._bytes -= dropped.vectors.nbytes
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return self._bytes
@@ -0,0 +1,156 @@
+"""Search-as-you-type suggestions for paths and symbols."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from app.config import settings
+from app.index.opensearch_store import OSStore
+from app.search.prefix_table import PrefixTable, PrefixTableCache
+from app.search.symbol_index import SymbolIndex, symbol_keys
+
+SUGGEST_TYPES = ("path", "symbol")
+
+
+def path_keys(entry: dict) -> list[str]:
+    """Every ``/``-suffix of the path, so ``login``, ``auth/lo`` and ``src/auth`` all match ``src/auth/login.py``."""
+
+    parts = entry["rel_path"].split("/")
+    return ["/".join(parts[i:]) for i in range(len(parts))]
+
+
+def _keys(candidate: tuple) -> list[str]:
+    kind, entry = candidate
+    return [key.lower() for key in (path_keys(entry) if kind == "path" else symbol_keys(entry))]
+
+
+def _text(candidate: tuple) -> str:
+    kind, entry = candidate
+    return entry["rel_path"] if kind == "path" else entry["qualified_name"]
+
+
+def _item(candidate: tuple) -> dict:
+    kind, entry = candidate
+    if kind == "path":
+        return {"type": "path", "text": entry["rel_path"], "rel_path": entry["rel_path"]}
+    return {
+        "type": "symbol",
+        "text": entry["qualified_name"],
+        "rel_path": entry["rel_path"],
+        "line_start": entry["line_start"],
+        "kind": entry["kind"],
+    }
+
+
+@dataclass
+class _Session:
+    scope: tuple
+    needle: str
+    candidates: list[tuple]
+    complete: bool
+    touched_at: float
+
+
+class Suggester:
+    """Prefix completions answered from in-process ``PrefixTable`` s.
+
+    Path tables hold the distinct ``rel_path`` values indexed in OpenSearch and
+    share ``SYMBOL_INDEX_TTL_S``/``SYMBOL_INDEX_MAX_REPOS`` with the symbol
+    tables. Per ``session_id`` the last candidate set is remembered: while the
+    user keeps typing (the new prefix extends the previous one) and that set
+    was complete (at most ``SUGGEST_CANDIDATES`` per type), it is filtered in
+    place instead of scanning the tables again.
+    """
+
+    def __init__(
+        self,
+        symbols: SymbolIndex,
+        opensearch: OSStore,
+        *,
+        time_func: Callable[[], float] | None = None,
+    ) -> None:
+        self._symbols = symbols
+        self._time = time_func or time.monotonic
+        self._paths = PrefixTableCache(
+            lambda tenant, repo_id: PrefixTable(
+                [{"rel_path": path} for path in opensearch.rel_paths(tenant, repo_id)], path_keys
+            ),
+            settings.symbol_index_ttl_s,
+            settings.symbol_index_max_repos,
+            time_func=time_func,
+        )
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+
+    def is_fresh(self, tenant: str, repo_id: str, types: Sequence[str] = SUGGEST_TYPES) -> bool:
+        """True when suggestions for this repo will not have to load a table from OpenSearch."""
+
+        return ("path" not in types or self._paths.is_fresh(tenant, repo_id)) and (
+            "symbol" not in types or self._symbols.is_fresh(tenant, repo_id)
+        )
+
+    def invalidate(self, tenant: str, repo_id: str) -> None:
+        self._paths.invalidate(tenant, repo_id)
+
+    def _candidates(self, tenant: str, repo_id: str, needle: str, types: Sequence[str]) -> tuple[list[tuple], bool]:
+        cap = settings.suggest_candidates
+        candidates: list[tuple] = []
+        complete = True
+        if "path" in types:
+            found = list(itertools.islice(self._paths.get(tenant, repo_id).scan(needle), cap + 1))
+            complete = len(found) <= cap
+            candidates.extend(("path", entry) for entry in found[:cap])
+        if "symbol" in types:
+            found = list(itertools.islice(self._symbols.table(tenant, repo_id).scan(needle), cap + 1))
+            complete = complete and len(found) <= cap
+            candidates.extend(("symbol", entry) for entry in found[:cap])
+        return candidates, complete
+
+    def suggest(
+        self,
+        tenant: str,
+        repo_id: str,
+        prefix: str,
+        *,
+        types: Sequence[str] = SUGGEST_TYPES,
+        limit: int = 20,
+        session_id: str | None = None,
+    ) -> tuple[list[dict], bool]:
+        """Return ``(suggestions, reused)`` for ``prefix``, exact key matches first, then shortest."""
+
+        needle = prefix.strip().lower()
+        if not needle:
+            return [], False
+        scope = (tenant, repo_id, tuple(sorted(types)))
+        now = self._time()
+        session = None
+        if session_id:
+            with self._lock:
+                session = self._sessions.get(session_id)
+        reused = (
+            session is not None
+            and session.complete
+            and session.scope == scope
+            and needle.startswith(session.needle)
+            and now - session.touched_at < settings.suggest_session_ttl_s
+        )
+        if reused:
+            candidates = [c for c in session.candidates if any(key.startswith(needle) for key in _keys(c))]
+            complete = True
+        else:
+            candidates, complete = self._candidates(tenant, repo_id, needle, types)
+        if session_id:
+            with self._lock:
+                self._sessions[session_id] = _Session(scope, needle, candidates, complete, now)
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > settings.suggest_max_sessions:
+                    self._sessions.popitem(last=False)
+
+        ranked = heapq.nsmallest(limit, candidates, key=lambda c: (needle not in _keys(c), len(_text(c)), _text(c)))
+        return [_item(c) for c in ranked], reused
@@ -0,0 +1,81 @@
+"""In-process symbol tables for exact and prefix lookups."""
+
+from __future__ import annotations
+
+from typing import Callable
+
+from app.config import settings
+from app.index.symbol_store import SymbolStore
+from app.search.prefix_table import PrefixTable, PrefixTableCache
+
+
+def symbol_keys(symbol: dict) -> tuple[str, str]:
+    return symbol["name"], symbol["qualified_name"]
+
+
+class SymbolIndex:
+    """Sorted, case-folded symbol keys per ``(tenant, repo)`` searched with ``bisect``.
+
+    Every symbol is reachable by its short name and its qualified name. Tables
+    are loaded from ``SymbolStore`` on first use, refreshed after
+    ``SYMBOL_INDEX_TTL_S`` and kept for at most ``SYMBOL_INDEX_MAX_REPOS``
+    repos (least recently used first out). Uploads through this process
+    invalidate the affected table immediately.
+    """
+
+    def __init__(self, store: SymbolStore, *, time_func: Callable[[], float] | None = None) -> None:
+        self._store = store
+        self._tables = PrefixTableCache(
+            lambda tenant, repo_id: PrefixTable(store.load(tenant, repo_id), symbol_keys),
+            settings.symbol_index_ttl_s,
+            settings.symbol_index_max_repos,
+            time_func=time_func,
+        )
+
+    def table(self, tenant: str, repo_id: str) -> PrefixTable:
+        """The repo's symbol table, loading or refreshing it from the store when needed."""
+
+        return self._tables.get(tenant, repo_id)
+
+    def is_fresh(self, tenant: str, repo_id: str) -> bool:
+        """True when a lookup for this repo will not have to load from the store."""
+
+        return self._tables.is_fresh(tenant, repo_id)
+
+    def replace(self, tenant: str, repo_id: str, paths: list[str], symbols: list[dict]) -> int:
+        count = self._store.replace(tenant, repo_id, paths, symbols)
+        self.invalidate(tenant, repo_id)
+        return count
+
+    def invalidate(self, tenant: str, repo_id: str) -> None:
+        self._tables.invalidate(tenant, repo_id)
+
+    def lookup(
+        self,
+        tenant: str,
+        repo_id: str,
+        query: str,
+        *,
+        prefix: bool = False,
+        kind: str | None = None,
+        limit: int = 50,
+    ) -> list[dict]:
+        """Symbols whose name or qualified name equals (or starts with) ``query``, case-insensitively.
+
+        Exact lookups list case-sensitive matches first; prefix lookups return
+        keys in sorted order, so shorter completions come first.
+        """
+
+        needle = query.strip()
+        if not needle:
+            return []
+        found: list[dict] = []
+        for symbol in self.table(tenant, repo_id).scan(needle, prefix=prefix):
+            if kind and symbol.get("kind") != kind:
+                continue
+            found.append(symbol)
+            if prefix and len(found) >= limit:
+                break
+        if not prefix:
+            found.sort(key=lambda s: (needle not in symbol_keys(s), s["qualified_name"]))
+        return found[:limit]
@@ -0,0 +1,229 @@
+"""Admission control between interactive search and background ingest."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterable
+
+from fastapi import HTTPException
+
+
+@dataclass(frozen=True)
+class AdmissionPool:
+    """Concurrency limits of one class of work.
+
+    ``tenant_share`` caps the fraction of slots (and of queue places) one
+    tenant may hold while other tenants are waiting. A pool does not start new
+    work while a pool of higher ``priority`` has requests queued.
+    """
+
+    name: str
+    concurrency: int
+    max_queue: int = 256
+    max_wait_s: float = 1.0
+    tenant_share: float = 0.5
+    priority: int = 0
+
+
+@dataclass
+class _Waiter:
+    tenant: str
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    admitted: bool = False
+
+
+@dataclass
+class _PoolState:
+    config: AdmissionPool
+    active: int = 0
+    queued: int = 0
+    active_by_tenant: Counter = field(default_factory=Counter)
+    # tenants with waiters, in round-robin order: a tenant that was served moves to the back
+    queues: OrderedDict = field(default_factory=OrderedDict)
+    counters: dict = field(default_factory=lambda: {"admitted": 0, "rejected": 0, "timeouts": 0})
+    avg_wait_ms: float = 0.0
+    avg_hold_s: float = 0.1
+
+    @property
+    def tenant_slots(self) -> int:
+        return max(1, math.floor(self.config.concurrency * self.config.tenant_share))
+
+    @property
+    def tenant_queue(self) -> int:
+        return max(1, math.floor(self.config.max_queue * self.config.tenant_share))
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class Admission:
+    """A held slot; ``release()`` it (once is enough) when the work is done."""
+
+    def __init__(self, controller: AdmissionController, state: _PoolState, tenant: str, started: float) -> None:
+        self._controller = controller
+        self._state = state
+        self._tenant = tenant
+        self._started = started
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self._state, self._tenant, self._started)
+
+
+class AdmissionController:
+    """Bounded concurrency per pool with priorities and per-tenant fair share.
+
+    A request either starts at once or waits in its tenant's queue; free
+    slots go to queued tenants round-robin, preferring tenants under their
+    share. Requests are shed with 503 and ``Retry-After`` when the pool's or
+    the tenant's queue is full, or when no slot frees up within the pool's
+    ``max_wait_s`` (or the caller's shorter ``timeout_s``). ``stats()``
+    reports active work, queue depth and wait time per pool.
+    """
+
+    def __init__(self, pools: Iterable[AdmissionPool], *, time_func: Callable[[], float] | None = None) -> None:
+        self._pools = {pool.name: _PoolState(pool) for pool in pools}
+        self._order = sorted(self._pools.values(), key=lambda state: -state.config.priority)
+        self._time = time_func or time.monotonic
+        self._lock = threading.Lock()
+
+    def _blocked(self, state: _PoolState) -> bool:
+        return any(other.queued for other in self._order if other.config.priority > state.config.priority)
+
+    def _can_start(self, state: _PoolState, tenant: str) -> bool:
+        if state.active >= state.config.concurrency:
+            return False
+        # past its share only while no other tenant is waiting for this pool
+        return state.active_by_tenant[tenant] < state.tenant_slots or all(t == tenant for t in state.queues)
+
+    def _start(self, state: _PoolState, tenant: str) -> None:
+        state.active += 1
+        state.active_by_tenant[tenant] += 1
+        state.counters["admitted"] += 1
+
+    def _overloaded(self, state: _PoolState, reason: str) -> HTTPException:
+        wait_s = state.avg_hold_s * (state.queued + 1) / state.config.concurrency
+        return HTTPException(
+            status_code=503,
+            detail=f"{state.config.name} is overloaded: {reason}",
+            headers={"Retry-After": str(max(1, math.ceil(wait_s)))},
+        )
+
+    def _dequeue(self, state: _PoolState, waiter: _Waiter) -> None:
+        queue = state.queues[waiter.tenant]
+        queue.remove(waiter)
+        state.queued -= 1
+        if not queue:
+            del state.queues[waiter.tenant]
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, highest priority first. Call with the lock held."""
+
+        for state in self._order:
+            while state.queued and state.active < state.config.concurrency:
+                tenant = next(
+                    (t for t in state.queues if state.active_by_tenant[t] < state.tenant_slots),
+                    next(iter(state.queues)),
+                )
+                waiter = state.queues[tenant][0]
+                self._dequeue(state, waiter)
+                if tenant in state.queues:
+                    state.queues.move_to_end(tenant)
+                if waiter.loop.is_closed():
+                    continue
+                waiter.admitted = True
+                self._start(state, tenant)
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+            if state.queued:
+                return
+
+    def _release(self, state: _PoolState, tenant: str, started: float) -> None:
+        held_s = self._time() - started
+        with self._lock:
+            state.active -= 1
+            state.active_by_tenant[tenant] -= 1
+            if state.active_by_tenant[tenant] <= 0:
+                del state.active_by_tenant[tenant]
+            state.avg_hold_s = state.avg_hold_s * 0.95 + held_s * 0.05
+            self._dispatch()
+
+    def _record_wait(self, state: _PoolState, wait_s: float) -> None:
+        with self._lock:
+            state.avg_wait_ms = state.avg_wait_ms * 0.95 + wait_s * 1000 * 0.05
+
+    async def acquire(self, pool: str, tenant: str, *, timeout_s: float | None = None) -> Admission:
+        """Wait for a slot in ``pool`` for ``tenant``, raising 503 when it cannot be had in time."""
+
+        state = self._pools[pool]
+        enqueued = self._time()
+        with self._lock:
+            if not state.queued and not self._blocked(state) and self._can_start(state, tenant):
+                self._start(state, tenant)
+                waiter = None
+            elif state.queued >= state.config.max_queue:
+                state.counters["rejected"] += 1
+                raise self._overloaded(state, "queue is full")
+            elif len(state.queues.get(tenant, ())) >= state.tenant_queue:
+                state.counters["rejected"] += 1
+                raise self._overloaded(state, f"tenant {tenant} has too many queued requests")
+            else:
+                loop = asyncio.get_running_loop()
+                waiter = _Waiter(tenant, loop, loop.create_future())
+                state.queues.setdefault(tenant, deque()).append(waiter)
+                state.queued += 1
+
+        if waiter is not None:
+            timeout = state.config.max_wait_s if timeout_s is None else min(timeout_s, state.config.max_wait_s)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), max(0.0, timeout))
+            except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+                with self._lock:
+                    admitted = waiter.admitted
+                    if not admitted:
+                        self._dequeue(state, waiter)
+                        self._dispatch()  # lower-priority pools may have been held back by this waiter
+                        state.counters["rejected"] += 1
+                        if isinstance(exc, asyncio.TimeoutError):
+                            state.counters["timeouts"] += 1
+                            raise self._overloaded(state, "timed out waiting for a slot") from None
+                        raise
+                if isinstance(exc, asyncio.CancelledError):  # a slot came through as we were cancelled
+                    self._release(state, tenant, self._time())
+                    raise
+
+        started = self._time()
+        self._record_wait(state, started - enqueued)
+        return Admission(self, state, tenant, started)
+
+    @asynccontextmanager
+    async def admit(self, pool: str, tenant: str, *, timeout_s: float | None = None) -> AsyncIterator[Admission]:
+        admission = await self.acquire(pool, tenant, timeout_s=timeout_s)
+        try:
+            yield admission
+        finally:
+            admission.release()
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            stats: dict[str, float] = {}
+            for name, state in self._pools.items():
+                prefix = f"admission_{name}"
+                stats[f"{prefix}_active"] = state.active
+                stats[f"{prefix}_queued"] = state.queued
+                stats[f"{prefix}_queued_tenants"] = len(state.queues)
+                stats[f"{prefix}_avg_wait_ms"] = round(state.avg_wait_ms, 3)
+                for counter, value in state.counters.items():
+                    stats[f"{prefix}_{counter}_total"] = value
+            return stats
@@ -5,11 +5,12 @@ from __future__ import annotations
 import hashlib
 import json
 import logging
+import sqlite3
 import threading
 import time
 from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Callable, Hashable, Iterable
+from typing import Any, Callable, Hashable, Iterable, Sequence
 
 try:  # pragma: no cover - optional dependency
     from redis import Redis
@@ -19,38 +20,92 @@ except ModuleNotFoundError:  # pragma: no cover - fallback for tests
 
     Redis = Any  # type: ignore[assignment]
 
+import numpy as np
+
 from app.search.providers.embedding import EmbeddingProvider
+from app.services.embedding_store import EmbeddingStore
+from app.services.index_generation import IndexGenerations
+from app.services.invalidation import InvalidationBus
+from app.services.vector_codec import VECTOR_DTYPES, decode_vector, encode_vector, quantize_int8
 
 logger = logging.getLogger(__name__)
 
 
-class _LRUCache:
-    """Thread-safe LRU cache used for embedding reuse."""
+class _VectorSlab:
+    """Thread-safe LRU of vectors stored as rows of one preallocated NumPy array.
 
-    def __init__(self, max_size: int) -> None:
-        self._max_size = max_size
-        self._lock = threading.Lock()
-        self._store: OrderedDict[str, list[float]] = OrderedDict()
+    An ``OrderedDict`` maps keys to row numbers and evicted rows are reused.
+    The slab is allocated on the first insert, once the dimension is known, as
+    ``max_size x dim`` of ``dtype`` (int8 rows keep a float32 scale each), so a
+    1024-dim float32 vector costs 4 KB instead of ~32 KB as a list of floats.
+    """
 
-    def get(self, key: str) -> list[float] | None:
+    def __init__(self, max_size: int, dtype: str = "float32") -> None:
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"unsupported vector dtype {dtype!r}; expected one of {', '.join(VECTOR_DTYPES)}")
+        self._max_size = max(1, max_size)
+        self._dtype = dtype
+        self._lock = threading.Lock()
+        self._rows: OrderedDict[str, int] = OrderedDict()
+        self._free: list[int] = []
+        self._data: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+
+    def _allocate(self, dim: int) -> None:
+        self._data = np.zeros((self._max_size, dim), dtype=self._dtype)
+        self._scales = np.ones(self._max_size, dtype=np.float32) if self._dtype == "int8" else None
+        self._rows.clear()
+        self._free = list(range(self._max_size - 1, -1, -1))
+
+    def get(self, key: str) -> np.ndarray | None:
         with self._lock:
-            if key not in self._store:
+            row = self._rows.get(key)
+            if row is None or self._data is None:
                 return None
-            value = self._store.pop(key)
-            self._store[key] = value
-            return value
+            self._rows.move_to_end(key)
+            # a single row copy, since rows are reused after eviction; float16/int8 widen here
+            vector = self._data[row].astype(np.float32)
+            if self._scales is not None:
+                vector *= self._scales[row]
+            return vector
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if self._data is None or self._data.shape[1] != vector.shape[0]:
+                self._allocate(vector.shape[0])
+            assert self._data is not None
+            row = self._rows.pop(key, None)
+            if row is None:
+                row = self._free.pop() if self._free else self._rows.popitem(last=False)[1]
+            if self._scales is not None:
+                self._data[row], self._scales[row] = quantize_int8(vector)
+            else:
+                self._data[row] = vector
+            self._rows[key] = row
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._rows)
 
-    def put(self, key: str, value: list[float]) -> None:
+    @property
+    def nbytes(self) -> int:
         with self._lock:
-            if key in self._store:
-                self._store.pop(key)
-            self._store[key] = value
-            while len(self._store) > self._max_size:
-                self._store.popitem(last=False)
+            size = self._data.nbytes if self._data is not None else 0
+            return size + (self._scales.nbytes if self._scales is not None else 0)
 
 
 class EmbeddingCache:
-    """Provides cached access to embedding encodings with optional Redis backing."""
+    """Provides cached access to embedding encodings with optional Redis backing.
+
+    Vectors are cached as compact binary (``dtype`` float32, float16 or int8)
+    in Redis and in a ``_VectorSlab`` locally, keyed by the SHA-256 of the
+    text. Encodings are returned as float32 NumPy arrays.
+
+    Lookups go slab, Redis, then the optional on-disk ``store`` before the
+    provider. Redis keys carry a tag of ``model_id`` so a model change never
+    serves vectors from the previous model.
+    """
 
     def __init__(
         self,
@@ -59,17 +114,45 @@ class EmbeddingCache:
         *,
         redis_client: Redis | None = None,
         ttl_seconds: int | None = None,
+        dtype: str = "float32",
+        model_id: str = "",
+        store: EmbeddingStore | None = None,
     ) -> None:
         self._provider = provider
-        self._cache = _LRUCache(max_size)
+        self._model_tag = hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:12] if model_id else ""
+        self._store = store
+        self._cache = _VectorSlab(max_size, dtype)
+        self._dtype = dtype
         self._redis = redis_client
         self._ttl = ttl_seconds
         self._redis_enabled = redis_client is not None
         self._redis_warned = False
 
-    def _redis_key(self, text: str) -> str:
-        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
-        return f"embeddings:{digest}"
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _redis_key(self, digest: str) -> str:
+        return f"embeddings:{self._model_tag}:{digest}" if self._model_tag else f"embeddings:{digest}"
+
+    def _from_store(self, digests: list[str]) -> dict[str, np.ndarray]:
+        if not digests or self._store is None:
+            return {}
+        try:
+            return self._store.get_many(digests)
+        except (sqlite3.Error, ValueError) as exc:
+            logger.warning("Embedding store read failed; disabling it", exc_info=exc)
+            self._store = None
+            return {}
+
+    def _to_store(self, vectors: dict[str, np.ndarray]) -> None:
+        if not vectors or self._store is None:
+            return
+        try:
+            self._store.put_many(vectors)
+        except sqlite3.Error as exc:
+            logger.warning("Embedding store write failed; disabling it", exc_info=exc)
+            self._store = None
 
     def _disable_redis(self, message: str, *, exc: Exception | None = None) -> None:
         if not self._redis_warned:
@@ -77,37 +160,61 @@ class EmbeddingCache:
             self._redis_warned = True
         self._redis_enabled = False
 
-    def encode(self, text: str) -> list[float]:
-        cached = self._cache.get(text)
-        if cached is not None:
-            return cached
+    def encode(self, text: str) -> np.ndarray:
+        return self.encode_many([text])[0]
 
-        if self._redis_enabled and self._redis is not None:
-            key = self._redis_key(text)
-            try:
-                payload = self._redis.get(key)
-                if payload is not None:
-                    vector = json.loads(payload.decode("utf-8"))
-                    self._cache.put(text, vector)
-                    return vector
-            except (RedisError, json.JSONDecodeError) as exc:
-                self._disable_redis("Redis embedding cache read failed", exc=exc)
+    def encode_many(self, texts: Sequence[str]) -> list[np.ndarray]:
+        """Encode ``texts`` with at most one Redis ``MGET``, one provider batch and one pipelined write.
+
+        The local slab is checked first, so texts already held in process cost
+        no network call; vectors found on disk are copied back to Redis.
+        """
 
-        vector = self._provider.encode([text], normalize_embeddings=True)[0]
-        self._cache.put(text, vector)
+        digests = [self._digest(text) for text in texts]
+        vectors: list[np.ndarray | None] = [self._cache.get(digest) for digest in digests]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
 
-        if self._redis_enabled and self._redis is not None:
-            key = self._redis_key(text)
+        if missing and self._redis_enabled and self._redis is not None:
             try:
-                data = json.dumps(vector).encode("utf-8")
-                if self._ttl:
-                    self._redis.set(key, data, ex=self._ttl)
-                else:
-                    self._redis.set(key, data)
-            except RedisError as exc:
-                self._disable_redis("Redis embedding cache write failed", exc=exc)
+                payloads = self._redis.mget([self._redis_key(digests[i]) for i in missing])
+                for i, payload in zip(missing, payloads):
+                    if payload is not None:
+                        vectors[i] = decode_vector(payload)
+                        self._cache.put(digests[i], vectors[i])
+            except (RedisError, ValueError) as exc:
+                self._disable_redis("Redis embedding cache read failed", exc=exc)
 
-        return vector
+        on_disk = self._from_store([digests[i] for i, vector in enumerate(vectors) if vector is None])
+        for digest, vector in on_disk.items():
+            self._cache.put(digest, vector)
+
+        todo = {digests[i]: texts[i] for i, vector in enumerate(vectors) if vector is None and digests[i] not in on_disk}
+        encoded: dict[str, np.ndarray] = {}
+        if todo:
+            batch = self._provider.encode(list(todo.values()), normalize_embeddings=True)
+            encoded = {digest: np.asarray(vector, dtype=np.float32) for digest, vector in zip(todo, batch)}
+            for digest, vector in encoded.items():
+                self._cache.put(digest, vector)
+            self._to_store(encoded)
+
+        fresh = {**on_disk, **encoded}
+        if fresh:
+            vectors = [fresh.get(digest) if vector is None else vector for digest, vector in zip(digests, vectors)]
+
+            if self._redis_enabled and self._redis is not None:
+                try:
+                    pipe = self._redis.pipeline(transaction=False)
+                    for digest, vector in fresh.items():
+                        data = encode_vector(vector, self._dtype)
+                        if self._ttl:
+                            pipe.set(self._redis_key(digest), data, ex=self._ttl)
+                        else:
+                            pipe.set(self._redis_key(digest), data)
+                    pipe.execute()
+                except RedisError as exc:
+                    self._disable_redis("Redis embedding cache write failed", exc=exc)
+
+        return vectors  # type: ignore[return-value]
 
 
 @dataclass(frozen=True)
@@ -117,10 +224,30 @@ class SearchCacheEntry:
     bucket: str
     search_id: str
     timestamp: float
+    depth: int = 0
+    ttl: float = 0.0  # seconds it was written for; 0 means the cache's default TTL
 
 
 class SearchCache:
-    """Cache for search responses with TTL semantics and optional Redis."""
+    """Two-tier cache for search responses: in-process LRU in front of optional Redis.
+
+    Lookups are local first and only go to Redis (one ``MGET`` for
+    ``get_many``) on a local miss; Redis hits are copied into the local tier.
+    Writes go to both tiers and, through ``bus``, tell other processes to
+    drop their local copy of the key, which matters for keys that are
+    rewritten such as paged candidate lists.
+
+    The local tier is an LRU bounded by ``max_entries`` and by ``max_bytes``
+    of serialised entry size; a background thread drops expired entries every
+    ``sweep_interval_s`` so unique queries that are never read again do not
+    pile up. ``stats()`` reports hits, misses, evictions and expirations.
+
+    Entries are written for ``shared_ttl_seconds`` only while other processes'
+    index generation bumps reach this one (``bus`` listening and
+    ``generations`` Redis-backed), otherwise for ``ttl_seconds``. The choice
+    is made on every write and read, so once invalidation stops working no
+    entry older than ``ttl_seconds`` is served.
+    """
 
     def __init__(
         self,
@@ -128,14 +255,36 @@ class SearchCache:
         *,
         time_func: Callable[[], float] | None = None,
         redis_client: Redis | None = None,
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        sweep_interval_s: float | None = None,
+        bus: InvalidationBus | None = None,
+        shared_ttl_seconds: int | None = None,
+        generations: IndexGenerations | None = None,
     ) -> None:
         self._ttl = ttl_seconds
+        self._shared_ttl = shared_ttl_seconds
+        self._generations = generations
         self._time = time_func or time.time
         self._lock = threading.Lock()
-        self._store: dict[Hashable, SearchCacheEntry] = {}
+        self._store: OrderedDict[str, tuple[SearchCacheEntry, int]] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._counters = {"hits": 0, "local_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
         self._redis = redis_client
         self._redis_enabled = redis_client is not None
         self._redis_warned = False
+        self._bus = bus
+        if bus is not None:
+            bus.subscribe("search", self._invalidate_local)
+        self._stop = threading.Event()
+        self._sweeper: threading.Thread | None = None
+        if sweep_interval_s:
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, args=(sweep_interval_s,), name="search-cache-sweeper", daemon=True
+            )
+            self._sweeper.start()
 
     def _redis_key(self, key: Hashable) -> str:
         try:
@@ -145,22 +294,30 @@ class SearchCache:
         digest = hashlib.sha256(serialised.encode("utf-8")).hexdigest()
         return f"search-cache:{digest}"
 
+    def _current_ttl(self) -> float:
+        """TTL for entries written now: the shared one only while invalidation reaches this process."""
+
+        shared = (
+            self._shared_ttl
+            and self._redis_enabled
+            and self._bus is not None
+            and self._bus.listening
+            and self._generations is not None
+            and self._generations.shared
+        )
+        return self._shared_ttl if shared else self._ttl  # type: ignore[return-value]
+
+    def _expired(self, entry: SearchCacheEntry, now: float, current_ttl: float) -> bool:
+        return now - entry.timestamp > min(entry.ttl or self._ttl, current_ttl)
+
     def _disable_redis(self, message: str, *, exc: Exception | None = None) -> None:
         if not self._redis_warned:
             logger.warning("%s; falling back to local search cache", message, exc_info=exc)
             self._redis_warned = True
         self._redis_enabled = False
 
-    def _from_redis(self, key: Hashable) -> SearchCacheEntry | None:
-        if not self._redis_enabled or self._redis is None:
-            return None
-        try:
-            payload = self._redis.get(self._redis_key(key))
-        except RedisError as exc:
-            self._disable_redis("Redis search cache read failed", exc=exc)
-            return None
-        if payload is None:
-            return None
+    @staticmethod
+    def _deserialise(payload: bytes) -> SearchCacheEntry | None:
         try:
             data = json.loads(payload.decode("utf-8"))
             return SearchCacheEntry(
@@ -169,43 +326,96 @@ class SearchCache:
                 bucket=data["bucket"],
                 search_id=data["search_id"],
                 timestamp=data["timestamp"],
+                depth=data.get("depth", 0),
+                ttl=data.get("ttl", 0.0),
             )
         except (KeyError, json.JSONDecodeError) as exc:
             logger.debug("Invalid entry in Redis search cache", exc_info=exc)
             return None
 
-    def _store_redis(self, key: Hashable, entry: SearchCacheEntry) -> None:
-        if not self._redis_enabled or self._redis is None:
-            return
-        payload = json.dumps(
+    @staticmethod
+    def _serialise(entry: SearchCacheEntry) -> bytes:
+        return json.dumps(
             {
                 "hits": entry.hits,
                 "debug": entry.debug,
                 "bucket": entry.bucket,
                 "search_id": entry.search_id,
                 "timestamp": entry.timestamp,
-            }
+                "depth": entry.depth,
+                "ttl": entry.ttl,
+            },
+            default=str,
         ).encode("utf-8")
+
+    def _from_redis(self, redis_keys: list[str]) -> list[SearchCacheEntry | None]:
+        if not redis_keys or not self._redis_enabled or self._redis is None:
+            return [None] * len(redis_keys)
         try:
-            self._redis.set(self._redis_key(key), payload, ex=self._ttl)
+            payloads = self._redis.mget(redis_keys)
         except RedisError as exc:
-            self._disable_redis("Redis search cache write failed", exc=exc)
+            self._disable_redis("Redis search cache read failed", exc=exc)
+            return [None] * len(redis_keys)
+        found: list[SearchCacheEntry | None] = []
+        now, current_ttl = self._time(), self._current_ttl()
+        for redis_key, payload in zip(redis_keys, payloads):
+            entry = self._deserialise(payload) if payload is not None else None
+            if entry is not None and self._expired(entry, now, current_ttl):
+                entry = None  # written for the shared TTL, but invalidation is down now
+            if entry is not None:
+                self._put_local(redis_key, entry, len(payload))
+            found.append(entry)
+        return found
 
     def get(self, key: Hashable) -> SearchCacheEntry | None:
-        entry = self._from_redis(key)
-        if entry is not None:
-            return entry
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Sequence[Hashable]) -> list[SearchCacheEntry | None]:
+        """Look up several keys: local tier first, then one Redis ``MGET`` for the misses."""
+
+        redis_keys = [self._redis_key(key) for key in keys]
+        found = [self._get_local(redis_key) for redis_key in redis_keys]
+        local_hits = sum(entry is not None for entry in found)
+        missing = [i for i, entry in enumerate(found) if entry is None]
+        for i, entry in zip(missing, self._from_redis([redis_keys[i] for i in missing])):
+            found[i] = entry
+        hits = sum(entry is not None for entry in found)
+        with self._lock:
+            self._counters["hits"] += hits
+            self._counters["local_hits"] += local_hits
+            self._counters["misses"] += len(found) - hits
+        return found
 
-        now = self._time()
+    def _get_local(self, redis_key: str) -> SearchCacheEntry | None:
+        now, current_ttl = self._time(), self._current_ttl()
         with self._lock:
-            entry = self._store.get(key)
-            if entry is None:
+            item = self._store.get(redis_key)
+            if item is None:
                 return None
-            if now - entry.timestamp > self._ttl:
-                self._store.pop(key, None)
+            entry = item[0]
+            if self._expired(entry, now, current_ttl):
+                self._drop(redis_key)
+                self._counters["expired"] += 1
                 return None
+            self._store.move_to_end(redis_key)
             return entry
 
+    def _put_local(self, redis_key: str, entry: SearchCacheEntry, size: int) -> None:
+        with self._lock:
+            self._drop(redis_key)
+            if size > self._max_bytes:
+                return
+            self._store[redis_key] = (entry, size)
+            self._bytes += size
+            while len(self._store) > self._max_entries or self._bytes > self._max_bytes:
+                self._drop(next(iter(self._store)))
+                self._counters["evictions"] += 1
+
+    def _invalidate_local(self, redis_keys: list[str]) -> None:
+        with self._lock:
+            for redis_key in redis_keys:
+                self._drop(redis_key)
+
     def set(
         self,
         key: Hashable,
@@ -214,18 +424,71 @@ class SearchCache:
         debug: Iterable[dict[str, Any]] | None = None,
         bucket: str,
         search_id: str,
+        depth: int = 0,
     ) -> None:
+        ttl = self._current_ttl()
         entry = SearchCacheEntry(
             hits=list(hits),
             debug=list(debug or []),
             bucket=bucket,
             search_id=search_id,
             timestamp=self._time(),
+            depth=depth,
+            ttl=ttl,
         )
+        payload = self._serialise(entry)
+        redis_key = self._redis_key(key)
+        self._put_local(redis_key, entry, len(payload))
+        if not self._redis_enabled or self._redis is None:
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.set(redis_key, payload, ex=int(ttl))
+            if self._bus is not None:
+                self._bus.publish("search", [redis_key], pipe=pipe)
+            pipe.execute()
+        except RedisError as exc:
+            self._disable_redis("Redis search cache write failed", exc=exc)
+
+    def _drop(self, redis_key: str) -> None:
+        item = self._store.pop(redis_key, None)
+        if item is not None:
+            self._bytes -= item[1]
+
+    def sweep(self) -> int:
+        """Drop expired local entries and return how many were removed."""
+
+        now, current_ttl = self._time(), self._current_ttl()
+        with self._lock:
+            expired = [key for key, (entry, _) in self._store.items() if self._expired(entry, now, current_ttl)]
+            for key in expired:
+                self._drop(key)
+            self._counters["expired"] += len(expired)
+        return len(expired)
+
+    def _sweep_loop(self, interval_s: float) -> None:
+        while not self._stop.wait(interval_s):
+            try:
+                self.sweep()
+            except Exception:  # pragma: no cover - keep the sweeper alive
+                logger.exception("Search cache sweep failed")
+
+    def stats(self) -> dict[str, int]:
         with self._lock:
-            self._store[key] = entry
-        self._store_redis(key, entry)
+            counters = {f"search_cache_{name}": value for name, value in self._counters.items()}
+            counters["search_cache_entries"] = len(self._store)
+            counters["search_cache_bytes"] = self._bytes
+        return counters
+
+    def close(self) -> None:
+        """Stop the background sweeper."""
+
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
 
     def clear(self) -> None:
         with self._lock:
             self._store.clear()
+            self._bytes = 0
@@ -0,0 +1,75 @@
+"""Circuit breakers for search backends."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass
+class _Circuit:
+    failures: int = 0
+    opened_at: float | None = None
+    probing: bool = False
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker keyed by ``(backend, tenant)``.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are skipped without touching the backend. Once ``reset_timeout_s``
+    has passed a single probe is let through (half-open); its outcome closes
+    the circuit again or re-opens it for another timeout.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        *,
+        time_func: Callable[[], float] | None = None,
+    ) -> None:
+        self._threshold = max(1, failure_threshold)
+        self._reset = reset_timeout_s
+        self._time = time_func or time.monotonic
+        self._lock = threading.Lock()
+        self._circuits: dict[tuple[str, str], _Circuit] = {}
+
+    def allow(self, backend: str, tenant: str) -> bool:
+        with self._lock:
+            circuit = self._circuits.get((backend, tenant))
+            if circuit is None or circuit.opened_at is None:
+                return True
+            if circuit.probing or self._time() - circuit.opened_at < self._reset:
+                return False
+            circuit.probing = True
+            return True
+
+    def record_success(self, backend: str, tenant: str) -> None:
+        with self._lock:
+            self._circuits.pop((backend, tenant), None)
+
+    def record_failure(self, backend: str, tenant: str) -> None:
+        with self._lock:
+            circuit = self._circuits.setdefault((backend, tenant), _Circuit())
+            circuit.failures += 1
+            if circuit.probing or circuit.failures >= self._threshold:
+                circuit.opened_at = self._time()
+                circuit.probing = False
+
+    def state(self, backend: str, tenant: str) -> str:
+        """Return ``closed``, ``open`` or ``half_open``."""
+
+        with self._lock:
+            circuit = self._circuits.get((backend, tenant))
+            if circuit is None or circuit.opened_at is None:
+                return "closed"
+            if circuit.probing or self._time() - circuit.opened_at >= self._reset:
+                return "half_open"
+            return "open"
+
+    def open_circuits(self) -> list[tuple[str, str]]:
+        with self._lock:
+            return sorted(key for key, circuit in self._circuits.items() if circuit.opened_at is not None)
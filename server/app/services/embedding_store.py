@@ -0,0 +1,161 @@
+"""Persistent on-disk embedding store keyed by model id and text digest."""
+
+from __future__ import annotations
+
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Callable, Mapping, Sequence
+
+import numpy as np
+
+from app.services.vector_codec import decode_vector, encode_vector
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    model TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, digest)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS vectors_last_used ON vectors (last_used);
+"""
+
+# SQLite's default limit on host parameters is 999 in older builds.
+_CHUNK = 500
+
+
+class EmbeddingStore:
+    """SQLite table of ``(model id, text digest) -> vector`` that survives restarts.
+
+    Rows of any model other than ``model_id`` are never read and are deleted by
+    ``compact``, which also trims the least recently used rows once the
+    payloads exceed ``max_bytes`` and returns the freed pages to the file
+    system. Other models' rows are only dropped when ``compact`` is called
+    explicitly (``scripts/compact_embedding_store.py``); after every
+    ``compact_every`` writes a background thread trims the store to
+    ``max_bytes`` on its own connection, so writers never wait on the trim
+    (WAL lets them continue until its final ``DELETE``). Vectors are stored with ``vector_codec`` in ``dtype``. The database runs
+    in WAL mode so several worker processes can share one file.
+    """
+
+    def __init__(
+        self,
+        path: str | pathlib.Path,
+        model_id: str,
+        *,
+        max_bytes: int = 2 * 1024**3,
+        dtype: str = "float32",
+        compact_every: int = 10000,
+        time_func: Callable[[], float] | None = None,
+    ) -> None:
+        self.model_id = model_id
+        self._max_bytes = max_bytes
+        self._dtype = dtype
+        self._compact_every = compact_every
+        self._time = time_func or time.time
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._path = str(path)
+        self._trim_thread: threading.Thread | None = None
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self._path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get_many(self, digests: Sequence[str]) -> dict[str, np.ndarray]:
+        """Vectors for the ``digests`` stored under the current model; hits are marked as used."""
+
+        found: dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(digests))
+        with self._lock:
+            for start in range(0, len(unique), _CHUNK):
+                chunk = unique[start : start + _CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT digest, payload FROM vectors WHERE model = ? AND digest IN ({','.join('?' * len(chunk))})",
+                    [self.model_id, *chunk],
+                ).fetchall()
+                found.update((digest, decode_vector(payload)) for digest, payload in rows)
+            if found:
+                now = self._time()
+                self._conn.executemany(
+                    "UPDATE vectors SET last_used = ? WHERE model = ? AND digest = ?",
+                    [(now, self.model_id, digest) for digest in found],
+                )
+        return found
+
+    def put_many(self, vectors: Mapping[str, np.ndarray]) -> None:
+        if not vectors:
+            return
+        now = self._time()
+        rows = [(self.model_id, digest, encode_vector(vector, self._dtype), now) for digest, vector in vectors.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._writes += len(rows)
+            if not self._compact_every or self._writes < self._compact_every:
+                return
+            self._writes = 0
+            if self._trim_thread is not None and self._trim_thread.is_alive():
+                return
+            self._trim_thread = threading.Thread(target=self._trim_in_background, name="embedding-store-trim", daemon=True)
+            self._trim_thread.start()
+
+    def _trim_in_background(self) -> None:
+        try:
+            conn = sqlite3.connect(self._path, timeout=30.0, isolation_level=None)
+            try:
+                self._compact(conn, drop_other_models=False)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.warning("Embedding store trim failed", exc_info=True)
+
+    def compact(self, *, drop_other_models: bool = True) -> dict[str, int]:
+        """Drop other models' rows, trim to ``max_bytes`` by least recent use and free the pages."""
+
+        with self._lock:
+            self._writes = 0
+            return self._compact(self._conn, drop_other_models=drop_other_models)
+
+    def _compact(self, conn: sqlite3.Connection, *, drop_other_models: bool) -> dict[str, int]:
+        stale = 0
+        if drop_other_models:
+            stale = conn.execute("DELETE FROM vectors WHERE model != ?", [self.model_id]).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM vectors").fetchone()[0]
+        trimmed = 0
+        if total > self._max_bytes:
+            # trim to 90% so compaction does not run again on the next few writes
+            excess = total - int(self._max_bytes * 0.9)
+            cutoff = conn.execute(
+                "SELECT last_used FROM (SELECT last_used, SUM(LENGTH(payload)) OVER (ORDER BY last_used) AS running "
+                "FROM vectors) WHERE running >= ? ORDER BY last_used LIMIT 1",
+                [excess],
+            ).fetchone()
+            if cutoff is not None:
+                trimmed = conn.execute("DELETE FROM vectors WHERE last_used <= ?", [cutoff[0]]).rowcount
+        if stale or trimmed:
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        remaining = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM vectors").fetchone()
+        if stale or trimmed:
+            logger.info("Compacted embedding store: %s stale-model rows, %s trimmed rows", stale, trimmed)
+        return {"stale": stale, "trimmed": trimmed, "rows": remaining[0], "bytes": remaining[1]}
+
+    def close(self) -> None:
+        if self._trim_thread is not None:
+            self._trim_thread.join()
+        with self._lock:
+            self._conn.close()
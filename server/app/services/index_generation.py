@@ -0,0 +1,145 @@
+"""Per-repo index generation counters used to version cached search results."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+try:  # pragma: no cover - optional dependency
+    from redis import Redis
+    from redis.exceptions import RedisError
+except ModuleNotFoundError:  # pragma: no cover - fallback for tests
+    from app.utils.redis_client import RedisError
+
+    Redis = Any  # type: ignore[assignment]
+
+from app.services.invalidation import InvalidationBus
+
+logger = logging.getLogger(__name__)
+
+
+class IndexGenerations:
+    """Counter per ``(tenant, repo)`` bumped on every write to that repo's index.
+
+    Search cache keys include the generations of the repos a query covers, so
+    a write makes earlier entries unreachable and they simply age out. The
+    counters live in Redis (``index-gen:<tenant>:<repo>``, no expiry) so every
+    API process sees the same value, with an in-memory fallback.
+
+    While ``bus`` is listening, values read from Redis are also kept locally
+    (for at most ``local_ttl_s``) and bumps elsewhere drop them, so a search
+    cache hit needs no Redis round trip at all.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis_client: Redis | None = None,
+        bus: InvalidationBus | None = None,
+        local_ttl_s: float = 30.0,
+        time_func: Callable[[], float] | None = None,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._local: dict[tuple[str, str], int] = {}
+        self._redis = redis_client
+        self._redis_enabled = redis_client is not None
+        self._redis_warned = False
+        self._bus = bus
+        self._local_ttl = local_ttl_s
+        self._time = time_func or time.monotonic
+        self._near: dict[str, tuple[int, float]] = {}
+        self._epoch = 0
+        if bus is not None:
+            bus.subscribe("index-generation", self._invalidate_near)
+
+    @staticmethod
+    def _redis_key(tenant: str, repo_id: str) -> str:
+        return f"index-gen:{tenant}:{repo_id}"
+
+    def _disable_redis(self, message: str, *, exc: Exception | None = None) -> None:
+        if not self._redis_warned:
+            logger.warning("%s; falling back to local index generations", message, exc_info=exc)
+            self._redis_warned = True
+        self._redis_enabled = False
+
+    @property
+    def shared(self) -> bool:
+        """True while the counters live in Redis, i.e. bumps in other processes are seen here."""
+
+        return self._redis_enabled and self._redis is not None
+
+    def _invalidate_near(self, redis_keys: list[str]) -> None:
+        with self._lock:
+            self._epoch += 1
+            for redis_key in redis_keys:
+                self._near.pop(redis_key, None)
+
+    def _near_enabled(self) -> bool:
+        return self._bus is not None and self._bus.listening
+
+    def bump(self, tenant: str, repo_ids: Iterable[str]) -> None:
+        repos = sorted(set(repo_ids))
+        if not repos:
+            return
+        with self._lock:
+            for repo_id in repos:
+                self._local[(tenant, repo_id)] = self._local.get((tenant, repo_id), 0) + 1
+        if self._redis_enabled and self._redis is not None:
+            redis_keys = [self._redis_key(tenant, repo_id) for repo_id in repos]
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for redis_key in redis_keys:
+                    pipe.incr(redis_key)
+                if self._bus is not None:
+                    self._bus.publish("index-generation", redis_keys, pipe=pipe)
+                values = pipe.execute()[: len(redis_keys)]
+            except RedisError as exc:
+                self._disable_redis("Redis index generation bump failed", exc=exc)
+                return
+            now = self._time()
+            with self._lock:
+                self._epoch += 1
+                for redis_key, value in zip(redis_keys, values):
+                    self._near[redis_key] = (int(value), now)
+
+    def current(self, tenant: str, repo_ids: Iterable[str]) -> tuple[tuple[str, int], ...]:
+        """Return ``((repo_id, generation), ...)`` sorted by repo.
+
+        Served from the local near-cache when possible, otherwise with one
+        Redis ``MGET`` for the repos it does not hold.
+        """
+
+        repos = sorted(set(repo_ids))
+        if not repos:
+            return ()
+        if self._redis_enabled and self._redis is not None:
+            redis_keys = [self._redis_key(tenant, repo_id) for repo_id in repos]
+            near = self._near_enabled()
+            now = self._time()
+            values: dict[str, int] = {}
+            with self._lock:
+                epoch = self._epoch
+                if near:
+                    for redis_key in redis_keys:
+                        cached = self._near.get(redis_key)
+                        if cached is not None and now - cached[1] < self._local_ttl:
+                            values[redis_key] = cached[0]
+            missing = [redis_key for redis_key in redis_keys if redis_key not in values]
+            try:
+                if missing:
+                    fetched = self._redis.mget(missing)
+                    values.update((redis_key, int(value or 0)) for redis_key, value in zip(missing, fetched))
+                    if near:
+                        with self._lock:
+                            # skip storing if a bump arrived while we were reading
+                            if self._epoch == epoch:
+                                if len(self._near) > 100000:
+                                    self._near.clear()
+                                self._near.update((redis_key, (values[redis_key], now)) for redis_key in missing)
+                return tuple((repo_id, values[redis_key]) for repo_id, redis_key in zip(repos, redis_keys))
+            except (RedisError, ValueError) as exc:
+                self._disable_redis("Redis index generation read failed", exc=exc)
+        with self._lock:
+            return tuple((repo_id, self._local.get((tenant, repo_id), 0)) for repo_id in repos)
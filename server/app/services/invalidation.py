@@ -0,0 +1,102 @@
+"""Cross-process invalidation of in-memory cache tiers over Redis pub/sub."""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import uuid
+from typing import Any, Callable, Iterable
+
+try:  # pragma: no cover - optional dependency
+    from redis import Redis
+    from redis.exceptions import RedisError
+except ModuleNotFoundError:  # pragma: no cover - fallback for tests
+    from app.utils.redis_client import RedisError
+
+    Redis = Any  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[list[str]], None]
+
+
+class InvalidationBus:
+    """Fan out "drop these keys" messages to every API process.
+
+    Caches register a handler per ``topic``; ``publish`` sends the keys on one
+    Redis channel and every other process (messages from this process are
+    ignored) calls the topic's handler from a background listener thread.
+    Delivery is best effort: caches that rely on it also bound how long a
+    local entry may live.
+    """
+
+    def __init__(self, redis_client: Redis | None, channel: str = "cache-invalidation") -> None:
+        self.origin = uuid.uuid4().hex
+        self._redis = redis_client
+        self._channel = channel
+        self._lock = threading.Lock()
+        self._handlers: dict[str, list[Handler]] = {}
+        self._worker: Any = None
+
+    @property
+    def listening(self) -> bool:
+        """True while the listener thread is running, i.e. other processes' invalidations arrive."""
+
+        return self._worker is not None
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        with self._lock:
+            self._handlers.setdefault(topic, []).append(handler)
+
+    def start(self) -> None:
+        """Start the listener thread (no-op without Redis or when already running)."""
+
+        if self._redis is None or self._worker is not None:
+            return
+        try:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self._channel: self._on_message})
+            self._worker = pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_error
+            )
+        except RedisError as exc:
+            logger.warning("Cache invalidation listener failed to start: %s", exc)
+
+    def publish(self, topic: str, keys: Iterable[str], *, pipe: Any = None) -> None:
+        """Publish ``keys`` for ``topic``; pass a Redis ``pipe`` to batch with other commands."""
+
+        keys = list(keys)
+        if not keys or self._redis is None:
+            return
+        message = json.dumps({"origin": self.origin, "topic": topic, "keys": keys})
+        if pipe is not None:
+            pipe.publish(self._channel, message)
+            return
+        try:
+            self._redis.publish(self._channel, message)
+        except RedisError as exc:
+            logger.warning("Cache invalidation publish failed: %s", exc)
+
+    def _on_message(self, message: dict) -> None:
+        try:
+            data = json.loads(message["data"])
+        except (KeyError, TypeError, ValueError):
+            logger.debug("Ignoring malformed invalidation message: %r", message)
+            return
+        if data.get("origin") == self.origin:
+            return
+        with self._lock:
+            handlers = list(self._handlers.get(data.get("topic"), ()))
+        for handler in handlers:
+            handler(list(data.get("keys") or []))
+
+    def _on_error(self, exc: BaseException, pubsub: Any, worker: Any) -> None:
+        logger.warning("Cache invalidation listener stopped: %s", exc)
+        worker.stop()
+        self._worker = None
+
+    def close(self) -> None:
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.stop()
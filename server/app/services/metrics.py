@@ -15,6 +15,10 @@ class StatsTracker:
             "feedback_total": 0,
             "index_total": 0,
             "avg_search_ms": 0.0,
+            "search_degraded_total": 0,
+            "suggest_total": 0,
+            "suggest_reused_total": 0,
+            "avg_suggest_ms": 0.0,
         }
 
     def record_search(self, duration_ms: float) -> None:
@@ -25,6 +29,50 @@ class StatsTracker:
                 self._stats["avg_search_ms"] * 0.99 + duration_ms * 0.01
             )
 
+    def record_batch(self, name: str, size: int, queue_ms: float) -> None:
+        with self._lock:
+            total_key = f"{name}_batch_total"
+            if total_key not in self._stats:
+                self._stats[total_key] = 0
+                self._stats[f"{name}_batch_avg_size"] = float(size)
+                self._stats[f"{name}_batch_avg_queue_ms"] = float(queue_ms)
+            self._stats[total_key] += 1
+            self._stats[f"{name}_batch_avg_size"] = (
+                self._stats[f"{name}_batch_avg_size"] * 0.99 + size * 0.01
+            )
+            self._stats[f"{name}_batch_avg_queue_ms"] = (
+                self._stats[f"{name}_batch_avg_queue_ms"] * 0.99 + queue_ms * 0.01
+            )
+
+    def record_degraded(self, backends: list[str]) -> None:
+        """Count a search answered without ``backends``."""
+
+        with self._lock:
+            self._stats["search_degraded_total"] += 1
+            for backend in backends:
+                key = f"{backend}_skipped_total"
+                self._stats[key] = self._stats.get(key, 0) + 1
+
+    def record_route(self, route: str) -> None:
+        """Count a search served by retrieval ``route`` (hybrid, lexical, lexical_fallback)."""
+
+        with self._lock:
+            key = f"route_{route}_total"
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def record_suggest(self, duration_ms: float, reused: bool) -> None:
+        with self._lock:
+            self._stats["suggest_total"] += 1
+            self._stats["suggest_reused_total"] += int(reused)
+            self._stats["avg_suggest_ms"] = (
+                self._stats["avg_suggest_ms"] * 0.99 + duration_ms * 0.01
+            )
+
+    def record_semantic_cache(self, hit: bool) -> None:
+        with self._lock:
+            key = "semantic_cache_hits" if hit else "semantic_cache_misses"
+            self._stats[key] = self._stats.get(key, 0) + 1
+
     def increment_index(self, amount: int) -> None:
         if amount <= 0:
             return
@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import logging
+import math
 import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Callable
+from typing import Any, Callable, Mapping
 
 from fastapi import HTTPException
 
@@ -20,28 +22,103 @@ except ModuleNotFoundError:  # pragma: no cover - fallback for tests
 
 logger = logging.getLogger(__name__)
 
+# KEYS are bucket keys; ARGV holds (capacity, tokens per ms, cost) for each key.
+# Either every bucket pays its cost or none does. Redis TIME keeps all app
+# instances on one clock. Token counts go back as strings: Lua numbers would
+# be truncated to integers in the reply.
+_TOKEN_BUCKET = """
+local now_s = redis.call('TIME')
+local now = tonumber(now_s[1]) * 1000 + math.floor(tonumber(now_s[2]) / 1000)
+local allowed, wait, tokens = 1, 0, {}
+for i, key in ipairs(KEYS) do
+  local capacity, rate, cost = tonumber(ARGV[i * 3 - 2]), tonumber(ARGV[i * 3 - 1]), tonumber(ARGV[i * 3])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local level = tonumber(state[1]) or capacity
+  local ts = tonumber(state[2]) or now
+  level = math.min(capacity, level + math.max(0, now - ts) * rate)
+  if level < cost then
+    allowed = 0
+    wait = math.max(wait, math.ceil((cost - level) / rate))
+  end
+  tokens[i] = level
+end
+local reply = {allowed, wait}
+for i, key in ipairs(KEYS) do
+  local capacity, rate, cost = tonumber(ARGV[i * 3 - 2]), tonumber(ARGV[i * 3 - 1]), tonumber(ARGV[i * 3])
+  local level = tokens[i]
+  if allowed == 1 then level = level - cost end
+  redis.call('HSET', key, 'tokens', level, 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil((capacity - level) / rate) + 1000)
+  reply[#reply + 1] = tostring(level)
+end
+return reply
+"""
+
 
 @dataclass
 class _Bucket:
-    minute: int
-    count: int
+    tokens: float
+    updated: float
+    full_at: float
+
+
+@dataclass(frozen=True)
+class RateLimitStatus:
+    """Outcome of one check, reported for its most depleted bucket."""
+
+    limit: int
+    remaining: int
+    reset_s: int
+    retry_after_s: int = 0
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset_s),
+        }
+        if self.retry_after_s:
+            headers["Retry-After"] = str(self.retry_after_s)
+        return headers
 
 
 class RateLimiter:
-    """Rate limiter supporting shared Redis state with in-memory fallback."""
+    """Token-bucket rate limiter on shared Redis state with in-memory fallback.
+
+    Every check draws from a per-client bucket for its endpoint and, when a
+    tenant is given, from that tenant's bucket; a request is admitted only if
+    all of them have enough tokens. Buckets hold a minute's worth of their
+    per-minute limit and refill continuously, so there is no window boundary
+    at which twice the limit gets through. In Redis all buckets of one check
+    are read, refilled and charged by a single Lua script and expire once they
+    would be full again. The local fallback drops buckets once they are full
+    again, which is at most a minute after their last charge. Past
+    ``max_buckets`` it sweeps out every full bucket but keeps the ones still
+    refilling: forgetting one would hand its client a fresh bucket.
+    """
 
     def __init__(
         self,
         limit_per_minute: int,
         *,
+        endpoint_limits: Mapping[str, int] | None = None,
+        tenant_limit_per_minute: int = 0,
+        tenant_limits: Mapping[str, int] | None = None,
+        max_buckets: int = 10000,
         time_func: Callable[[], float] | None = None,
         redis_client: Redis | None = None,
     ) -> None:
         self._limit = limit_per_minute
-        self._time = time_func or time.time
+        self._endpoint_limits = dict(endpoint_limits or {})
+        self._tenant_limit = tenant_limit_per_minute
+        self._tenant_limits = dict(tenant_limits or {})
+        self._max_buckets = max(1, max_buckets)
+        self._time = time_func or time.monotonic
         self._lock = threading.Lock()
-        self._buckets: dict[str, _Bucket] = {}
+        self._buckets: OrderedDict[str, _Bucket] = OrderedDict()
+        self._next_sweep = 0.0
         self._redis = redis_client
+        self._script = redis_client.register_script(_TOKEN_BUCKET) if redis_client is not None else None
         self._redis_enabled = redis_client is not None
         self._redis_warned = False
 
@@ -51,34 +128,105 @@ class RateLimiter:
             self._redis_warned = True
         self._redis_enabled = False
 
-    def _check_redis(self, key: str) -> bool:
-        if not self._redis_enabled or self._redis is None:
-            return False
-        redis_key = f"rate-limit:{key}"
+    def _plan(
+        self, key: str, cost: int, endpoint: str, tenant: str | Mapping[str, int] | None
+    ) -> list[tuple[str, int, int]]:
+        """``(bucket key, limit per minute, cost)`` for every bucket the check draws from."""
+
+        limit = self._endpoint_limits.get(endpoint, self._limit)
+        buckets = [(f"client:{endpoint}:{key}", limit, cost)]
+        tenants = {tenant: cost} if isinstance(tenant, str) else dict(tenant or {})
+        for name, tenant_cost in sorted(tenants.items()):
+            limit = self._tenant_limits.get(name, self._tenant_limit)
+            if limit > 0:
+                buckets.append((f"tenant:{name}", limit, tenant_cost))
+        return buckets
+
+    def _take_redis(self, buckets: list[tuple[str, int, int]]) -> tuple[bool, float, list[float]] | None:
+        if not self._redis_enabled or self._script is None:
+            return None
+        args: list[float] = []
+        for _, limit, cost in buckets:
+            args += [limit, limit / 60000, cost]
         try:
-            count = self._redis.incr(redis_key)
-            if count == 1:
-                self._redis.expire(redis_key, 60)
-            if count > self._limit:
-                raise HTTPException(status_code=429, detail="rate limit exceeded")
-            return True
+            reply = self._script(keys=[f"rate-limit:{name}" for name, _, _ in buckets], args=args)
         except RedisError as exc:
             self._disable_redis("Redis rate limiter failed", exc=exc)
-            return False
-
-    def check(self, key: str) -> None:
-        if self._check_redis(key):
-            return
+            return None
+        return bool(int(reply[0])), int(reply[1]) / 1000, [float(level) for level in reply[2:]]
 
-        minute = int(self._time() // 60)
+    def _take_local(self, buckets: list[tuple[str, int, int]]) -> tuple[bool, float, list[float]]:
+        now = self._time()
         with self._lock:
-            bucket = self._buckets.get(key)
-            if bucket is None or bucket.minute != minute:
-                bucket = _Bucket(minute=minute, count=0)
-                self._buckets[key] = bucket
-            bucket.count += 1
-            if bucket.count > self._limit:
-                raise HTTPException(status_code=429, detail="rate limit exceeded")
+            while self._buckets and next(iter(self._buckets.values())).full_at <= now:
+                self._buckets.popitem(last=False)  # a full bucket is the same as no bucket
+            levels: list[float] = []
+            wait = 0.0
+            for name, limit, cost in buckets:
+                rate = limit / 60
+                bucket = self._buckets.get(name)
+                level = float(limit) if bucket is None else min(limit, bucket.tokens + (now - bucket.updated) * rate)
+                if level < cost:
+                    wait = max(wait, (cost - level) / rate)
+                levels.append(level)
+            allowed = wait == 0
+            for index, (name, limit, cost) in enumerate(buckets):
+                if allowed:
+                    levels[index] -= cost
+                rate = limit / 60
+                self._buckets[name] = _Bucket(levels[index], now, now + (limit - levels[index]) / rate)
+                self._buckets.move_to_end(name)
+            if len(self._buckets) > self._max_buckets and now >= self._next_sweep:
+                for name in [name for name, bucket in self._buckets.items() if bucket.full_at <= now]:
+                    del self._buckets[name]
+                # nothing left can be dropped before the first remaining bucket refills
+                self._next_sweep = min((bucket.full_at for bucket in self._buckets.values()), default=now)
+            return allowed, wait, levels
+
+    def check(
+        self,
+        key: str,
+        cost: int = 1,
+        *,
+        endpoint: str = "search",
+        tenant: str | Mapping[str, int] | None = None,
+    ) -> RateLimitStatus:
+        """Charge ``cost`` tokens for client ``key`` on ``endpoint``, raising 429 when any bucket is short.
+
+        ``tenant`` names the tenant to charge as well; a mapping charges
+        several tenants their own share (a batch spanning tenants). A limit
+        of 0 turns the endpoint off: every request gets a 429 without
+        ``Retry-After``. A cost larger than a bucket's capacity could never be
+        paid, so it is rejected with 413 instead of a 429 whose
+        ``Retry-After`` never helps.
+        """
+
+        buckets = self._plan(key, cost, endpoint, tenant)
+        if buckets[0][1] <= 0:
+            status = RateLimitStatus(limit=0, remaining=0, reset_s=0)
+            raise HTTPException(status_code=429, detail="rate limit exceeded", headers=status.headers())
+        for name, limit, bucket_cost in buckets:
+            if bucket_cost > limit:
+                scope = "tenant" if name.startswith("tenant:") else endpoint
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"request costs {bucket_cost} requests, more than the {scope} limit of {limit} per minute",
+                )
+        taken = self._take_redis(buckets)
+        allowed, wait_s, levels = taken if taken is not None else self._take_local(buckets)
+
+        index = min(range(len(buckets)), key=lambda i: levels[i] / buckets[i][1])
+        limit = buckets[index][1]
+        level = levels[index]
+        status = RateLimitStatus(
+            limit=limit,
+            remaining=max(0, math.floor(level)),
+            reset_s=math.ceil(max(0.0, limit - level) * 60 / limit),
+            retry_after_s=0 if allowed else max(1, math.ceil(wait_s)),
+        )
+        if not allowed:
+            raise HTTPException(status_code=429, detail="rate limit exceeded", headers=status.headers())
+        return status
 
     def clear(self) -> None:
         with self._lock:
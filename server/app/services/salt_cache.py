@@ -0,0 +1,188 @@
+"""In-process cache of tenant path-tokenisation salts."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _SaltEntry:
+    salt: dict | None
+    refresh_at: float
+    retry_at: float = 0.0
+
+
+class SaltCache:
+    """Current salt per tenant, served from memory and refreshed off the request path.
+
+    ``fetch`` (a blocking Vault read) only ever runs on a small worker pool:
+    missing tenants are fetched in parallel by ``get_many`` (call it from a
+    threadpool), and an entry is refreshed in the background once it is within
+    ``refresh_ahead_s`` of its ``ttl_s``, either when it is read or by the
+    ``refresh_interval_s`` thread. When a refresh fails the last good salt keeps
+    being served, past its TTL if need be, and the fetch is retried after
+    ``retry_s``. A tenant whose very first fetch fails gets ``fallback`` (the
+    env salts) until a retry succeeds. At most ``max_tenants`` tenants are kept.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], dict | None],
+        *,
+        fallback: Callable[[str], dict | None] | None = None,
+        ttl_s: float = 300.0,
+        refresh_ahead_s: float = 60.0,
+        retry_s: float = 10.0,
+        max_tenants: int = 10000,
+        workers: int = 4,
+        refresh_interval_s: float | None = None,
+        time_func: Callable[[], float] | None = None,
+    ) -> None:
+        self._fetch = fetch
+        self._fallback = fallback
+        self._ttl = ttl_s
+        self._ahead = min(refresh_ahead_s, ttl_s)
+        self._retry = retry_s
+        self._max_tenants = max(1, max_tenants)
+        self._time = time_func or time.monotonic
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _SaltEntry] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._counters = {"hits": 0, "misses": 0, "fetches": 0, "failures": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="salt-fetch")
+        self._stop = threading.Event()
+        self._refresher: threading.Thread | None = None
+        if refresh_interval_s:
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, args=(refresh_interval_s,), name="salt-refresher", daemon=True
+            )
+            self._refresher.start()
+
+    def _load(self, tenant: str) -> dict | None:
+        with self._lock:
+            self._counters["fetches"] += 1
+        try:
+            salt = self._fetch(tenant)
+        except Exception as exc:  # keep serving what we have; Vault being down must not fail clients
+            now = self._time()
+            with self._lock:
+                self._counters["failures"] += 1
+                entry = self._entries.get(tenant)
+                if entry is not None:
+                    entry.retry_at = now + self._retry
+                    logger.warning("Salt refresh for tenant %s failed; serving the cached salt: %s", tenant, exc)
+                    return entry.salt
+            salt = self._fallback(tenant) if self._fallback is not None else None
+            logger.warning("Salt fetch for tenant %s failed; serving the fallback salt: %s", tenant, exc)
+            self._store(tenant, _SaltEntry(salt, refresh_at=now, retry_at=now + self._retry))
+            return salt
+        now = self._time()
+        self._store(tenant, _SaltEntry(salt, refresh_at=now + self._ttl - self._ahead))
+        return salt
+
+    def _store(self, tenant: str, entry: _SaltEntry) -> None:
+        with self._lock:
+            self._entries[tenant] = entry
+            self._entries.move_to_end(tenant)
+            while len(self._entries) > self._max_tenants:
+                self._entries.popitem(last=False)
+
+    def _submit(self, tenant: str) -> Future:
+        """The tenant's in-flight fetch, starting one if there is none."""
+
+        with self._lock:
+            future = self._inflight.get(tenant)
+            if future is not None:
+                return future
+            future = self._inflight[tenant] = self._executor.submit(self._load, tenant)
+        # outside the lock: the callback runs right here if the fetch already finished
+        future.add_done_callback(lambda _: self._done(tenant, future))
+        return future
+
+    def _done(self, tenant: str, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(tenant) is future:
+                del self._inflight[tenant]
+
+    def _due(self, entry: _SaltEntry, now: float) -> bool:
+        return now >= entry.refresh_at and now >= entry.retry_at
+
+    def cached(self, tenants: Iterable[str]) -> dict[str, dict | None] | None:
+        """Salts for ``tenants`` without blocking, or ``None`` when any has to be fetched first.
+
+        Entries due for a refresh are returned as they are and refreshed in the background.
+        """
+
+        now = self._time()
+        found: dict[str, dict | None] = {}
+        due: list[str] = []
+        with self._lock:
+            for tenant in tenants:
+                entry = self._entries.get(tenant)
+                if entry is None:
+                    return None
+                self._entries.move_to_end(tenant)
+                found[tenant] = entry.salt
+                if self._due(entry, now):
+                    due.append(tenant)
+            self._counters["hits"] += len(found)
+        for tenant in due:
+            self._submit(tenant)
+        return found
+
+    def get_many(self, tenants: Iterable[str]) -> dict[str, dict | None]:
+        """Salts for ``tenants``, fetching missing ones in parallel. Blocks; keep it off the event loop."""
+
+        wanted = list(dict.fromkeys(tenants))
+        with self._lock:
+            present = [tenant for tenant in wanted if tenant in self._entries]
+        found = self.cached(present) or {}
+        futures = {tenant: self._submit(tenant) for tenant in wanted if tenant not in found}
+        with self._lock:
+            self._counters["misses"] += len(futures)
+        wait(futures.values())
+        found.update((tenant, future.result()) for tenant, future in futures.items())
+        return {tenant: found[tenant] for tenant in wanted}
+
+    def get(self, tenant: str) -> dict | None:
+        return self.get_many([tenant])[tenant]
+
+    def refresh_due(self) -> int:
+        """Start a background refresh of every entry that is due; returns how many were started."""
+
+        now = self._time()
+        with self._lock:
+            due = [tenant for tenant, entry in self._entries.items() if self._due(entry, now)]
+        for tenant in due:
+            self._submit(tenant)
+        return len(due)
+
+    def _refresh_loop(self, interval_s: float) -> None:
+        while not self._stop.wait(interval_s):
+            try:
+                self.refresh_due()
+            except Exception:  # pragma: no cover - keep the refresher alive
+                logger.exception("Salt refresh failed")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            stats = {f"salt_cache_{name}": value for name, value in self._counters.items()}
+            stats["salt_cache_tenants"] = len(self._entries)
+        return stats
+
+    def close(self) -> None:
+        """Stop the background refresher and the fetch workers."""
+
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+        self._executor.shutdown(wait=False)
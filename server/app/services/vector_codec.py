@@ -0,0 +1,54 @@
+"""Compact binary encoding of embedding vectors for cache storage."""
+
+from __future__ import annotations
+
+import json
+from typing import Sequence
+
+import numpy as np
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+# 4-byte headers keep the payload 4-byte aligned so float32 data can be viewed in place.
+_HEADERS = {"float32": b"F32\0", "float16": b"F16\0", "int8": b"I8\0\0"}
+_DTYPES = {header: name for name, header in _HEADERS.items()}
+
+
+def quantize_int8(vector: np.ndarray) -> tuple[np.ndarray, float]:
+    """Symmetric per-vector int8 quantization; returns ``(codes, scale)``."""
+
+    peak = float(np.abs(vector).max()) if vector.size else 0.0
+    scale = peak / 127.0 if peak else 1.0
+    return np.clip(np.rint(vector / scale), -127, 127).astype(np.int8), scale
+
+
+def encode_vector(vector: Sequence[float] | np.ndarray, dtype: str = "float32") -> bytes:
+    """Serialise ``vector`` as a header plus raw little-endian ``dtype`` values."""
+
+    if dtype not in _HEADERS:
+        raise ValueError(f"unsupported vector dtype {dtype!r}; expected one of {', '.join(VECTOR_DTYPES)}")
+    array = np.asarray(vector, dtype="<f4")
+    if dtype == "int8":
+        codes, scale = quantize_int8(array)
+        return _HEADERS[dtype] + np.float32(scale).astype("<f4").tobytes() + codes.tobytes()
+    return _HEADERS[dtype] + array.astype("<f2" if dtype == "float16" else "<f4", copy=False).tobytes()
+
+
+def decode_vector(payload: bytes) -> np.ndarray:
+    """Return the float32 vector in ``payload``.
+
+    float32 payloads are returned as a read-only view of ``payload`` (no
+    copy); float16 and int8 are widened. Legacy JSON lists are still read.
+    """
+
+    dtype = _DTYPES.get(bytes(payload[:4]))
+    if dtype is None:
+        if payload[:1] == b"[":
+            return np.asarray(json.loads(payload), dtype=np.float32)
+        raise ValueError("unrecognised vector payload")
+    if dtype == "float32":
+        return np.frombuffer(payload, dtype="<f4", offset=4)
+    if dtype == "float16":
+        return np.frombuffer(payload, dtype="<f2", offset=4).astype(np.float32)
+    scale = float(np.frombuffer(payload, dtype="<f4", count=1, offset=4)[0])
+    return np.frombuffer(payload, dtype=np.int8, offset=8).astype(np.float32) * np.float32(scale)
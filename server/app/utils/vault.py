@@ -1,4 +1,3 @@
-
 import os, json, requests
 from typing import Optional
 
@@ -7,16 +6,10 @@ VAULT_TOKEN = os.getenv("VAULT_TOKEN")
 VAULT_SECRET_TPL = os.getenv("VAULT_SECRET_TEMPLATE","kv/data/codeindexing/{tenant}/salts")
 FALLBACK_SALTS = os.getenv("FALLBACK_SALTS_JSON")
 
-def get_salts_for_tenant(tenant: str) -> list[dict]:
-    if VAULT_ADDR and VAULT_TOKEN:
-        url = VAULT_ADDR.rstrip("/") + "/" + VAULT_SECRET_TPL.format(tenant=tenant).lstrip("/")
-        try:
-            r = requests.get(url, headers={"X-Vault-Token": VAULT_TOKEN}, timeout=5)
-            r.raise_for_status()
-            data = r.json()
-            return data.get("data",{}).get("data",{}).get("salts",[])
-        except Exception:
-            pass
+class VaultError(RuntimeError):
+    """Vault is configured but the salts could not be read from it."""
+
+def get_fallback_salts(tenant: str) -> list[dict]:
     if FALLBACK_SALTS:
         try:
             j = json.loads(FALLBACK_SALTS)
@@ -25,8 +18,31 @@ def get_salts_for_tenant(tenant: str) -> list[dict]:
             return []
     return []
 
-def get_current_salt(tenant: str) -> Optional[dict]:
-    salts = get_salts_for_tenant(tenant)
+def fetch_salts(tenant: str) -> list[dict]:
+    """Salts from Vault (raising ``VaultError`` when it fails), or the env fallback when Vault is not configured."""
+    if not (VAULT_ADDR and VAULT_TOKEN): return get_fallback_salts(tenant)
+    url = VAULT_ADDR.rstrip("/") + "/" + VAULT_SECRET_TPL.format(tenant=tenant).lstrip("/")
+    try:
+        r = requests.get(url, headers={"X-Vault-Token": VAULT_TOKEN}, timeout=5)
+        r.raise_for_status()
+        data = r.json()
+        return data.get("data",{}).get("data",{}).get("salts",[])
+    except Exception as exc:
+        raise VaultError(f"reading salts for tenant {tenant} failed: {exc}") from exc
+
+def get_salts_for_tenant(tenant: str) -> list[dict]:
+    try: return fetch_salts(tenant)
+    except VaultError: return get_fallback_salts(tenant)
+
+def current_salt(salts: list[dict]) -> Optional[dict]:
     if not salts: return None
-    salts = sorted(salts, key=lambda x: x.get("ver",0), reverse=True)
-    return salts[0]
+    return max(salts, key=lambda x: x.get("ver",0))
+
+def fetch_current_salt(tenant: str) -> Optional[dict]:
+    return current_salt(fetch_salts(tenant))
+
+def get_current_fallback_salt(tenant: str) -> Optional[dict]:
+    return current_salt(get_fallback_salts(tenant))
+
+def get_current_salt(tenant: str) -> Optional[dict]:
+    return current_salt(get_salts_for_tenant(tenant))
@@ -0,0 +1,55 @@
+"""Upgrade existing tenant indexes to the current payload layout.
+
+Qdrant: creates the filter payload indexes and fills ``path_prefixes`` and
+``is_test`` for points ingested before those fields existed (grouped by
+``rel_path``, one ``set_payload`` call per distinct path).
+OpenSearch: adds the ``is_test`` mapping and sets it on documents missing it.
+
+    PYTHONPATH=server python server/scripts/backfill_payload.py tenant-a tenant-b
+"""
+import argparse
+from collections import defaultdict
+from opensearchpy import helpers
+from app.config import settings
+from app.index.opensearch_store import OSStore
+from app.index.paths import is_test_path, path_prefixes
+from app.index.qdrant_store import QdrantStore
+
+def backfill_qdrant(store: QdrantStore, tenant: str, batch: int) -> int:
+    coll = store.ensure_payload_indexes(tenant)
+    missing = {"should": [{"is_empty": {"key": "path_prefixes"}}, {"is_empty": {"key": "is_test"}}],
+               "must_not": [{"is_empty": {"key": "rel_path"}}]}
+    updated, offset = 0, None
+    while True:
+        points, offset = store.client.scroll(collection_name=coll, scroll_filter=missing, limit=batch, offset=offset,
+                                             with_payload=["rel_path"], with_vectors=False)
+        by_path = defaultdict(list)
+        for p in points: by_path[p.payload.get("rel_path") or ""].append(p.id)
+        for rel, ids in by_path.items():
+            store.client.set_payload(collection_name=coll, points=ids,
+                                     payload={"path_prefixes": path_prefixes(rel), "is_test": is_test_path(rel)})
+        updated += len(points)
+        if offset is None: return updated
+
+def backfill_opensearch(store: OSStore, tenant: str, batch: int) -> int:
+    idx = settings.index_for(tenant)
+    if not store.client.indices.exists(index=idx): return 0
+    store.client.indices.put_mapping(index=idx, body={"properties": {"is_test": {"type": "boolean"}}})
+    query = {"query": {"bool": {"must_not": [{"exists": {"field": "is_test"}}]}}, "_source": ["rel_path"]}
+    actions = ({"_op_type": "update", "_index": idx, "_id": h["_id"], "doc": {"is_test": is_test_path(h["_source"].get("rel_path"))}}
+               for h in helpers.scan(store.client, index=idx, query=query, size=batch))
+    ok, _ = helpers.bulk(store.client, actions, chunk_size=batch)
+    return ok
+
+def main():
+    ap = argparse.ArgumentParser(description="Create payload indexes and backfill derived payload fields")
+    ap.add_argument("tenants", nargs="+"); ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--skip-opensearch", action="store_true")
+    args = ap.parse_args()
+    qdrant = QdrantStore(); opensearch = None if args.skip_opensearch else OSStore()
+    for tenant in args.tenants:
+        print(f"{settings.collection_for(tenant)}: {backfill_qdrant(qdrant, tenant, args.batch)} points updated")
+        if opensearch: print(f"{settings.index_for(tenant)}: {backfill_opensearch(opensearch, tenant, args.batch)} documents updated")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Filtered vector search latency before/after payload indexes and ``path_prefixes``.
+
+Loads the same synthetic corpus into two throwaway collections on QDRANT_URL:
+``before`` has no payload indexes and filters ``dir_hint`` with a ``match.text``
+on ``rel_path`` (the old layout); ``after`` is provisioned by ``QdrantStore``
+(keyword/bool payload indexes) and filters on ``path_prefixes``. Each query
+draws a repo + lang + directory filter and is run against both.
+
+    PYTHONPATH=server python server/scripts/bench_filtered_search.py --points 200000
+"""
+import argparse, random, time
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+from app.config import settings
+from app.index.paths import path_prefixes
+from app.index.qdrant_store import QdrantStore
+
+LANGS = ["py", "ts", "go", "java", "rs"]
+
+def corpus(n: int, dim: int, repos: int, rng: random.Random):
+    nrng = np.random.default_rng(rng.randrange(1 << 30))
+    dirs = [f"{top}/{sub}" for top in ("src", "lib", "pkg", "tests", "tools") for sub in ("auth", "billing", "core", "api", "util", "db")]
+    for start in range(0, n, 1000):
+        vecs = nrng.standard_normal((min(1000, n - start), dim)).astype("float32")
+        batch = []
+        for i, v in enumerate(vecs):
+            rel = f"{rng.choice(dirs)}/file_{rng.randrange(200)}.{rng.choice(LANGS)}"
+            batch.append({"id": start + i, "vector": v.tolist(), "payload": {
+                "chunk_id": str(start + i), "repo_id": f"repo-{rng.randrange(repos)}", "lang": rel.rsplit(".", 1)[1],
+                "rel_path": rel, "path_prefixes": path_prefixes(rel), "is_test": rel.startswith("tests/")}})
+        yield batch, dirs
+
+def timed(fn, runs):
+    out = []
+    for args in runs:
+        t = time.perf_counter(); fn(*args); out.append((time.perf_counter() - t) * 1000)
+    return np.percentile(out, 50), np.percentile(out, 95), np.mean(out)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--points", type=int, default=100_000); ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--repos", type=int, default=20); ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=50); ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--keep", action="store_true", help="do not drop the benchmark collections")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    client = QdrantClient(url=settings.qdrant_url)
+    store = QdrantStore(client=client)
+    before, after = "bench_before", "bench_after"
+    client.recreate_collection(collection_name=settings.collection_for(before), hnsw_config={"m": 32, "ef_construct": 128},
+                               vectors_config=VectorParams(size=args.dim, distance=Distance.COSINE))
+    client.delete_collection(settings.collection_for(after))
+    store.ensure_collection(after, size=args.dim)
+    dirs = []
+    for batch, dirs in corpus(args.points, args.dim, args.repos, rng):
+        for tenant in (before, after):
+            client.upsert(collection_name=settings.collection_for(tenant), points=[PointStruct(**p) for p in batch])
+
+    runs = [(np.random.default_rng(i).standard_normal(args.dim).tolist(), f"repo-{rng.randrange(args.repos)}",
+             rng.choice(LANGS), rng.choice(dirs)) for i in range(args.queries)]
+    def old(vec, repo, lang, dir_hint):
+        flt = {"must": [{"key": "repo_id", "match": {"value": repo}}, {"key": "lang", "match": {"value": lang}},
+                        {"key": "rel_path", "match": {"text": dir_hint}}]}
+        client.search(collection_name=settings.collection_for(before), query_vector=vec, limit=args.top_k, query_filter=flt,
+                      search_params={"hnsw_ef": max(64, 2 * args.top_k)})
+    def new(vec, repo, lang, dir_hint):
+        store.search_tenant(after, vec, repo_id=repo, top_k=args.top_k, lang=lang, dir_hint=dir_hint, hnsw_ef=max(64, 2 * args.top_k))
+
+    timed(old, runs[:10]); timed(new, runs[:10])  # warm up
+    for name, fn in (("before (no payload index, rel_path match.text)", old), ("after (payload indexes, path_prefixes)", new)):
+        p50, p95, mean = timed(fn, runs)
+        print(f"{name}: p50={p50:.2f} ms p95={p95:.2f} ms mean={mean:.2f} ms over {len(runs)} queries")
+    if not args.keep:
+        for tenant in (before, after): client.delete_collection(settings.collection_for(tenant))
+
+if __name__ == "__main__":
+    main()
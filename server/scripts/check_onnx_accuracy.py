@@ -0,0 +1,62 @@
+
+import argparse, time
+from pathlib import Path
+import numpy as np
+from app.config import settings
+from app.search.providers.embedding import build_embedding_provider
+from app.search.providers.reranker import build_reranker_provider
+
+def load_corpus(root: Path, limit: int, max_chars: int) -> list[str]:
+    docs = []
+    for p in sorted(root.rglob("*")):
+        if len(docs) >= limit: break
+        if p.is_file() and p.suffix in {".py", ".js", ".ts", ".go", ".java", ".rs", ".md", ".rb", ".php", ".cs", ".cpp", ".c"}:
+            txt = p.read_text(encoding="utf-8", errors="ignore").strip()
+            if txt: docs.append(txt[:max_chars])
+    return docs
+
+def timed(fn, *a):
+    t = time.perf_counter(); out = fn(*a); return np.asarray(out, dtype=np.float64), (time.perf_counter() - t) * 1000
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare the ONNX int8 providers against the Hugging Face providers")
+    ap.add_argument("corpus_dir", help="directory of source files used as documents")
+    ap.add_argument("--queries", help="file with one query per line (defaults to the first line of each document)")
+    ap.add_argument("--limit", type=int, default=500); ap.add_argument("--max-chars", type=int, default=2000)
+    ap.add_argument("--k", type=int, default=10); ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--skip-rerank", action="store_true")
+    args = ap.parse_args()
+
+    docs = load_corpus(Path(args.corpus_dir), args.limit, args.max_chars)
+    queries = [l.strip() for l in open(args.queries, encoding="utf-8") if l.strip()] if args.queries else [d.splitlines()[0] for d in docs[:100]]
+    if not docs or not queries: print("No data."); return
+    hf, _, _ = build_embedding_provider("huggingface", settings.embed_model)
+    ox, _, _ = build_embedding_provider("onnx", settings.embed_model)
+
+    def embed(provider, texts):
+        return np.vstack([np.asarray(provider.encode(texts[i:i+args.batch]), dtype=np.float64) for i in range(0, len(texts), args.batch)])
+    hf_docs, ox_docs = embed(hf, docs), embed(ox, docs)
+    hf_q, hf_ms = timed(lambda: embed(hf, queries)); ox_q, ox_ms = timed(lambda: embed(ox, queries))
+    cos = np.sum(hf_docs * ox_docs, axis=1) / (np.linalg.norm(hf_docs, axis=1) * np.linalg.norm(ox_docs, axis=1))
+    k = min(args.k, len(docs))
+    hf_top = np.argsort(-(hf_q @ hf_docs.T), axis=1)[:, :k]; ox_top = np.argsort(-(ox_q @ ox_docs.T), axis=1)[:, :k]
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(hf_top, ox_top)])
+    print(f"embed: docs={len(docs)} queries={len(queries)} cosine(hf,onnx) mean={cos.mean():.5f} min={cos.min():.5f} "
+          f"delta_mean={1 - cos.mean():.5f}")
+    print(f"embed: recall@{k} of onnx vs hf top-{k} = {recall:.4f}")
+    print(f"embed: query latency hf={hf_ms / len(queries):.2f} ms/q onnx={ox_ms / len(queries):.2f} ms/q")
+
+    if args.skip_rerank: return
+    hf_r, _, _ = build_reranker_provider("huggingface", settings.reranker_model)
+    ox_r, _, _ = build_reranker_provider("onnx", settings.reranker_model)
+    deltas, agree, hf_ms, ox_ms = [], [], 0.0, 0.0
+    for qi, q in enumerate(queries[:50]):
+        cands = [docs[i] for i in hf_top[qi]]
+        a, ta = timed(hf_r.rerank, q, cands); b, tb = timed(ox_r.rerank, q, cands); hf_ms += ta; ox_ms += tb
+        deltas.append(np.abs(a - b).mean()); agree.append(len(set(np.argsort(-a)[:3]) & set(np.argsort(-b)[:3])) / min(3, len(cands)))
+    n = len(deltas)
+    print(f"rerank: queries={n} mean |score delta|={np.mean(deltas):.5f} top-3 agreement={np.mean(agree):.4f}")
+    print(f"rerank: latency hf={hf_ms / n:.1f} ms/q onnx={ox_ms / n:.1f} ms/q")
+
+if __name__ == "__main__":
+    main()
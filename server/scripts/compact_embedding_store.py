@@ -0,0 +1,36 @@
+"""Drop other models' vectors from the on-disk embedding store and trim it to size.
+
+Run once after every API worker serves the new embedding model (e.g. as the
+last step of a deploy), with the same EMBED_* settings as the API:
+
+    PYTHONPATH=server python server/scripts/compact_embedding_store.py
+    PYTHONPATH=server python server/scripts/compact_embedding_store.py --model-id "onnx:BAAI__bge-large-en-v1.5/model_quantized.onnx@..."
+"""
+import argparse, os
+from app.config import settings
+from app.search.providers.embedding import build_embedding_provider
+from app.services.embedding_store import EmbeddingStore
+
+def main():
+    ap = argparse.ArgumentParser(description="Compact the embedding store, keeping only the current model's vectors")
+    ap.add_argument("--path", default=os.getenv("EMBED_STORE_PATH", "/app/server/data/embeddings.sqlite3"))
+    ap.add_argument("--max-mb", type=int, default=int(os.getenv("EMBED_STORE_MAX_MB", "2048")))
+    ap.add_argument("--provider", default=os.getenv("EMBED_PROVIDER"))
+    ap.add_argument("--model-id", help="model id to keep (defaults to the one the configured provider reports)")
+    args = ap.parse_args()
+
+    model_id = args.model_id
+    if not model_id:
+        provider, _, _ = build_embedding_provider(args.provider, settings.embed_model)
+        model_id = provider.model_id()
+    store = EmbeddingStore(args.path, model_id, max_bytes=args.max_mb * 1024 * 1024,
+                           dtype=os.getenv("EMBED_CACHE_DTYPE", "float32"))
+    try:
+        result = store.compact()
+    finally:
+        store.close()
+    print(f"kept model {model_id}: dropped {result['stale']} other-model rows, trimmed {result['trimmed']}, "
+          f"{result['rows']} rows / {result['bytes'] / 1024**2:.1f} MiB left")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare OpenSearch analyzer profiles on a tenant's own documents.
+
+Copies a sample of the tenant's index into one throwaway index per profile,
+force-merges it and reports on-disk size, indexing time, BM25 query latency
+(server ``took`` and client wall time) and top-k overlap with the first
+profile. Queries come from ``--queries`` (one per line), the search log, or
+identifiers sampled from the documents.
+
+    PYTHONPATH=server python server/scripts/compare_analyzers.py acme --sample 20000
+    PYTHONPATH=server python server/scripts/compare_analyzers.py acme --apply code
+
+``--apply PROFILE`` rebuilds the tenant's live index with that profile via two
+``_reindex`` passes (through a temporary copy). BM25 is unavailable for the
+tenant while the live index is recreated, so run it off-peak; also set
+``OPENSEARCH_ANALYZER_TENANTS`` so re-created indexes keep the profile.
+"""
+import argparse, json, random, re, time
+from pathlib import Path
+import numpy as np
+from opensearchpy import OpenSearch, helpers
+from app.config import settings
+from app.index.opensearch_store import ANALYZER_PROFILES, index_mapping
+
+IDENT = re.compile(r"\b[A-Za-z_][A-Za-z0-9_]{5,}\b")
+
+def sample_docs(client, idx: str, n: int) -> list[dict]:
+    docs = []
+    for h in helpers.scan(client, index=idx, query={"query": {"match_all": {}}}, size=1000):
+        docs.append(h["_source"])
+        if len(docs) >= n: break
+    return docs
+
+def load_queries(args, docs: list[dict], rng: random.Random) -> list[str]:
+    if args.queries:
+        return [l.strip() for l in open(args.queries, encoding="utf-8") if l.strip()][:args.max_queries]
+    log = Path(args.search_log)
+    if log.exists():
+        rows = [json.loads(l) for l in log.open(encoding="utf-8") if l.strip()]
+        found = list(dict.fromkeys(r["query"] for r in rows if r.get("tenant_id") == args.tenant and r.get("query")))
+        if found: return found[-args.max_queries:]
+    idents = [m for d in rng.sample(docs, min(len(docs), 500)) for m in IDENT.findall(d.get("text") or "")]
+    picked = rng.sample(idents, min(len(idents), args.max_queries))
+    # half whole identifiers, half their words ("getUserName" -> "get user name")
+    split = lambda s: " ".join(w.lower() for w in re.findall(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+", s))
+    return [q if i % 2 else split(q) or q for i, q in enumerate(picked)]
+
+def build(client, idx: str, profile: str, docs: list[dict]) -> tuple[int, float]:
+    if client.indices.exists(index=idx): client.indices.delete(index=idx)
+    client.indices.create(index=idx, body=index_mapping(profile))
+    t = time.perf_counter()
+    helpers.bulk(client, ({"_op_type": "index", "_index": idx, "_id": d["chunk_id"], "_source": d} for d in docs), chunk_size=500)
+    client.indices.refresh(index=idx)
+    client.indices.forcemerge(index=idx, max_num_segments=1)
+    secs = time.perf_counter() - t
+    stats = client.indices.stats(index=idx, metric="store")
+    return stats["indices"][idx]["primaries"]["store"]["size_in_bytes"], secs
+
+def query(client, idx: str, q: str, k: int) -> tuple[list[str], int, float]:
+    body = {"size": k, "_source": ["chunk_id"],
+            "query": {"bool": {"must": [{"match": {"text": q}}], "should": [{"match": {"text.shingles": q}}]}}}
+    t = time.perf_counter(); resp = client.search(index=idx, body=body)
+    return [h["_source"]["chunk_id"] for h in resp["hits"]["hits"]], resp["took"], (time.perf_counter() - t) * 1000
+
+def compare(client, args):
+    rng = random.Random(args.seed)
+    src = settings.index_for(args.tenant)
+    docs = sample_docs(client, src, args.sample)
+    if not docs: print(f"{src}: no documents"); return
+    queries = load_queries(args, docs, rng)
+    print(f"{src}: {len(docs)} docs, {len(queries)} queries, k={args.k}")
+    baseline = None
+    for profile in args.profiles.split(","):
+        idx = f"{src}__cmp_{profile}"
+        size, secs = build(client, idx, profile, docs)
+        for q in queries[:10]: query(client, idx, q, args.k)  # warm up
+        tops, took, wall = [], [], []
+        for _ in range(args.runs):
+            for q in queries:
+                top, t_ms, w_ms = query(client, idx, q, args.k); tops.append(top); took.append(t_ms); wall.append(w_ms)
+        baseline = baseline or tops
+        overlap = np.mean([len(set(a) & set(b)) / max(1, len(b)) for a, b in zip(tops, baseline)])
+        print(f"{profile:>14}: size={size / 1e6:8.1f} MB index={secs:6.1f} s "
+              f"took p50={np.percentile(took, 50):.1f} p95={np.percentile(took, 95):.1f} ms "
+              f"wall p50={np.percentile(wall, 50):.1f} ms overlap@{args.k}={overlap:.3f}")
+        if not args.keep: client.indices.delete(index=idx)
+
+def apply(client, tenant: str, profile: str):
+    src = settings.index_for(tenant); tmp = f"{src}__migrate"
+    if client.indices.exists(index=tmp): client.indices.delete(index=tmp)
+    client.indices.create(index=tmp, body=index_mapping(profile))
+    client.reindex(body={"source": {"index": src}, "dest": {"index": tmp}}, wait_for_completion=True, refresh=True, request_timeout=3600)
+    client.indices.delete(index=src)
+    client.indices.create(index=src, body=index_mapping(profile))
+    client.reindex(body={"source": {"index": tmp}, "dest": {"index": src}}, wait_for_completion=True, refresh=True, request_timeout=3600)
+    client.indices.delete(index=tmp)
+    print(f"{src}: rebuilt with the '{profile}' analyzer profile")
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare OpenSearch analyzer profiles by index size and query latency")
+    ap.add_argument("tenant")
+    ap.add_argument("--profiles", default=",".join(ANALYZER_PROFILES))
+    ap.add_argument("--sample", type=int, default=20000); ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries"); ap.add_argument("--max-queries", type=int, default=200)
+    ap.add_argument("--search-log", default="/app/server/data/search_log.jsonl")
+    ap.add_argument("--runs", type=int, default=3); ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--keep", action="store_true", help="keep the comparison indexes")
+    ap.add_argument("--apply", choices=ANALYZER_PROFILES, help="rebuild the tenant's live index with this profile")
+    args = ap.parse_args()
+    client = OpenSearch(settings.opensearch_url)
+    if args.apply: apply(client, args.tenant, args.apply)
+    else: compare(client, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+
+import argparse, json
+from pathlib import Path
+from app.config import settings
+from app.search.providers.onnx import CONFIG_FILE, FULL_MODEL_FILE, QUANTIZED_MODEL_FILE, resolve_model_dir
+
+def export(model_name: str, kind: str, out_dir: Path, max_length: int, pooling: str, opset: int):
+    import torch
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tok = AutoTokenizer.from_pretrained(model_name)
+    model = (AutoModel if kind == "embed" else AutoModelForSequenceClassification).from_pretrained(model_name).eval()
+    sample = tok(["def foo(): pass"], ["return bar"] if kind == "rerank" else None, return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dyn = {n: {0: "batch", 1: "seq"} for n in names}
+    out_name = "last_hidden_state" if kind == "embed" else "logits"
+    dyn[out_name] = {0: "batch", 1: "seq"} if kind == "embed" else {0: "batch"}
+    full = out_dir / FULL_MODEL_FILE
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[n] for n in names), str(full), input_names=names, output_names=[out_name],
+                          dynamic_axes=dyn, opset_version=opset, do_constant_folding=True)
+    quantize_dynamic(str(full), str(out_dir / QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8)
+    tok.save_pretrained(str(out_dir))
+    (out_dir / CONFIG_FILE).write_text(json.dumps({"source_model": model_name, "kind": kind, "pooling": pooling,
+                                                   "max_length": max_length, "quantization": "int8-dynamic"}, indent=2), encoding="utf-8")
+    mb = lambda p: p.stat().st_size / 1e6
+    print(f"{kind}: {model_name} -> {out_dir} (fp32 {mb(full):.0f} MB, int8 {mb(out_dir / QUANTIZED_MODEL_FILE):.0f} MB)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Export embedding/reranker models to ONNX and quantize them to int8")
+    ap.add_argument("--embed-model", default=settings.embed_model)
+    ap.add_argument("--reranker-model", default=settings.reranker_model)
+    ap.add_argument("--out-dir", default=settings.onnx_model_dir)
+    ap.add_argument("--only", choices=["embed", "rerank"])
+    ap.add_argument("--pooling", choices=["cls", "mean"], default="cls", help="bge models use CLS pooling")
+    ap.add_argument("--max-length", type=int, default=512)
+    ap.add_argument("--opset", type=int, default=17)
+    args = ap.parse_args()
+    if args.only in (None, "embed"):
+        export(args.embed_model, "embed", resolve_model_dir(args.embed_model, args.out_dir), args.max_length, args.pooling, args.opset)
+    if args.only in (None, "rerank"):
+        export(args.reranker_model, "rerank", resolve_model_dir(args.reranker_model, args.out_dir), args.max_length, "cls", args.opset)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import asyncio
+import pathlib
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "server"))
+
+from app.services.admission import AdmissionController, AdmissionPool
+
+
+def test_search_goes_before_ingest_and_tenants_share_slots():
+    async def scenario() -> list[str]:
+        controller = AdmissionController(
+            [
+                AdmissionPool("search", 2, max_queue=3, tenant_share=0.5, priority=1),
+                AdmissionPool("ingest", 1, max_queue=4),
+            ]
+        )
+        started: list[str] = []
+
+        async def wait(pool: str, tenant: str, label: str):
+            admission = await controller.acquire(pool, tenant)
+            started.append(label)
+            return admission
+
+        a1 = await controller.acquire("search", "a")
+        a2 = await controller.acquire("search", "a")  # past its share, but nobody else is waiting
+        ingest = await controller.acquire("ingest", "a")
+        tasks = [
+            asyncio.create_task(wait("search", "a", "a3")),
+            asyncio.create_task(wait("search", "b", "b1")),
+            asyncio.create_task(wait("ingest", "b", "ingest-b")),
+        ]
+        await asyncio.sleep(0.01)
+        stats = controller.stats()
+        assert (stats["admission_search_queued"], stats["admission_ingest_queued"]) == (2, 1)
+
+        with pytest.raises(HTTPException) as exc:
+            await controller.acquire("search", "a")  # "a" already holds its share of the queue
+        assert exc.value.status_code == 503 and int(exc.value.headers["Retry-After"]) >= 1
+
+        ingest.release()  # a free ingest slot, but search has requests queued
+        await asyncio.sleep(0.01)
+        assert started == []
+
+        a1.release()  # "b" is under its share, "a" is not
+        await asyncio.sleep(0.01)
+        assert started == ["b1"]
+
+        a2.release()
+        for admission in await asyncio.gather(*tasks):
+            admission.release()
+        stats = controller.stats()
+        assert (stats["admission_search_active"], stats["admission_ingest_active"]) == (0, 0)
+        assert (stats["admission_search_admitted_total"], stats["admission_search_rejected_total"]) == (4, 1)
+        return started
+
+    assert asyncio.run(scenario()) == ["b1", "a3", "ingest-b"]
+
+
+def test_admission_sheds_requests_that_wait_too_long():
+    async def scenario() -> dict:
+        controller = AdmissionController([AdmissionPool("ingest", 1, max_wait_s=5)])
+        async with controller.admit("ingest", "a"):
+            with pytest.raises(HTTPException) as exc:
+                await controller.acquire("ingest", "b", timeout_s=0.02)
+            assert exc.value.status_code == 503 and "timed out" in exc.value.detail
+
+            waiter = asyncio.create_task(controller.acquire("ingest", "b"))
+            await asyncio.sleep(0.02)
+        (await waiter).release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["admission_ingest_timeouts_total"], stats["admission_ingest_queued"]) == (1, 0)
+    assert stats["admission_ingest_avg_wait_ms"] > 0
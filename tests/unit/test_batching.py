@@ -0,0 +1,133 @@
+import pathlib
+import sys
+import threading
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "server"))
+
+from app.search.providers.batching import (
+    BatchingConfig,
+    BatchingCrossEncoderProvider,
+    BatchingEmbeddingProvider,
+    MicroBatcher,
+)
+from app.search.providers.embedding import EmbeddingProvider, build_embedding_provider, register_embedding_provider
+from app.search.providers.reranker import CrossEncoderProvider
+
+
+class RecordingEmbeddingProvider(EmbeddingProvider):
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    def encode(self, texts, *, normalize_embeddings: bool = True):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        self.batches.append(batch)
+        return [[float(len(text)), 1.0 if normalize_embeddings else 0.0] for text in batch]
+
+
+class RecordingCrossEncoder(CrossEncoderProvider):
+    def __init__(self):
+        self.calls: list[tuple[str, tuple[str, ...]]] = []
+
+    def rerank(self, query, passages):
+        self.calls.append((query, tuple(passages)))
+        return [float(len(query) * 10 + len(p)) for p in passages]
+
+
+def _run_concurrently(fns):
+    results = [None] * len(fns)
+    barrier = threading.Barrier(len(fns))
+
+    def runner(i, fn):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=runner, args=(i, fn)) for i, fn in enumerate(fns)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_micro_batcher_coalesces_concurrent_callers():
+    seen: list[list[int]] = []
+    observed: list[tuple[str, int, float]] = []
+
+    def double(items):
+        seen.append(list(items))
+        return [i * 2 for i in items]
+
+    batcher = MicroBatcher(
+        double,
+        max_batch_size=8,
+        max_wait_ms=200,
+        name="test",
+        observer=lambda name, size, queue_ms: observed.append((name, size, queue_ms)),
+    )
+    results = _run_concurrently([lambda i=i: batcher.submit([i, i + 100]) for i in range(4)])
+    batcher.close()
+
+    assert sorted(results) == sorted([[i * 2, (i + 100) * 2] for i in range(4)])
+    assert len(seen) == 1
+    assert sum(size for _, size, _ in observed) == 8
+    assert all(name == "test" and queue_ms >= 0 for name, _, queue_ms in observed)
+
+
+def test_micro_batcher_propagates_errors():
+    def boom(items):
+        raise RuntimeError("inference failed")
+
+    batcher = MicroBatcher(boom, max_batch_size=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="inference failed"):
+        batcher.submit(["x"])
+    batcher.close()
+
+
+def test_batching_embedding_provider_routes_results():
+    inner = RecordingEmbeddingProvider()
+    provider = BatchingEmbeddingProvider(inner, BatchingConfig(max_batch_size=16, max_wait_ms=200))
+
+    results = _run_concurrently([lambda t=t: provider.encode([t]) for t in ("a", "bb", "ccc")])
+    provider.close()
+
+    assert sorted(r[0][0] for r in results) == [1.0, 2.0, 3.0]
+    assert len(inner.batches) == 1
+    assert sorted(inner.batches[0]) == ["a", "bb", "ccc"]
+    assert provider.model_id() == inner.model_id()
+
+
+def test_batching_cross_encoder_scores_pairs_across_queries():
+    inner = RecordingCrossEncoder()
+    provider = BatchingCrossEncoderProvider(inner, BatchingConfig(max_batch_size=16, max_wait_ms=200))
+
+    results = _run_concurrently(
+        [
+            lambda: provider.rerank("q", ["a", "bb"]),
+            lambda: provider.rerank("qq", ["c"]),
+        ]
+    )
+    provider.close()
+
+    assert sorted(map(list, results)) == [[11.0, 12.0], [21.0]]
+    assert sorted(query for query, _ in inner.calls) == ["q", "qq"]
+
+
+def test_build_embedding_provider_wraps_when_batching_enabled():
+    @register_embedding_provider("recording-batch-test")
+    def _factory(model_name: str) -> EmbeddingProvider:  # noqa: ARG001 - contract requires signature
+        return RecordingEmbeddingProvider()
+
+    provider, resolved_key, _ = build_embedding_provider(
+        "recording-batch-test", "unused", batching=BatchingConfig(max_batch_size=4, max_wait_ms=1)
+    )
+    assert isinstance(provider, BatchingEmbeddingProvider)
+    assert resolved_key == "recording-batch-test"
+    assert provider.encode("abcd")[0][0] == 4.0
+    provider.close()
+
+    plain, _, _ = build_embedding_provider(
+        "recording-batch-test", "unused", batching=BatchingConfig(max_batch_size=4, max_wait_ms=0)
+    )
+    assert isinstance(plain, RecordingEmbeddingProvider)
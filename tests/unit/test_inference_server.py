@@ -0,0 +1,162 @@
+import os
+import pathlib
+import signal
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "server"))
+
+from app.inference_server import InferenceServer, _stop_children
+from app.search.providers.embedding import EmbeddingProvider, build_embedding_provider
+from app.search.providers.remote import (
+    InferenceClient,
+    RemoteCrossEncoderProvider,
+    RemoteEmbeddingProvider,
+    encode_matrix,
+    send_message,
+)
+from app.search.providers.reranker import CrossEncoderProvider
+
+
+class LengthEmbedder(EmbeddingProvider):
+    def encode(self, texts, *, normalize_embeddings: bool = True):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        return [[float(len(t)), 1.0 if normalize_embeddings else 0.0] for t in batch]
+
+    def model_id(self) -> str:
+        return "length:v1"
+
+
+class LengthReranker(CrossEncoderProvider):
+    def rerank(self, query, passages):
+        if "boom" in passages:
+            raise ValueError("bad passage")
+        return [float(len(query) + len(p)) for p in passages]
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "inference.sock")
+    srv = InferenceServer(path, LengthEmbedder(), LengthReranker())
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_remote_providers_round_trip(server):
+    client = InferenceClient(server, timeout_s=5)
+    embedder = RemoteEmbeddingProvider(client)
+    reranker = RemoteCrossEncoderProvider(client)
+
+    assert embedder.encode(["ab", "abcd"]) == [[2.0, 1.0], [4.0, 1.0]]
+    assert embedder.encode("abc", normalize_embeddings=False) == [[3.0, 0.0]]
+    assert reranker.rerank("q", ["a", "bb"]) == [2.0, 3.0]
+    assert reranker.score_pairs([("q", "a"), ("qq", "a")]) == [2.0, 3.0]
+    assert embedder.model_id() == "length:v1"  # vectors are keyed by the server's model, not the client's
+    client.close()
+
+
+def test_remote_provider_surfaces_server_errors(server):
+    client = InferenceClient(server, timeout_s=5)
+    reranker = RemoteCrossEncoderProvider(client)
+
+    with pytest.raises(RuntimeError, match="bad passage"):
+        reranker.rerank("q", ["boom"])
+    # the connection stays usable after an error
+    assert reranker.rerank("q", ["a"]) == [2.0]
+    client.close()
+
+
+class FakeSocket:
+    """Records what is sent; answers with a canned reply, or fails on send or receive."""
+
+    def __init__(self, send_error=None, recv_error=None):
+        self.send_error = send_error
+        self.recv_error = recv_error
+        self.sent = 0
+        self.closed = False
+        reply_end, self._reply = socket.socketpair()
+        shape, body = encode_matrix([1.0])
+        send_message(reply_end, {"ok": True, "shape": shape}, body)
+        reply_end.close()
+
+    def sendall(self, data):
+        if self.send_error:
+            raise self.send_error
+        self.sent += 1
+
+    def recv(self, size):
+        if self.recv_error:
+            raise self.recv_error
+        return self._reply.recv(size)
+
+    def close(self):
+        self.closed = True
+        self._reply.close()
+
+
+def test_client_retries_only_stale_pooled_connections_before_sending():
+    fresh: list[FakeSocket] = []
+
+    def connect(_path):
+        fresh.append(FakeSocket())
+        return fresh[-1]
+
+    client = InferenceClient("unused", connect=connect)
+    stale = FakeSocket(send_error=BrokenPipeError())
+    client._release(stale)
+    assert client.call({"op": "ping"}).tolist() == [1.0]
+    assert stale.closed and len(fresh) == 1 and fresh[0].sent == 1
+
+    slow = FakeSocket(recv_error=socket.timeout("timed out"))
+    client = InferenceClient("unused", connect=connect)
+    client._release(slow)
+    with pytest.raises(socket.timeout):
+        client.call({"op": "ping"})
+    assert slow.sent == 1 and slow.closed and len(fresh) == 1  # never sent a second time
+
+    lost = FakeSocket(recv_error=ConnectionResetError())
+    client._release(lost)
+    with pytest.raises(ConnectionResetError):
+        client.call({"op": "ping"})
+    assert lost.sent == 1 and len(fresh) == 1
+
+    client = InferenceClient("unused", connect=lambda _path: FakeSocket(send_error=BrokenPipeError()))
+    with pytest.raises(BrokenPipeError):  # a fresh connection failing is not retried
+        client.call({"op": "ping"})
+
+
+def _fork(ignore_sigterm: bool) -> int:
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - child
+        if ignore_sigterm:
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        time.sleep(30)
+        os._exit(0)
+    return pid
+
+
+def test_stop_children_terminates_and_reaps_workers():
+    polite, stubborn = _fork(False), _fork(True)
+    time.sleep(0.1)  # let the second child install its handler
+
+    started = time.monotonic()
+    _stop_children([polite, stubborn], timeout_s=0.5)
+    assert time.monotonic() - started < 5
+    for pid in (polite, stubborn):
+        with pytest.raises(ChildProcessError):
+            os.waitpid(pid, os.WNOHANG)  # already reaped
+
+
+def test_inference_server_provider_is_registered():
+    provider, resolved_key, fallback_from = build_embedding_provider("remote", "unused")
+
+    assert isinstance(provider, RemoteEmbeddingProvider)
+    assert resolved_key == "inference-server"
+    assert fallback_from is None
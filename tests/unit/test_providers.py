@@ -2,6 +2,7 @@ import pathlib
 import sys
 from typing import Sequence
 
+import numpy as np
 import pytest
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "server"))
@@ -19,6 +20,7 @@ from app.search.providers.reranker import (
     HFCrossEncoderProvider,
     build_reranker_provider,
 )
+from app.search.providers.onnx import ONNXCrossEncoderProvider, ONNXEmbeddingProvider
 from app.search.reranker import CrossEncoderReranker
 
 
@@ -148,3 +150,104 @@ def test_cross_encoder_reranker_delegates():
 
     with pytest.raises(ValueError):
         CrossEncoderReranker()
+
+
+class _Input:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class DummyTokenizer:
+    def __call__(self, texts, pairs=None, **kwargs):
+        rows = [len(t) for t in texts] if pairs is None else [len(q) + len(p) for q, p in zip(texts, pairs)]
+        return {
+            "input_ids": np.array([[n, 1, 0] for n in rows], dtype=np.int64),
+            "attention_mask": np.array([[1, 1, 0] for _ in rows], dtype=np.int64),
+            "unused": np.zeros((len(rows), 3), dtype=np.int64),
+        }
+
+
+class DummySession:
+    def __init__(self, path: str, *, logits: bool = False):
+        self.path = path
+        self.logits = logits
+        self.feeds: list[dict] = []
+
+    def get_inputs(self):
+        return [_Input("input_ids"), _Input("attention_mask")]
+
+    def run(self, _outputs, feeds):
+        self.feeds.append(feeds)
+        ids = feeds["input_ids"].astype(np.float32)
+        if self.logits:
+            return [ids[:, :1] * 0.0]
+        # hidden states: token i -> [id, 1.0]
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+def test_onnx_embedding_provider_pools_and_normalizes(tmp_path):
+    (tmp_path / "model_quantized.onnx").write_bytes(b"")
+    sessions: list[DummySession] = []
+
+    def factory(path):
+        sessions.append(DummySession(path))
+        return sessions[-1]
+
+    provider = ONNXEmbeddingProvider(tmp_path, session_factory=factory, tokenizer_loader=lambda _p: DummyTokenizer())
+    vectors = provider.encode(["abc"], normalize_embeddings=True)
+
+    assert sessions[0].path.endswith("model_quantized.onnx")
+    assert set(sessions[0].feeds[0]) == {"input_ids", "attention_mask"}
+    assert np.allclose(vectors[0], np.array([3.0, 1.0]) / np.sqrt(10.0))
+    assert provider.encode(["abcd"], normalize_embeddings=False)[0] == [4.0, 1.0]
+
+
+def test_embedding_model_ids_follow_the_weights_in_use(tmp_path, monkeypatch):
+    (tmp_path / "model.onnx").write_bytes(b"full")
+    provider = ONNXEmbeddingProvider(tmp_path)
+    full = provider.model_id()
+    assert full.startswith(f"onnx:{tmp_path.name}/model.onnx@")
+
+    (tmp_path / "model_quantized.onnx").write_bytes(b"int8")
+    quantized = provider.model_id()
+    assert "/model_quantized.onnx@" in quantized
+    (tmp_path / "model_quantized.onnx").write_bytes(b"int8, re-exported")
+    (tmp_path / "onnx_config.json").write_text('{"pooling": "mean"}')
+    assert len({full, quantized, provider.model_id()}) == 3
+
+    hf_dir = tmp_path / "hf"
+    hf_dir.mkdir()
+    (hf_dir / "model.safetensors").write_bytes(b"v1")
+    local = HFEmbeddingProvider(str(hf_dir), loader=DummySentenceTransformer)
+    before = local.model_id()
+    (hf_dir / "model.safetensors").write_bytes(b"v2")
+    assert before != local.model_id() and before.startswith(f"huggingface:{hf_dir}@")
+
+    ref = tmp_path / "hub" / "models--org--model" / "refs" / "main"
+    ref.parent.mkdir(parents=True)
+    ref.write_text("abc123\n")
+    monkeypatch.setenv("HF_HUB_CACHE", str(tmp_path / "hub"))
+    assert HFEmbeddingProvider("org/model").model_id() == "huggingface:org/model@abc123"
+    assert HFEmbeddingProvider("org/uncached").model_id() == "huggingface:org/uncached"
+
+
+def test_onnx_cross_encoder_applies_sigmoid(tmp_path):
+    provider = ONNXCrossEncoderProvider(
+        tmp_path,
+        session_factory=lambda path: DummySession(path, logits=True),
+        tokenizer_loader=lambda _p: DummyTokenizer(),
+    )
+
+    assert list(provider.rerank("q", ["a", "bb"])) == [0.5, 0.5]
+
+
+def test_onnx_provider_is_registered():
+    provider, resolved_key, fallback_from = build_embedding_provider("onnx-int8", "org/model")
+
+    assert isinstance(provider, ONNXEmbeddingProvider)
+    assert resolved_key == "onnx"
+    assert fallback_from is None
+
+    reranker, reranker_key, _ = build_reranker_provider("onnxruntime", "org/model")
+    assert isinstance(reranker, ONNXCrossEncoderProvider)
+    assert reranker_key == "onnx"
@@ -0,0 +1,675 @@
+import pathlib
+import sys
+from types import SimpleNamespace
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "server"))
+
+import json
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.api.routes import search as search_routes
+from app.config import settings
+from app.index.opensearch_store import OSStore, index_mapping
+from app.index.paths import is_test_path, path_prefixes
+from app.index.qdrant_store import QdrantStore
+from app.models.schemas import BATCH_SEARCH_MAX, SearchRequest
+from app.search.hybrid_search import HybridSearch
+from app.search.query_router import classify_query
+from app.search.selectivity import SelectivityPlanner
+from app.search.semantic_cache import SemanticCache
+from app.services.admission import AdmissionController, AdmissionPool
+from app.services.api_key import APIKeyValidator
+from app.services.cache import SearchCache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.index_generation import IndexGenerations
+from app.services.metrics import StatsTracker
+from app.services.rate_limit import RateLimiter
+
+
+def _payload(cid: str, repo_id: str = "repo") -> dict:
+    return {"chunk_id": cid, "repo_id": repo_id, "path_tokens": ["a", "b"], "line_start": 1, "line_end": 5}
+
+
+class FakeQdrantClient:
+    def __init__(self, hits_by_repo: dict[str, list[tuple[str, float]]]):
+        self.hits_by_repo = hits_by_repo
+        self.search_calls: list[dict] = []
+        self.batch_calls: list[tuple[str, list]] = []
+
+    def _hits(self, flt) -> list:
+        if isinstance(flt, dict):
+            match = flt["must"][0]["match"]
+            repos = match.get("any") or [match.get("value")]
+        else:
+            match = flt.must[0].match
+            repos = getattr(match, "any", None) or [match.value]
+        hits = [(repo, cid, score) for repo in repos for cid, score in self.hits_by_repo.get(repo, [])]
+        hits.sort(key=lambda h: h[2], reverse=True)
+        return [SimpleNamespace(payload=_payload(cid, repo), score=score) for repo, cid, score in hits]
+
+    def search(self, collection_name, query_vector, limit, query_filter, search_params, with_payload=True):
+        self.search_calls.append(
+            {"collection": collection_name, "filter": query_filter, "limit": limit, "params": search_params}
+        )
+        return self._hits(query_filter)[:limit]
+
+    def search_batch(self, collection_name, requests):
+        self.batch_calls.append((collection_name, requests))
+        return [self._hits(r.filter) for r in requests]
+
+
+class FakeOpenSearch:
+    def __init__(self, hits_by_repo: dict[str, list[tuple[str, float]]]):
+        self.hits_by_repo = hits_by_repo
+        self.msearch_bodies: list[list[dict]] = []
+        self.indices = SimpleNamespace(exists=lambda index: True)
+
+    def _resp(self, body: dict) -> dict:
+        repo_filter = body["query"]["bool"]["filter"][0]
+        repos = repo_filter["terms"]["repo_id"] if "terms" in repo_filter else [repo_filter["term"]["repo_id"]]
+        hits = [
+            {"_source": _payload(cid, repo), "_score": score, "highlight": {"text": [f"text-{cid}\nline 2"]}}
+            for repo in repos
+            for cid, score in self.hits_by_repo.get(repo, [])
+        ]
+        return {"hits": {"hits": hits}}
+
+    def mget(self, index, body):
+        known = {cid for hits in self.hits_by_repo.values() for cid, _ in hits}
+        return {
+            "docs": [
+                {"_id": d["_id"], "found": d["_id"] in known, "_source": {"text": f"text-{d['_id']}"}}
+                for d in body["docs"]
+            ]
+        }
+
+    def search(self, index, body, **params):
+        if "aggs" in body:
+            buckets = [{"key": repo} for repo in self.hits_by_repo]
+            return {"aggregations": {"repos": {"buckets": buckets}}}
+        return self._resp(body)
+
+    def msearch(self, body, **params):
+        self.msearch_bodies.append(body)
+        return {"responses": [self._resp(b) for b in body[1::2]]}
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.batches.append(list(texts))
+        return [[0.1, 0.2] for _ in texts]
+
+
+def _searcher(vec_hits, bm25_hits):
+    qclient = FakeQdrantClient(vec_hits)
+    oclient = FakeOpenSearch(bm25_hits)
+    embedder = CountingEmbedder()
+    searcher = HybridSearch(QdrantStore(client=qclient), OSStore(client=oclient), embedder)
+    return searcher, qclient, oclient, embedder
+
+
+def test_batch_search_matches_single_searches_with_one_round_trip_per_backend():
+    vec_hits = {"r1": [("a", 0.9), ("b", 0.5)], "r2": [("c", 0.8)]}
+    bm25_hits = {"r1": [("b", 7.0)], "r2": [("c", 3.0), ("d", 1.0)]}
+    searcher, qclient, oclient, embedder = _searcher(vec_hits, bm25_hits)
+
+    requests = [
+        {"tenant_id": "t", "repo_id": "r1", "query": "foo", "top_k": 2},
+        {"tenant_id": "t", "repo_id": "r2", "query": "bar", "top_k": 3, "filters": {"lang": "py"}},
+    ]
+    batched = searcher.search_batch_with_deadline(requests)
+
+    assert embedder.batches == [["foo", "bar"]]
+    assert len(qclient.batch_calls) == 1
+    assert len(oclient.msearch_bodies) == 1
+    assert [h["index"] for h in oclient.msearch_bodies[0][0::2]] == ["code_chunks_t", "code_chunks_t"]
+
+    singles = [searcher.search_with_debug(**r) for r in requests]
+    assert all(degraded == [] for _, _, degraded in batched)
+    assert [[h["chunk_id"] for h in hits] for hits, _, _ in batched] == [
+        [h["chunk_id"] for h in hits] for hits, _ in singles
+    ]
+    previews = {h["chunk_id"]: h["preview"] for h in batched[0][0]}
+    assert previews == {"a": None, "b": "text-b\nline 2"}
+
+
+def test_full_size_batch_follows_the_configured_batch_limit(monkeypatch):
+    searcher, _, _, _ = _searcher({"r": [("a", 0.9)]}, {"r": [("a", 1.0)]})
+    client = _client(searcher, monkeypatch)
+    body = {"searches": [{"tenant_id": "t", "repo_id": "r", "query": f"q{i}"} for i in range(BATCH_SEARCH_MAX)]}
+
+    # the operator's limit (100/min) stands: a batch that can never fit is told so
+    rejected = client.post("/v1/search/batch", json=body)
+    assert rejected.status_code == 413 and "Retry-After" not in rejected.headers
+
+    client.app.state.context.rate_limiter = RateLimiter(100, endpoint_limits={"search_batch": BATCH_SEARCH_MAX})
+    resp = client.post("/v1/search/batch", json=body)
+    assert resp.status_code == 200
+    assert len(resp.json()["results"]) == BATCH_SEARCH_MAX
+    assert resp.headers["RateLimit-Limit"] == str(BATCH_SEARCH_MAX)
+
+    again = client.post("/v1/search/batch", json=body)  # the bucket is empty now but refills to a full batch
+    assert again.status_code == 429 and int(again.headers["Retry-After"]) <= 60
+
+
+def test_batch_search_groups_qdrant_requests_by_tenant():
+    searcher, qclient, _, _ = _searcher({"r": [("a", 1.0)]}, {})
+
+    results = searcher.search_batch_with_deadline(
+        [
+            {"tenant_id": "t1", "repo_id": "r", "query": "q"},
+            {"tenant_id": "t2", "repo_id": "r", "query": "q"},
+            {"tenant_id": "t1", "repo_id": "r", "query": "q2"},
+        ]
+    )
+
+    assert sorted((coll, len(reqs)) for coll, reqs in qclient.batch_calls) == [
+        ("code_chunks_t1", 2),
+        ("code_chunks_t2", 1),
+    ]
+    assert all(hits[0]["chunk_id"] == "a" for hits, _, _ in results)
+
+
+def test_batch_search_degrades_per_backend_call_and_skips_the_cache(monkeypatch):
+    searcher, qclient, oclient, _ = _searcher({"r": [("a", 0.9)]}, {"r": [("b", 3.0)]})
+    searcher.breakers = CircuitBreaker(failure_threshold=2, reset_timeout_s=60)
+
+    def failing(body, **params):
+        raise ConnectionError("opensearch down")
+
+    oclient.msearch = failing
+    client = _client(searcher, monkeypatch)
+    body = {"searches": [{"tenant_id": "t", "repo_id": "r", "query": "q"}, {"tenant_id": "u", "repo_id": "r", "query": "q"}]}
+
+    for _ in range(2):
+        results = client.post("/v1/search/batch", json=body).json()["results"]
+        assert [(r["degraded_backends"], [h["chunk_id"] for h in r["hits"]]) for r in results] == [(["bm25"], ["a"])] * 2
+    assert searcher.breakers.state("bm25", "t") == "open"  # one failed multi-search counts for each tenant in it
+    assert len(qclient.batch_calls) == 4  # degraded results were not cached
+
+    qclient.search_batch = lambda collection_name, requests: (_ for _ in ()).throw(TimeoutError())
+    results = client.post("/v1/search/batch", json=body).json()["results"]
+    assert all(r["degraded_backends"] == ["vector", "bm25"] and r["hits"] == [] for r in results)
+
+    rejected = client.post("/v1/search/batch", json={"searches": [{"repo_id": "r", "query": "q", "cursor": "c"}]})
+    assert rejected.status_code == 422
+
+
+def test_multi_repo_search_uses_one_filtered_query_and_caps_per_repo():
+    vec_hits = {"r1": [("a1", 0.9), ("a2", 0.85), ("a3", 0.8)], "r2": [("b1", 0.5)]}
+    bm25_hits = {"r1": [("a1", 5.0), ("a2", 4.0)], "r2": [("b1", 1.0)]}
+    searcher, qclient, oclient, _ = _searcher(vec_hits, bm25_hits)
+
+    hits, _ = searcher.search_with_debug("t", ["r1", "r2"], "q", top_k=3, per_repo_limit=2)
+
+    assert len(qclient.search_calls) == 1
+    assert qclient.search_calls[0]["filter"]["must"][0]["match"] == {"any": ["r1", "r2"]}
+    assert [h["chunk_id"] for h in hits] == ["a1", "a2", "b1"]
+
+    uncapped, _ = searcher.search_with_debug("t", ["r1", "r2"], "q", top_k=3)
+    assert [h["repo_id"] for h in uncapped] == ["r1", "r1", "r1"]
+
+
+def test_repo_glob_expands_against_indexed_repos():
+    searcher, _, _, _ = _searcher({}, {"svc-auth": [], "svc-billing": [], "web": []})
+
+    assert searcher.expand_repo_glob("t", "svc-*") == ["svc-auth", "svc-billing"]
+
+
+def test_search_request_requires_repo_scope():
+    with pytest.raises(ValidationError):
+        SearchRequest(query="q")
+    assert SearchRequest(query="q", repo_glob="svc-*").repo_glob == "svc-*"
+
+
+def _client(searcher, monkeypatch):
+    monkeypatch.setattr(search_routes, "append_jsonl", lambda path, obj: None)
+    app = FastAPI()
+    app.include_router(search_routes.router)
+    app.state.context = SimpleNamespace(
+        searcher=searcher,
+        reranker=SimpleNamespace(rerank=lambda q, passages: [float(len(p)) for p in passages]),
+        search_cache=SearchCache(30),
+        rate_limiter=RateLimiter(100),
+        api_keys=APIKeyValidator({}, False),
+        stats=StatsTracker(),
+        generations=IndexGenerations(),
+        semantic_cache=SemanticCache(),
+        admission=AdmissionController([AdmissionPool("search", 8)]),
+    )
+    return TestClient(app)
+
+
+def test_search_stream_emits_provisional_then_final(monkeypatch):
+    searcher, _, _, _ = _searcher({"r": [("a", 0.9), ("b", 0.1)]}, {"r": [("b", 3.0), ("c", 1.0)]})
+    client = _client(searcher, monkeypatch)
+
+    body = {"tenant_id": "t", "repo_id": "r", "query": "q", "top_k": 3}
+    resp = client.post("/v1/search/stream", json=body)
+    events = [json.loads(line) for line in resp.text.splitlines() if line]
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert (resp.headers["RateLimit-Limit"], resp.headers["RateLimit-Remaining"]) == ("100", "99")
+    assert [(e["event"], e["stage"]) for e in events] == [("provisional", "bm25"), ("final", "fused")]
+    assert events[0]["search_id"] == events[1]["search_id"]
+    assert [h["chunk_id"] for h in events[0]["hits"]] == ["b", "c"]
+    assert {h["chunk_id"] for h in events[1]["hits"]} == {"a", "b", "c"}
+    assert all(e["elapsed_ms"] >= e["stage_ms"] >= 0 for e in events)
+
+    cached = [json.loads(line) for line in client.post("/v1/search/stream", json=body).text.splitlines() if line]
+    assert [(e["event"], e["stage"]) for e in cached] == [("final", "cache")]
+    assert cached[0]["search_id"] == events[1]["search_id"]
+    assert client.app.state.context.admission.stats()["admission_search_active"] == 0
+
+
+def test_search_stream_degrades_when_backends_fail(monkeypatch):
+    searcher, _, oclient, _ = _searcher({"r": [("a", 0.9)]}, {"r": [("b", 3.0)]})
+    searcher.breakers = CircuitBreaker(failure_threshold=5, reset_timeout_s=60)
+
+    def failing(index, body, **params):
+        raise ConnectionError("opensearch down")
+
+    oclient.search = failing
+    client = _client(searcher, monkeypatch)
+    body = {"tenant_id": "t", "repo_id": "r", "query": "q"}
+
+    events = [json.loads(line) for line in client.post("/v1/search/stream", json=body).text.splitlines() if line]
+    assert [(e["event"], e["degraded_backends"]) for e in events] == [("final", ["bm25"])]
+    assert events[0]["degraded"] is True and [h["chunk_id"] for h in events[0]["hits"]] == ["a"]
+    assert searcher.breakers.state("bm25", "t") == "closed"  # the failure was recorded, under the threshold
+
+    for _ in range(5):
+        searcher.breakers.record_failure("vector", "t")
+    events = [json.loads(line) for line in client.post("/v1/search/stream", json=body).text.splitlines() if line]
+    assert [(e["event"], e["degraded_backends"], e["hits"]) for e in events] == [("final", ["vector", "bm25"], [])]
+    assert client.app.state.context.admission.stats()["admission_search_active"] == 0
+
+
+def test_search_cache_is_invalidated_by_index_generation(monkeypatch):
+    searcher, _, _, _ = _searcher({"r": [("a", 0.9)], "s": [("b", 0.5)]}, {"r": [("a", 1.0)], "s": []})
+    client = _client(searcher, monkeypatch)
+    generations = client.app.state.context.generations
+
+    body = {"tenant_id": "t", "repo_ids": ["r", "s"], "query": "q"}
+    first = client.post("/v1/search", json=body).json()["search_id"]
+    assert client.post("/v1/search", json=body).json()["search_id"] == first
+
+    generations.bump("t", ["other"])
+    assert client.post("/v1/search", json=body).json()["search_id"] == first
+
+    generations.bump("t", ["s"])
+    second = client.post("/v1/search", json=body).json()["search_id"]
+    assert second != first
+    assert client.post("/v1/search/batch", json={"searches": [body]}).json()["results"][0]["search_id"] == second
+
+
+def test_semantic_cache_matches_near_duplicates_within_scope():
+    now = [0.0]
+    cache = SemanticCache(time_func=lambda: now[0])
+    cache.add("scope", [1.0, 0.0], "where is auth middleware", "key-1")
+
+    match = cache.lookup("scope", [0.99, 0.05])
+    assert match is not None and match.cache_key == "key-1" and match.similarity > 0.99
+    assert cache.lookup("scope", [0.6, 0.8]) is None
+    assert cache.lookup("other-scope", [1.0, 0.0]) is None
+    now[0] = settings.semantic_cache_ttl_s + 1
+    assert cache.lookup("scope", [1.0, 0.0]) is None
+
+
+def test_semantic_cache_grows_scopes_and_bounds_total_bytes(monkeypatch):
+    monkeypatch.setattr(settings, "semantic_cache_queries", 20)
+    monkeypatch.setattr(settings, "semantic_cache_max_mb", 1)
+    cache = SemanticCache()
+    dim = 4096  # 8 rows are 128 KiB, 16 rows 256 KiB
+    cache.add("a", [1.0] + [0.0] * (dim - 1), "q0", "k0")
+    assert cache.nbytes == 8 * dim * 4
+
+    for i in range(1, 20):
+        cache.add("a", [0.0] * i + [1.0] + [0.0] * (dim - i - 1), f"q{i}", f"k{i}")
+    assert cache.nbytes == 20 * dim * 4
+    assert cache.lookup("a", [0.0] * 19 + [1.0] + [0.0] * (dim - 20)).cache_key == "k19"
+    cache.add("a", [1.0] + [0.0] * (dim - 1), "q20", "k20")  # full: the ring wraps over q0
+    assert cache.nbytes == 20 * dim * 4
+    assert cache.lookup("a", [1.0] + [0.0] * (dim - 1)).cache_key == "k20"
+
+    for scope in "bcdefghij":
+        cache.add(scope, [1.0] + [0.0] * (dim - 1), "q", scope)
+    assert cache.nbytes <= 1024 * 1024
+    assert cache.lookup("a", [1.0] + [0.0] * (dim - 1)) is None  # least recently used scope went first
+    assert cache.lookup("j", [1.0] + [0.0] * (dim - 1)).cache_key == "j"
+
+
+def test_search_reuses_results_for_semantically_close_queries(monkeypatch):
+    class TopicEmbedder(CountingEmbedder):
+        def encode(self, texts, normalize_embeddings=True):
+            self.batches.append(list(texts))
+            return [[1.0, 0.0] if "auth" in text else [0.0, 1.0] for text in texts]
+
+    searcher, _, _, _ = _searcher({"r": [("a", 0.9), ("b", 0.8)]}, {"r": [("a", 1.0)]})
+    searcher.embedder = embedder = TopicEmbedder()
+    client = _client(searcher, monkeypatch)
+
+    body = {"tenant_id": "t", "repo_id": "r", "top_k": 1, "semantic_cache": True}
+    first = client.post("/v1/search", json=dict(body, query="where is auth middleware")).json()
+    assert first["semantic_match"] is None
+    assert len(embedder.batches) == 1  # the lookup embedding was reused for retrieval
+
+    second = client.post("/v1/search", json=dict(body, query="auth middleware location")).json()
+    assert second["search_id"] == first["search_id"]
+    assert second["semantic_match"] == {
+        "query": "where is auth middleware",
+        "similarity": 1.0,
+        "search_id": first["search_id"],
+    }
+    assert client.app.state.context.stats.snapshot()["semantic_cache_hits"] == 1
+    # the cached candidates belong to the matched query, so neither hit pages them
+    assert first["next_cursor"] and second["next_cursor"] is None
+    again = client.post("/v1/search", json=dict(body, query="auth middleware location")).json()
+    assert again["semantic_match"] is None and again["next_cursor"] is None
+
+    unrelated = client.post("/v1/search", json=dict(body, query="database pool")).json()
+    assert unrelated["semantic_match"] is None and unrelated["search_id"] != first["search_id"]
+    opted_out = client.post("/v1/search", json={"tenant_id": "t", "repo_id": "r", "query": "auth flow"}).json()
+    assert opted_out["semantic_match"] is None and opted_out["search_id"] != first["search_id"]
+
+
+def test_search_stream_sse_with_rerank(monkeypatch):
+    searcher, _, _, _ = _searcher({"r": [("a", 0.9)]}, {"r": [("bb", 3.0), ("c", 1.0)]})
+    client = _client(searcher, monkeypatch)
+
+    resp = client.post(
+        "/v1/search/stream",
+        json={"tenant_id": "t", "repo_id": "r", "query": "q", "rerank": True},
+        headers={"Accept": "text/event-stream"},
+    )
+    frames = [f for f in resp.text.split("\n\n") if f]
+    final = json.loads(frames[-1].split("data: ", 1)[1])
+
+    assert frames[-1].startswith("event: final")
+    assert final["stage"] == "reranked"
+    # previews "text-bb" and "text-c" are reranked by length; vector-only "a" follows
+    assert [h["chunk_id"] for h in final["hits"]] == ["bb", "c", "a"]
+
+
+def test_search_cursor_pages_from_cached_candidates_and_deepens(monkeypatch):
+    monkeypatch.setattr(settings, "top_k_vector", 2)
+    monkeypatch.setattr(settings, "top_k_bm25", 2)
+    monkeypatch.setattr(settings, "search_page_max_depth", 4)
+    vec_hits = {"r": [(f"c{i}", 1.0 - i / 10) for i in range(6)]}
+    searcher, qclient, _, _ = _searcher(vec_hits, {})
+    client = _client(searcher, monkeypatch)
+    body = {"tenant_id": "t", "repo_id": "r", "query": "q", "top_k": 2}
+
+    pages, cursor = [], None
+    for _ in range(4):
+        resp = client.post("/v1/search", json=dict(body, cursor=cursor)).json()
+        pages.append([h["chunk_id"] for h in resp["hits"]])
+        cursor = resp["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == [["c0", "c1"], ["c2", "c3"], ["c4", "c5"]]
+    # depth 1, then deeper retrieval only when the cached list ran out (depth 2, depth 4)
+    assert [call["limit"] for call in qclient.search_calls] == [2, 4, 8]
+
+
+def test_search_cursor_rejects_other_queries(monkeypatch):
+    searcher, _, _, _ = _searcher({"r": [(f"c{i}", 1.0 - i / 10) for i in range(5)]}, {})
+    client = _client(searcher, monkeypatch)
+
+    first = client.post("/v1/search", json={"repo_id": "r", "query": "q", "top_k": 2}).json()
+    assert first["next_cursor"]
+
+    other = client.post("/v1/search", json={"repo_id": "r", "query": "other", "cursor": first["next_cursor"]})
+    assert other.status_code == 400
+    bogus = client.post("/v1/search", json={"repo_id": "r", "query": "q", "cursor": "not-a-cursor"})
+    assert bogus.status_code == 400
+
+
+def test_search_returns_vector_only_when_bm25_misses_its_budget(monkeypatch):
+    monkeypatch.setattr(settings, "search_bm25_budget_ms", 20)
+    searcher, _, oclient, _ = _searcher({"r": [("a", 0.9)]}, {"r": [("b", 3.0)]})
+    release = threading.Event()
+    slow_search = oclient.search
+    oclient.search = lambda index, body, **params: release.wait(5) and slow_search(index, body)
+    client = _client(searcher, monkeypatch)
+
+    body = {"tenant_id": "t", "repo_id": "r", "query": "q"}
+    resp = client.post("/v1/search", json=body).json()
+    release.set()
+
+    assert resp["degraded"] is True
+    assert resp["degraded_backends"] == ["bm25"]
+    assert [h["chunk_id"] for h in resp["hits"]] == ["a"]
+    # partial results are not cached
+    assert client.post("/v1/search", json=body).json()["degraded"] is False
+
+
+def test_open_circuit_skips_backend_and_both_down_is_503(monkeypatch):
+    searcher, qclient, oclient, _ = _searcher({"r": [("a", 0.9)]}, {"r": [("b", 3.0)]})
+    searcher.breakers = CircuitBreaker(failure_threshold=2, reset_timeout_s=60)
+    calls = []
+
+    def failing(index, body, **params):
+        calls.append(index)
+        raise ConnectionError("opensearch down")
+
+    oclient.search = failing
+    for _ in range(3):
+        hits, _, degraded = searcher.search_with_deadline("t", "r", "q")
+        assert degraded == ["bm25"] and [h["chunk_id"] for h in hits] == ["a"]
+    assert len(calls) == 2
+    assert searcher.breakers.state("bm25", "t") == "open"
+    assert searcher.breakers.state("bm25", "other") == "closed"
+
+    searcher.breakers.record_failure("vector", "t")
+    searcher.breakers.record_failure("vector", "t")
+    resp = _client(searcher, monkeypatch).post("/v1/search", json={"tenant_id": "t", "repo_id": "r", "query": "q"})
+    assert resp.status_code == 503
+
+
+def test_circuit_breaker_half_open_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10, time_func=lambda: now[0])
+
+    breaker.record_failure("bm25", "t")
+    assert not breaker.allow("bm25", "t")
+    now[0] = 11
+    assert breaker.allow("bm25", "t")
+    assert not breaker.allow("bm25", "t")  # one probe at a time
+    breaker.record_failure("bm25", "t")
+    assert breaker.state("bm25", "t") == "open"
+    now[0] = 22
+    assert breaker.allow("bm25", "t")
+    breaker.record_success("bm25", "t")
+    assert breaker.state("bm25", "t") == "closed"
+
+
+class CountingStore:
+    def __init__(self, counts: dict[tuple, int]):
+        self.counts = counts
+        self.calls: list[tuple] = []
+
+    def count_tenant(self, tenant, repo_id, lang=None, dir_hint=None, exclude_tests=False):
+        self.calls.append((tenant, repo_id, lang, dir_hint))
+        return self.counts[(lang, dir_hint)]
+
+
+def test_selectivity_plan_uses_exact_search_for_narrow_filters_and_caches_counts(monkeypatch):
+    monkeypatch.setattr(settings, "exact_search_max_points", 1000)
+    monkeypatch.setattr(settings, "hnsw_ef_max", 400)
+    store = CountingStore({(None, None): 100_000, ("py", None): 25_000, ("py", "src/auth"): 300})
+    planner = SelectivityPlanner(store)
+
+    narrow = planner.plan("t", "r", {"lang": "py", "dir_hint": "src/auth"}, top_k=50)
+    assert narrow.exact and narrow.search_args() == {"exact": True}
+
+    broad = planner.plan("t", "r", {}, top_k=50)
+    medium = planner.plan("t", "r", {"lang": "py"}, top_k=50)
+    assert broad.hnsw_ef == 50
+    assert medium.selectivity == 0.25 and medium.hnsw_ef == 100
+
+    planner.plan("t", "r", {"lang": "py"}, top_k=50)
+    # every (tenant, repo, filter) combination was counted once
+    assert len(store.calls) == 3
+
+
+def test_selectivity_plan_caps_ef_by_latency_target(monkeypatch):
+    monkeypatch.setattr(settings, "exact_search_max_points", 0)
+    monkeypatch.setattr(settings, "hnsw_ef_max", 1000)
+    monkeypatch.setattr(settings, "vector_latency_target_ms", 20)
+    planner = SelectivityPlanner(CountingStore({(None, None): 100_000, ("go", None): 100}))
+
+    plan = planner.plan("t", "r", {"lang": "go"}, top_k=10)
+    assert plan.hnsw_ef == 316
+    planner.observe(plan, elapsed_ms=plan.hnsw_ef * 0.1)
+    assert planner.plan("t", "r", {"lang": "go"}, top_k=10).hnsw_ef == 200
+
+
+def test_vector_search_falls_back_to_default_ef_without_counts():
+    searcher, qclient, _, _ = _searcher({"r": [("a", 0.9)]}, {})
+
+    searcher.vector_candidates("t", "r", "q")
+    assert qclient.search_calls[0]["params"] == {"hnsw_ef": 100}
+
+
+def test_dir_hint_filters_on_indexed_path_prefixes():
+    assert path_prefixes("/src/auth/login.py") == ["src", "src/auth", "src/auth/login.py"]
+    assert path_prefixes(None) == []
+
+    flt = QdrantStore._filter("r", lang="py", dir_hint="src/auth/")
+    assert {"key": "path_prefixes", "match": {"value": "src/auth"}} in flt["must"]
+
+
+def test_new_collections_get_payload_indexes():
+    created = []
+    client = SimpleNamespace(
+        get_collection=lambda name: (_ for _ in ()).throw(ValueError(name)),
+        recreate_collection=lambda **kwargs: None,
+        create_payload_index=lambda collection_name, field_name, field_schema: created.append(
+            (field_name, field_schema.value)
+        ),
+    )
+
+    QdrantStore(client=client).ensure_collection("t")
+    assert sorted(created) == [
+        ("is_test", "bool"),
+        ("lang", "keyword"),
+        ("path_prefixes", "keyword"),
+        ("repo_id", "keyword"),
+    ]
+
+
+def test_exclude_tests_filters_on_indexed_flag():
+    assert is_test_path("tests/unit/test_x.py") and is_test_path("pkg/api_test.go")
+    assert not is_test_path("src/latest.py") and not is_test_path(None)
+
+    body = OSStore._bm25_body("r", "q", 10, exclude_tests=True)
+    assert body["query"]["bool"]["must_not"] == [{"term": {"is_test": True}}]
+    flt = QdrantStore._filter("r", exclude_tests=True)
+    assert flt["must_not"] == [{"key": "is_test", "match": {"value": True}}]
+
+
+def test_code_analyzer_profile_has_no_edge_ngrams(monkeypatch):
+    legacy = index_mapping("edge_ngram")
+    code = index_mapping("code_shingles")
+
+    assert "edge_2_20" in legacy["settings"]["analysis"]["filter"]
+    assert all(f.get("type") != "edge_ngram" for f in code["settings"]["analysis"]["filter"].values())
+    assert code["settings"]["analysis"]["filter"]["code_parts"]["split_on_case_change"] is True
+    assert code["mappings"]["properties"]["text"]["fields"]["shingles"]["analyzer"] == "code_shingle"
+    with pytest.raises(ValueError):
+        index_mapping("trigram")
+
+    created = {}
+    client = SimpleNamespace(
+        indices=SimpleNamespace(exists=lambda index: False, create=lambda index, body: created.update({index: body}))
+    )
+    monkeypatch.setattr(settings, "opensearch_analyzer_tenants", {"acme": "code"})
+    OSStore(client=client).ensure_index("acme")
+    OSStore(client=client).ensure_index("other")
+    assert created[settings.index_for("acme")]["mappings"]["properties"]["text"]["search_analyzer"] == "code_search"
+    assert created[settings.index_for("other")] == legacy
+
+
+def test_bm25_returns_snippets_and_vector_hits_trim_payload(monkeypatch):
+    monkeypatch.setattr(settings, "preview_lines", 1)
+    searcher, qclient, oclient, _ = _searcher({"r": [("a", 0.9)]}, {"r": [("b", 3.0)]})
+    calls = []
+    qclient.search = lambda **kwargs: calls.append(kwargs) or []
+
+    hits, _ = searcher.search_with_debug("t", "r", "q")
+    body = OSStore._bm25_body("r", "q", 10)
+
+    assert "text" not in body["_source"] and "text" in body["highlight"]["fields"]
+    assert calls[0]["with_payload"] == ["chunk_id", "repo_id", "path_tokens", "line_start", "line_end"]
+    assert [(h["chunk_id"], h["preview"]) for h in hits] == [("b", "text-b")]
+    assert searcher.full_texts("t", hits + [{"chunk_id": "zz", "repo_id": "r"}]) == {"b": "text-b"}
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("parseConfigFile", "identifier"),
+        ("FooBar.baz", "identifier"),
+        ("parse_config", "identifier"),
+        ("std::vector", "identifier"),
+        ("src/auth/login.py", "path"),
+        ("config.yaml", "path"),
+        ("authentication", "natural"),
+        ("how do we parse the config file", "natural"),
+    ],
+)
+def test_classify_query(query, expected):
+    assert classify_query(query) == expected
+
+
+def test_identifier_queries_take_the_lexical_route(monkeypatch):
+    searcher, qclient, _, embedder = _searcher({"r": [("a", 0.9)]}, {"r": [("b", 3.0)]})
+
+    route = searcher.route_for("parseConfigFile", "r")
+    hits, debug, degraded = searcher.search_with_deadline("t", "r", "parseConfigFile", route=route)
+    assert route == "lexical" and not degraded
+    assert [h["chunk_id"] for h in hits] == ["b"]
+    assert {d["route"] for d in debug} == {"lexical"}
+    assert embedder.batches == [] and qclient.search_calls == []
+
+    # no lexical hit: fall back to vector search
+    hits, debug, _ = searcher.search_with_deadline("t", "other", "parseConfigFile", route="lexical")
+    assert embedder.batches == [["parseConfigFile"]]
+    assert hits == [] and debug == []
+
+    # batches route the same way: one BM25 multi-search, a vector batch only for the miss
+    embedder.batches.clear()
+    batched = searcher.search_batch_with_deadline(
+        [{"tenant_id": "t", "repo_id": "r", "query": "parseConfigFile"},
+         {"tenant_id": "t", "repo_id": "other", "query": "loadSettings"}]
+    )
+    assert [[d["route"] for d in debug] for _, debug, _ in batched] == [["lexical"], []]
+    assert embedder.batches == [["loadSettings"]]
+
+    assert searcher.route_for("how is config parsed", "r") == "hybrid"
+    monkeypatch.setattr(settings, "privacy_repo_ids", {"secret"})
+    assert searcher.route_for("parseConfigFile", ["r", "secret"]) == "hybrid"
+
+
+def test_search_route_is_logged_and_counted(monkeypatch):
+    searcher, _, _, _ = _searcher({"r": [("a", 0.9)]}, {"r": [("b", 3.0)]})
+    client = _client(searcher, monkeypatch)
+    logged = []
+    monkeypatch.setattr(search_routes, "append_jsonl", lambda path, obj: logged.append(obj))
+
+    client.post("/v1/search", json={"repo_id": "r", "query": "parseConfigFile"})
+    client.post("/v1/search", json={"repo_id": "r", "query": "where is config parsed"})
+
+    assert [entry["route"] for entry in logged] == ["lexical", "hybrid"]
+    stats = client.app.state.context.stats.snapshot()
+    assert stats["route_lexical_total"] == 1 and stats["route_hybrid_total"] == 1
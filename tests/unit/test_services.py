@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import json
+
+import numpy as np
 import pytest
 from fastapi import HTTPException
 
@@ -9,7 +12,11 @@ except ModuleNotFoundError:  # pragma: no cover - fallback for CI environments
     from app.utils.redis_client import RedisError
 
 from app.services.cache import EmbeddingCache, SearchCache
+from app.services.embedding_store import EmbeddingStore
+from app.services.index_generation import IndexGenerations
+from app.services.invalidation import InvalidationBus
 from app.services.rate_limit import RateLimiter
+from app.services.vector_codec import decode_vector, encode_vector
 
 
 class DummyRedis:
@@ -25,15 +32,91 @@ class DummyRedis:
         if ex is not None:
             self.expiry[key] = ex
 
-    def incr(self, key: str) -> int:
+    def incr(self, key: str, amount: int = 1) -> int:
         current = int(self.store.get(key, b"0").decode("utf-8")) if key in self.store else 0
-        current += 1
+        current += amount
         self.store[key] = str(current).encode("utf-8")
         return current
 
     def expire(self, key: str, ttl: int) -> None:
         self.expiry[key] = ttl
 
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        self.__dict__["mgets"] = self.__dict__.get("mgets", 0) + 1
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> "DummyPipeline":
+        return DummyPipeline(self)
+
+    def publish(self, channel: str, message: str) -> int:
+        handlers = [h[channel] for h in self.subscribers if channel in h]
+        for handler in handlers:
+            handler({"type": "message", "channel": channel, "data": message.encode("utf-8")})
+        return len(handlers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "DummyPubSub":
+        return DummyPubSub(self)
+
+    @property
+    def subscribers(self) -> list[dict]:
+        return self.__dict__.setdefault("_subscribers", [])
+
+    def register_script(self, script: str) -> "DummyTokenBucketScript":
+        return DummyTokenBucketScript(self)
+
+
+class DummyTokenBucketScript:
+    """Python stand-in for the rate limiter's Lua script, on a clock frozen at ``now_ms``."""
+
+    def __init__(self, redis: DummyRedis) -> None:
+        self._redis = redis
+        self.now_ms = 0
+        self.calls: list[tuple[list[str], list]] = []
+
+    def __call__(self, keys: list[str], args: list) -> list:
+        self.calls.append((keys, args))
+        specs = [args[i : i + 3] for i in range(0, len(args), 3)]
+        levels, wait = [], 0
+        for key, (capacity, rate, cost) in zip(keys, specs):
+            level, ts = self._redis.__dict__.setdefault("hashes", {}).get(key, (capacity, self.now_ms))
+            level = min(capacity, level + (self.now_ms - ts) * rate)
+            if level < cost:
+                wait = max(wait, -(-(cost - level) // rate))
+            levels.append(level)
+        allowed = int(wait == 0)
+        for index, (key, (_, _, cost)) in enumerate(zip(keys, specs)):
+            levels[index] -= cost * allowed
+            self._redis.hashes[key] = (levels[index], self.now_ms)
+        return [allowed, int(wait)] + [str(level).encode("utf-8") for level in levels]
+
+
+class DummyPipeline:
+    def __init__(self, redis: DummyRedis) -> None:
+        self._redis = redis
+        self._ops: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: self._ops.append((name, args, kwargs))
+
+    def execute(self) -> list:
+        return [getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._ops]
+
+
+class DummyPubSub:
+    """Delivers published messages synchronously instead of from a listener thread."""
+
+    def __init__(self, redis: DummyRedis) -> None:
+        self._redis = redis
+
+    def subscribe(self, **handlers) -> None:
+        self._redis.subscribers.append(handlers)
+
+    def run_in_thread(self, sleep_time: float = 0.0, daemon: bool = False, exception_handler=None):
+        return self
+
+    def stop(self) -> None:
+        pass
+
 
 class DummyProvider:
     def __init__(self) -> None:
@@ -68,6 +151,31 @@ def test_search_cache_honours_ttl():
     assert cache.get("key") is None
 
 
+def test_search_cache_bounds_local_tier_and_sweeps():
+    now = [0.0]
+    cache = SearchCache(ttl_seconds=10, time_func=lambda: now[0], max_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, hits=[{"chunk_id": key}], bucket="control", search_id=key)
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.set("c", hits=[], bucket="control", search_id="c")
+    assert cache.get("b") is None and cache.get("a") is not None
+
+    size = cache.stats()["search_cache_bytes"] // 2
+    small = SearchCache(ttl_seconds=10, time_func=lambda: now[0], max_bytes=size + 1)
+    small.set("x", hits=[], bucket="control", search_id="x")
+    small.set("y", hits=[], bucket="control", search_id="y")
+    small.set("huge", hits=[{"text": "z" * size}], bucket="control", search_id="h")
+    assert small.get("x") is None and small.get("y") is not None and small.get("huge") is None
+
+    now[0] = 5
+    cache.set("d", hits=[], bucket="control", search_id="d")
+    now[0] = 12
+    assert cache.sweep() == 1
+    stats = cache.stats()
+    assert stats["search_cache_entries"] == 1
+    assert (stats["search_cache_hits"], stats["search_cache_misses"], stats["search_cache_evictions"]) == (2, 1, 2)
+
+
 def test_rate_limiter_blocks_after_limit():
     now = [0.0]
 
@@ -119,20 +227,36 @@ def test_search_cache_reads_from_redis():
     assert entry.hits[0]["chunk_id"] == 1
 
 
-def test_rate_limiter_uses_redis():
+def test_rate_limiter_uses_one_script_call_per_check():
     redis = DummyRedis()
-    limiter = RateLimiter(limit_per_minute=2, redis_client=redis)
-    limiter.check("key")
-    limiter.check("key")
-    with pytest.raises(HTTPException):
-        limiter.check("key")
-    assert redis.expiry["rate-limit:key"] == 60
+    limiter = RateLimiter(limit_per_minute=2, tenant_limit_per_minute=3, redis_client=redis)
+    other = RateLimiter(limit_per_minute=2, tenant_limit_per_minute=3, redis_client=redis)
+    script = limiter._script
+
+    status = limiter.check("key", tenant="acme")
+    assert (status.limit, status.remaining, status.reset_s) == (2, 1, 30)
+    assert script.calls[0] == (
+        ["rate-limit:client:search:key", "rate-limit:tenant:acme"],
+        [2, 2 / 60000, 1, 3, 3 / 60000, 1],
+    )
+    other.check("key", tenant="acme")
+    with pytest.raises(HTTPException) as exc:
+        other.check("key", tenant="acme")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "30"
+    assert exc.value.headers["RateLimit-Remaining"] == "0"
+    # another client of the same tenant still has the tenant's last token
+    assert other.check("key-2", tenant="acme").remaining == 0
+    assert len(script.calls) + len(other._script.calls) == 4
 
 
 def test_rate_limiter_falls_back_when_redis_fails():
     class FailingRedis(DummyRedis):
-        def incr(self, key: str) -> int:  # type: ignore[override]
-            raise RedisError("boom")
+        def register_script(self, script: str):  # type: ignore[override]
+            def run(keys, args):
+                raise RedisError("boom")
+
+            return run
 
     redis = FailingRedis()
     now = [0.0]
@@ -144,3 +268,245 @@ def test_rate_limiter_falls_back_when_redis_fails():
     limiter.check("key")
     with pytest.raises(HTTPException):
         limiter.check("key")
+
+
+def test_rate_limiter_rejects_costs_above_capacity_without_charging():
+    redis = DummyRedis()
+    limiter = RateLimiter(limit_per_minute=10, tenant_limit_per_minute=5, redis_client=redis)
+
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("key", cost=11)
+    assert exc.value.status_code == 413 and not exc.value.headers
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("key", cost=6, tenant="acme")
+    assert exc.value.status_code == 413 and "tenant limit of 5" in exc.value.detail
+    assert limiter._script.calls == []
+    assert limiter.check("key", cost=10).remaining == 0
+
+
+def test_rate_limiter_local_buckets_refill_per_endpoint_and_tenant_and_stay_bounded():
+    now = [0.0]
+    limiter = RateLimiter(
+        limit_per_minute=60,
+        endpoint_limits={"suggest": 600},
+        tenant_limit_per_minute=120,
+        tenant_limits={"small": 2},
+        max_buckets=3,
+        time_func=lambda: now[0],
+    )
+
+    for _ in range(60):
+        limiter.check("a", tenant="acme")
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("a", tenant="acme")
+    assert exc.value.headers["Retry-After"] == "1"
+    assert limiter.check("a", endpoint="suggest", tenant="acme").limit == 120  # tenant bucket is lower
+    now[0] = 1.0
+    limiter.check("a", tenant="acme")  # one token back after a second, not at a window boundary
+
+    with pytest.raises(HTTPException):
+        limiter.check("b", cost=2, endpoint="search_batch", tenant={"small": 3, "acme": 1})
+    limiter.check("b", cost=3, endpoint="search_batch", tenant={"small": 2, "acme": 1})
+    # over the cap only the refilled suggest bucket goes; the drained ones are kept
+    assert "client:suggest:a" not in limiter._buckets and len(limiter._buckets) == 4
+    now[0] = 120.0
+    limiter.check("c")
+    assert list(limiter._buckets) == ["client:search:c"]
+
+
+def test_rate_limiter_keeps_drained_buckets_when_clients_cycle_keys():
+    now = [0.0]
+    limiter = RateLimiter(limit_per_minute=2, max_buckets=2, time_func=lambda: now[0])
+
+    limiter.check("victim", cost=2)
+    for index in range(10):
+        limiter.check(f"filler-{index}")
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("victim")  # still drained, not recreated full by eviction
+    assert exc.value.status_code == 429
+    now[0] = 60.0
+    limiter.check("victim")
+    assert len(limiter._buckets) <= 2
+
+
+def test_rate_limiter_zero_limit_rejects_with_429():
+    limiter = RateLimiter(limit_per_minute=10, endpoint_limits={"suggest": 0})
+
+    with pytest.raises(HTTPException) as exc:
+        limiter.check("key", endpoint="suggest")
+    assert exc.value.status_code == 429 and "Retry-After" not in exc.value.headers
+    assert limiter.check("key").remaining == 9
+
+
+def test_index_generations_are_shared_through_redis():
+    redis = DummyRedis()
+    writer = IndexGenerations(redis_client=redis)
+    reader = IndexGenerations(redis_client=redis)
+
+    assert reader.current("t", ["b", "a"]) == (("a", 0), ("b", 0))
+    writer.bump("t", ["a", "a"])
+    writer.bump("other", ["b"])
+    assert reader.current("t", ["a", "b"]) == (("a", 1), ("b", 0))
+    assert "index-gen:t:a" not in redis.expiry
+
+
+def test_search_cache_serves_local_hits_and_is_invalidated_across_instances():
+    redis = DummyRedis()
+    bus_a, bus_b = InvalidationBus(redis), InvalidationBus(redis)
+    bus_a.start()
+    bus_b.start()
+    cache_a = SearchCache(30, redis_client=redis, bus=bus_a)
+    cache_b = SearchCache(30, redis_client=redis, bus=bus_b)
+
+    cache_a.set("page", hits=[{"chunk_id": 1}], bucket="control", search_id="s", depth=1)
+    assert [e.depth if e else None for e in cache_b.get_many(["page", "other"])] == [1, None]
+    assert redis.mgets == 1
+    assert cache_b.get("page").depth == 1 and cache_a.get("page").depth == 1
+    assert redis.mgets == 1  # both served from the local tier
+
+    # a rewrite on one instance drops the stale local copy on the other
+    cache_a.set("page", hits=[{"chunk_id": 1}, {"chunk_id": 2}], bucket="control", search_id="s", depth=2)
+    assert cache_b.get("page").depth == 2
+    assert cache_b.stats()["search_cache_local_hits"] == 1
+
+
+def test_search_cache_drops_to_the_short_ttl_when_invalidation_fails_at_runtime():
+    redis = DummyRedis()
+    bus = InvalidationBus(redis)
+    bus.start()
+    now = [0.0]
+    cache = SearchCache(
+        30,
+        time_func=lambda: now[0],
+        redis_client=redis,
+        bus=bus,
+        shared_ttl_seconds=3600,
+        generations=IndexGenerations(redis_client=redis, bus=bus),
+    )
+
+    cache.set("old", hits=[{"chunk_id": 1}], bucket="control", search_id="s")
+    assert redis.expiry[cache._redis_key("old")] == 3600
+    now[0] = 60.0
+    assert cache.get("old") is not None  # invalidation works: the long TTL applies
+
+    bus._on_error(RuntimeError("connection lost"), None, DummyPubSub(redis))
+    cache.set("new", hits=[{"chunk_id": 2}], bucket="control", search_id="s")
+    assert redis.expiry[cache._redis_key("new")] == 30
+    assert cache.get("old") is None  # written for an hour, but no bump can reach it now
+    assert cache.get("new") is not None
+
+
+def test_search_cache_uses_the_short_ttl_without_shared_generations():
+    redis = DummyRedis()
+    bus = InvalidationBus(redis)
+    bus.start()
+    generations = IndexGenerations(redis_client=redis, bus=bus)
+    cache = SearchCache(30, redis_client=redis, bus=bus, shared_ttl_seconds=3600, generations=generations)
+
+    generations._disable_redis("Redis unavailable")
+    cache.set("page", hits=[], bucket="control", search_id="s")
+    assert redis.expiry[cache._redis_key("page")] == 30
+
+
+def test_index_generations_near_cache_follows_remote_bumps():
+    redis = DummyRedis()
+    bus_a, bus_b = InvalidationBus(redis), InvalidationBus(redis)
+    bus_a.start()
+    bus_b.start()
+    writer = IndexGenerations(redis_client=redis, bus=bus_a)
+    reader = IndexGenerations(redis_client=redis, bus=bus_b)
+
+    assert reader.current("t", ["a"]) == (("a", 0),)
+    assert reader.current("t", ["a"]) == (("a", 0),)
+    assert redis.mgets == 1
+    writer.bump("t", ["a"])
+    assert reader.current("t", ["a"]) == (("a", 1),)
+    assert writer.current("t", ["a"]) == (("a", 1),)
+    assert redis.mgets == 2
+
+
+def test_embedding_cache_encode_many_batches_misses():
+    redis = DummyRedis()
+    warm_provider, provider = DummyProvider(), DummyProvider()
+    EmbeddingCache(warm_provider, max_size=10, redis_client=redis).encode("in-redis")
+    cache = EmbeddingCache(provider, max_size=10, redis_client=redis)
+    cache.encode("local")
+
+    vectors = cache.encode_many(["local", "in-redis", "new", "new", "other"])
+
+    assert vectors[2] == vectors[3] and len(vectors) == 5
+    assert provider.calls == 2  # "local" earlier, then one batch for "new" and "other"
+    assert redis.mgets == 3  # one MGET per call
+
+
+def test_vector_codec_round_trips_compact_dtypes():
+    vector = np.linspace(-1.0, 1.0, 1024, dtype=np.float32)
+
+    payload = encode_vector(vector)
+    decoded = decode_vector(payload)
+    assert len(payload) == 4 + 1024 * 4
+    assert np.array_equal(decoded, vector) and not decoded.flags.writeable  # a view of the bytes
+    assert np.allclose(decode_vector(encode_vector(vector, "float16")), vector, atol=1e-3)
+    assert np.allclose(decode_vector(encode_vector(vector, "int8")), vector, atol=1 / 127)
+    assert len(encode_vector(vector, "int8")) == 8 + 1024
+    assert np.array_equal(decode_vector(json.dumps([0.5, 1.0]).encode()), [0.5, 1.0])
+
+
+def test_embedding_cache_keeps_vectors_in_a_slab_and_binary_redis():
+    class UnitProvider:
+        def encode(self, texts, normalize_embeddings=True):
+            return [[float(len(t)), 0.5, -0.25] for t in texts]
+
+    redis = DummyRedis()
+    cache = EmbeddingCache(UnitProvider(), max_size=2, redis_client=redis, dtype="float16")
+    cache.encode_many(["a", "bb", "ccc"])
+
+    assert len(cache._cache) == 2 and cache._cache.nbytes == 2 * 3 * 2
+    assert cache._cache.get(cache._digest("a")) is None  # evicted, row reused
+    assert np.allclose(cache.encode("bb"), [2.0, 0.5, -0.25])
+    assert all(value.startswith(b"F16") for value in redis.store.values())
+
+
+def test_embedding_store_persists_per_model_and_compacts(tmp_path):
+    path = tmp_path / "embeddings.sqlite3"
+    now = [100.0]
+    store = EmbeddingStore(path, "hf:model-a", time_func=lambda: now[0])
+    store.put_many({"d1": np.array([1.0, 0.0], dtype=np.float32)})
+    now[0] = 200.0
+    store.put_many({"d2": np.array([0.0, 1.0], dtype=np.float32)})
+    store.close()
+
+    reopened = EmbeddingStore(path, "hf:model-a", max_bytes=14, time_func=lambda: now[0])
+    assert np.array_equal(reopened.get_many(["d1", "missing"])["d1"], [1.0, 0.0])
+    # d1 was just used, so trimming to the byte budget drops d2
+    now[0] = 300.0
+    reopened.get_many(["d1"])
+    assert reopened.compact() == {"stale": 0, "trimmed": 1, "rows": 1, "bytes": 12}
+    reopened.close()
+
+    other_model = EmbeddingStore(path, "hf:model-b", compact_every=1)
+    assert other_model.get_many(["d1"]) == {}
+    # compaction triggered by writes only trims, off the writer's thread and lock;
+    # other models' rows wait for an explicit compact()
+    other_model.put_many({"d3": np.array([1.0, 1.0], dtype=np.float32)})
+    other_model._trim_thread.join()
+    assert other_model._trim_thread.name == "embedding-store-trim"
+    assert np.array_equal(EmbeddingStore(path, "hf:model-a").get_many(["d1"])["d1"], [1.0, 0.0])
+    assert other_model.compact()["stale"] == 1
+    other_model.close()
+
+
+def test_embedding_cache_reads_the_disk_tier_after_restart(tmp_path):
+    path = tmp_path / "embeddings.sqlite3"
+    first = DummyProvider()
+    EmbeddingCache(first, max_size=4, model_id="m", store=EmbeddingStore(path, "m")).encode_many(["a", "bb"])
+
+    provider, redis = DummyProvider(), DummyRedis()
+    cache = EmbeddingCache(provider, max_size=4, redis_client=redis, model_id="m", store=EmbeddingStore(path, "m"))
+    assert [v.tolist() for v in cache.encode_many(["a", "bb", "ccc"])] == [[2.0], [2.0], [1.0]]
+    assert provider.calls == 1  # only "ccc"
+    assert len(redis.store) == 3 and all(key.startswith("embeddings:") for key in redis.store)
+
+    changed = DummyProvider()
+    EmbeddingCache(changed, max_size=4, model_id="m2", store=EmbeddingStore(path, "m2")).encode("a")
+    assert changed.calls == 1
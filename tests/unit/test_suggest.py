@@ -0,0 +1,162 @@
+import pathlib
+import sys
+from types import SimpleNamespace
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "server"))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import suggest as suggest_routes
+from app.index.opensearch_store import OSStore
+from app.search import suggest as suggest_module
+from app.search.suggest import Suggester
+from app.search.symbol_index import SymbolIndex
+from app.services.api_key import APIKeyValidator
+from app.services.metrics import StatsTracker
+from app.services.rate_limit import RateLimiter
+
+
+class MemorySymbolStore:
+    def __init__(self, symbols):
+        self.symbols = symbols
+
+    def load(self, tenant, repo_id):
+        return list(self.symbols)
+
+
+class CountingPaths:
+    def __init__(self, paths):
+        self.paths = paths
+        self.loads = 0
+
+    def rel_paths(self, tenant, repo_id):
+        self.loads += 1
+        return list(self.paths)
+
+
+class CountingTables:
+    """Wraps the suggester's path table cache to count table scans."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.scans = 0
+
+    def __getattr__(self, name):
+        return getattr(self.tables, name)
+
+    def get(self, tenant, repo_id):
+        self.scans += 1
+        return self.tables.get(tenant, repo_id)
+
+
+def _suggester(paths, symbols=()):
+    source = CountingPaths(paths)
+    suggester = Suggester(SymbolIndex(MemorySymbolStore(symbols)), source)
+    suggester._paths = CountingTables(suggester._paths)
+    return suggester, source
+
+
+def _symbol(qualified, kind="function", rel_path="src/auth/login.py", line=1):
+    return {
+        "name": qualified.rsplit(".", 1)[-1],
+        "qualified_name": qualified,
+        "kind": kind,
+        "rel_path": rel_path,
+        "line_start": line,
+        "line_end": line + 2,
+    }
+
+
+def test_suggest_matches_path_suffixes_and_symbols():
+    suggester, _ = _suggester(
+        ["src/auth/login.py", "src/auth/logout.py", "docs/login.md", "src/main.py"],
+        [_symbol("LoginForm", "class"), _symbol("LoginForm.submit", "method")],
+    )
+
+    items, reused = suggester.suggest("t", "r", "login")
+    assert not reused
+    assert [(i["type"], i["text"]) for i in items] == [
+        ("symbol", "LoginForm"),
+        ("path", "docs/login.md"),
+        ("symbol", "LoginForm.submit"),
+        ("path", "src/auth/login.py"),
+    ]
+    assert items[0]["line_start"] == 1 and items[0]["kind"] == "class"
+
+    assert [i["text"] for i in suggester.suggest("t", "r", "auth/log", types=("path",))[0]] == [
+        "src/auth/login.py",
+        "src/auth/logout.py",
+    ]
+    assert [i["text"] for i in suggester.suggest("t", "r", "main.py")[0]] == ["src/main.py"]
+
+
+def test_suggest_session_narrows_previous_candidates(monkeypatch):
+    suggester, source = _suggester(["src/auth/login.py", "src/auth/logout.py", "src/lib.py"])
+
+    assert [i["text"] for i in suggester.suggest("t", "r", "l", session_id="s1")[0]] == [
+        "src/lib.py",
+        "src/auth/login.py",
+        "src/auth/logout.py",
+    ]
+    items, reused = suggester.suggest("t", "r", "logo", session_id="s1")
+    assert reused and [i["text"] for i in items] == ["src/auth/logout.py"]
+    assert suggester._paths.scans == 1 and source.loads == 1
+
+    # backspacing past the previous prefix, or another session, scans the tables again
+    assert suggester.suggest("t", "r", "li", session_id="s1")[1] is False
+    assert suggester.suggest("t", "r", "lib", session_id="s2")[1] is False
+    assert suggester._paths.scans == 3
+
+    # a truncated candidate set cannot be narrowed locally
+    monkeypatch.setattr(suggest_module.settings, "suggest_candidates", 1)
+    suggester.suggest("t", "r", "s", session_id="s3")
+    assert suggester.suggest("t", "r", "src/l", session_id="s3")[1] is False
+
+
+def test_rel_paths_pages_composite_aggregation():
+    class FakeOpenSearch:
+        def __init__(self):
+            self.indices = SimpleNamespace(exists=lambda index: True)
+            self.bodies = []
+
+        def search(self, index, body):
+            self.bodies.append(body)
+            comp = body["aggs"]["paths"]["composite"]
+            start = comp.get("after", {}).get("path")
+            keys = [p for p in ["a.py", "b.py", "c.py"] if start is None or p > start][: comp["size"]]
+            agg = {"buckets": [{"key": {"path": k}, "doc_count": 1} for k in keys]}
+            if keys:
+                agg["after_key"] = {"path": keys[-1]}
+            return {"aggregations": {"paths": agg}}
+
+    client = FakeOpenSearch()
+    assert OSStore(client).rel_paths("t", "r", page_size=2) == ["a.py", "b.py", "c.py"]
+    assert len(client.bodies) == 2
+    assert client.bodies[0]["query"] == {"term": {"repo_id": "r"}}
+
+
+def test_suggest_endpoint():
+    suggester, _ = _suggester(["src/auth/login.py"], [_symbol("login")])
+    app = FastAPI()
+    app.include_router(suggest_routes.router)
+    stats = StatsTracker()
+    app.state.context = SimpleNamespace(
+        suggester=suggester,
+        rate_limiter=RateLimiter(100),
+        api_keys=APIKeyValidator({}, False),
+        stats=stats,
+    )
+    client = TestClient(app)
+
+    params = {"tenant_id": "t", "repo_id": "r", "session_id": "abc"}
+    first = client.get("/v1/search/suggest", params=dict(params, q="lo")).json()
+    assert [(s["type"], s["text"]) for s in first["suggestions"]] == [("symbol", "login"), ("path", "src/auth/login.py")]
+    second = client.get("/v1/search/suggest", params=dict(params, q="login.", types="path")).json()
+    assert second["reused"] is False  # types changed, new candidate set
+    third = client.get("/v1/search/suggest", params=dict(params, q="login.p", types="path")).json()
+    assert third["reused"] is True and third["took_ms"] < 20
+    assert [s["rel_path"] for s in third["suggestions"]] == ["src/auth/login.py"]
+
+    assert client.get("/v1/search/suggest", params=dict(params, q="lo", types="nope")).status_code == 400
+    assert stats.snapshot()["suggest_reused_total"] == 1
@@ -0,0 +1,116 @@
+import pathlib
+import sys
+from types import SimpleNamespace
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "server"))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import symbols as symbol_routes
+from app.search.symbol_index import SymbolIndex
+from app.services.admission import AdmissionController, AdmissionPool
+from app.services.api_key import APIKeyValidator
+from app.services.rate_limit import RateLimiter
+
+
+def _symbol(qualified: str, kind: str = "function", rel_path: str = "src/a.py", line: int = 1) -> dict:
+    return {
+        "name": qualified.rsplit(".", 1)[-1],
+        "qualified_name": qualified,
+        "kind": kind,
+        "rel_path": rel_path,
+        "line_start": line,
+        "line_end": line + 3,
+    }
+
+
+class MemorySymbolStore:
+    def __init__(self):
+        self.rows: dict[tuple[str, str], list[dict]] = {}
+        self.loads = 0
+
+    def replace(self, tenant, repo_id, paths, symbols):
+        kept = [s for s in self.rows.get((tenant, repo_id), []) if s["rel_path"] not in set(paths)]
+        self.rows[(tenant, repo_id)] = kept + [dict(s, repo_id=repo_id) for s in symbols]
+        return len(symbols)
+
+    def load(self, tenant, repo_id):
+        self.loads += 1
+        return list(self.rows.get((tenant, repo_id), []))
+
+
+def test_symbol_index_exact_and_prefix_lookups():
+    store = MemorySymbolStore()
+    index = SymbolIndex(store)
+    index.replace(
+        "t",
+        "r",
+        ["src/a.py"],
+        [
+            _symbol("ConfigParser", "class"),
+            _symbol("ConfigParser.parse", "method"),
+            _symbol("parse"),
+            _symbol("parseConfigFile"),
+            _symbol("parser_utils"),
+        ],
+    )
+
+    exact = index.lookup("t", "r", "parse")
+    assert [s["qualified_name"] for s in exact] == ["ConfigParser.parse", "parse"]
+    assert [s["qualified_name"] for s in index.lookup("t", "r", "configparser.parse")] == ["ConfigParser.parse"]
+
+    prefix = index.lookup("t", "r", "parse", prefix=True)
+    assert [s["qualified_name"] for s in prefix] == ["ConfigParser.parse", "parse", "parseConfigFile", "parser_utils"]
+    assert [s["qualified_name"] for s in index.lookup("t", "r", "config", prefix=True, kind="class")] == ["ConfigParser"]
+    assert store.loads == 1
+
+    # re-uploading a path replaces its symbols and refreshes the table
+    index.replace("t", "r", ["src/a.py"], [_symbol("parse")])
+    assert [s["qualified_name"] for s in index.lookup("t", "r", "parse", prefix=True)] == ["parse"]
+
+
+def test_symbols_endpoint(monkeypatch):
+    store = MemorySymbolStore()
+    app = FastAPI()
+    app.include_router(symbol_routes.router)
+    app.state.context = SimpleNamespace(
+        symbols=SymbolIndex(store),
+        rate_limiter=RateLimiter(100),
+        api_keys=APIKeyValidator({}, False),
+        admission=AdmissionController([AdmissionPool("ingest", 2)]),
+    )
+    client = TestClient(app)
+
+    resp = client.post(
+        "/v1/symbols/upload",
+        json={"tenant_id": "t", "repo_id": "r", "symbols": [_symbol("UserService.getUser", "method")]},
+    )
+    assert resp.json() == {"status": "ok", "symbols": 1, "paths": 1}
+
+    found = client.get("/v1/symbols", params={"tenant_id": "t", "repo_id": "r", "q": "getuser"}).json()
+    assert [h["qualified_name"] for h in found["hits"]] == ["UserService.getUser"]
+    assert found["took_ms"] < 5
+
+    prefix = client.get("/v1/symbols", params={"tenant_id": "t", "repo_id": "r", "q": "UserS", "mode": "prefix"})
+    assert [h["qualified_name"] for h in prefix.json()["hits"]] == ["UserService.getUser"]
+
+    monkeypatch.setattr(symbol_routes.settings, "privacy_repo_ids", {"secret"})
+    assert client.post("/v1/symbols/upload", json={"repo_id": "secret", "symbols": []}).status_code == 400
+
+
+def test_client_extracts_qualified_symbols(tmp_path):
+    pytest.importorskip("tree_sitter_languages")
+    sys.path.append(str(pathlib.Path(__file__).resolve().parents[2]))
+    from client.ts_chunker import chunk_and_symbols, chunk_by_ast, extract_symbols
+
+    source = tmp_path / "svc.py"
+    source.write_text("class Svc:\n    def run(self):\n        pass\n\ndef main():\n    pass\n", encoding="utf-8")
+
+    assert [(s["qualified_name"], s["kind"], s["line_start"], s["line_end"]) for s in extract_symbols(source)] == [
+        ("Svc", "class", 1, 3),
+        ("Svc.run", "method", 2, 3),
+        ("main", "function", 5, 6),
+    ]
+    assert chunk_and_symbols(source) == (chunk_by_ast(source), extract_symbols(source))
@@ -0,0 +1,95 @@
+import pathlib
+import sys
+import threading
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "server"))
+
+from app.api.routes import tenant as tenant_routes
+from app.services.api_key import APIKeyValidator
+from app.services.salt_cache import SaltCache
+from app.utils.vault import VaultError
+
+
+class FakeVault:
+    def __init__(self) -> None:
+        self.versions: dict[str, int] = {}
+        self.calls: list[str] = []
+        self.down = False
+        self.lock = threading.Lock()
+
+    def fetch(self, tenant: str) -> dict | None:
+        with self.lock:
+            self.calls.append(tenant)
+        if self.down:
+            raise VaultError("vault unreachable")
+        ver = self.versions.get(tenant, 1)
+        return {"ver": ver, "value": f"{tenant}-salt-{ver}"}
+
+
+def _drain(cache: SaltCache) -> None:
+    for future in list(cache._inflight.values()):
+        future.result()
+
+
+def test_salt_cache_refreshes_ahead_and_serves_last_good_value_while_vault_is_down():
+    vault = FakeVault()
+    now = [0.0]
+    cache = SaltCache(
+        vault.fetch,
+        fallback=lambda tenant: {"ver": 0, "value": "env"},
+        ttl_s=100,
+        refresh_ahead_s=20,
+        retry_s=5,
+        max_tenants=2,
+        time_func=lambda: now[0],
+    )
+
+    assert cache.cached(["a"]) is None
+    assert cache.get_many(["a", "b", "a"]) == {"a": {"ver": 1, "value": "a-salt-1"}, "b": {"ver": 1, "value": "b-salt-1"}}
+    assert sorted(vault.calls) == ["a", "b"]
+    assert cache.cached(["b", "a"])["a"]["ver"] == 1 and len(vault.calls) == 2
+
+    vault.versions["a"] = 2
+    now[0] = 80  # inside the refresh-ahead window: served as is, refreshed in the background
+    assert cache.cached(["a"])["a"]["ver"] == 1
+    _drain(cache)
+    assert cache.cached(["a"])["a"]["ver"] == 2
+
+    vault.down = True
+    now[0] = 500  # far past the TTL with Vault down: still the last good value, retried every 5 s
+    assert cache.refresh_due() == 2
+    _drain(cache)
+    assert cache.cached(["a", "b"]) == {"a": {"ver": 2, "value": "a-salt-2"}, "b": {"ver": 1, "value": "b-salt-1"}}
+    assert cache.refresh_due() == 0
+    assert cache.get("c") == {"ver": 0, "value": "env"}  # never fetched: fallback, and "a" is evicted
+    assert cache.cached(["a"]) is None
+
+    stats = cache.stats()
+    assert (stats["salt_cache_failures"], stats["salt_cache_tenants"]) == (3, 2)
+    cache.close()
+
+
+def test_salt_endpoints_share_the_cache_and_batch_in_request_order():
+    vault = FakeVault()
+    vault.versions["acme"] = 3
+    app = FastAPI()
+    app.include_router(tenant_routes.router)
+    app.state.context = SimpleNamespace(salts=SaltCache(vault.fetch), api_keys=APIKeyValidator({}, False))
+    client = TestClient(app)
+
+    assert client.get("/v1/tenant/salt", params={"tenant_id": "acme"}).json() == {
+        "tenant_id": "acme",
+        "salt_ver": 3,
+        "salt": "acme-salt-3",
+    }
+    resp = client.post("/v1/tenant/salts", json={"tenant_ids": ["beta", "acme", "beta"]})
+    assert [(s["tenant_id"], s["salt_ver"]) for s in resp.json()["salts"]] == [("beta", 1), ("acme", 3), ("beta", 1)]
+    assert sorted(vault.calls) == ["acme", "beta"]
+
+    app.state.context.api_keys = APIKeyValidator({"acme": ["k"]}, True)
+    denied = client.post("/v1/tenant/salts", json={"tenant_ids": ["acme", "beta"]}, headers={"x-api-key": "k"})
+    assert denied.status_code == 403